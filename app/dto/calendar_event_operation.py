@@ -0,0 +1,16 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel
+
+class CalendarEventOperation(BaseModel):
+    action: Literal["create", "update", "delete"]
+    calendar_id: str = "primary"
+    event_id: Optional[str] = None
+    etag: Optional[str] = None
+    summary: Optional[str] = None
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    attendees: Optional[List[str]] = None
+    timezone: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,9 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+class SlackSearchResult(BaseModel):
+    hits: List[dict] = []
+    truncated: bool = False
+    searched_back_to: Optional[str] = None
+    unsearched_channels: int = 0
\ No newline at end of file
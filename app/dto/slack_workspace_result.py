@@ -0,0 +1,8 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+class SlackWorkspaceResult(BaseModel):
+    bot_token: str
+    result: Any = None
+    error: Optional[str] = None
\ No newline at end of file
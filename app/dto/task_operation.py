@@ -0,0 +1,14 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+class TaskOperation(BaseModel):
+    action: Literal["create", "update", "delete"]
+    tasklist_id: str = "@default"
+    task_id: Optional[str] = None
+    title: Optional[str] = None
+    notes: Optional[str] = None
+    due: Optional[str] = None
+    status: Optional[str] = None
+    parent: Optional[str] = None
+    previous: Optional[str] = None
\ No newline at end of file
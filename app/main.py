@@ -9,6 +9,7 @@ from app.utils.application_constants import db_url_key
 from app.utils.env_loader import load_environment
 from app.utils.global_exception_handler import global_exception_handler
 from app.utils.tool_util import load_package
+from app.webclients.slack.slack_http import slack_http_session
 
 
 async def main():
@@ -25,6 +26,8 @@ async def main():
         await init_pg_pool(db_url)
         logger.info("PG pool initialised")
 
+        await slack_http_session.open()
+
         logger.info("MCP server starting...")
         await server.run_streamable_http_async()
         server.streamable_http_app().add_exception_handler(Exception, global_exception_handler)
@@ -32,6 +35,8 @@ async def main():
         logger.error(f"Unexpected error running server: {e}", exc_info=True)
         await close_pg_pool()
         sys.exit(1)
+    finally:
+        await slack_http_session.close()
 
 if __name__ == "__main__":
     load_environment()
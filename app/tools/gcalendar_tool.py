@@ -1,15 +1,33 @@
+from datetime import datetime, time as dt_time, timedelta
+from typing import List
+from zoneinfo import ZoneInfo
+
 from mcp import types
 from mcp.server.fastmcp.server import Context
+from app.dto.calendar_event_operation import CalendarEventOperation
 from app.utils.app_utils import failed_tool_response
 from app.decorators.try_catch_decorator import try_catch_wrapper_no_raised_exception
 from app.mcp_server import server
 from app.utils.application_constants import listing_gcal_tool_failed, fetching_gcal_events_tool_failed, \
-    creating_gcal_event_tool_failed, update_gcal_event_tool_failed, delete_gcal_event_tool_failed
-from app.utils.tool_util import fetch_user_uuid
+    creating_gcal_event_tool_failed, update_gcal_event_tool_failed, delete_gcal_event_tool_failed, \
+    find_free_slots_tool_failed, get_agenda_tool_failed, gcal_agenda_max_results, batch_gcal_events_tool_failed, \
+    gcal_batch_max_operations
+from app.utils.tool_util import fetch_user_uuid, account_tag
 from app.webclients.gsuite.gcalendar.gcal_client import GoogleCalendarClientImpl
+from app.webclients.gsuite.gcalendar.gcal_util import merge_intervals, working_windows, free_slots
 
 calendar_client = GoogleCalendarClientImpl()
 
+# Partial-response masks (`fields=`) matching what each tool below formats.
+# Passing `None` to the client instead returns the full Calendar resource.
+calendars_fields = "items(id,summary,primary)"
+events_fields = "items(summary,start,htmlLink)"
+created_event_fields = "id,summary,htmlLink"
+modified_event_fields = "id,htmlLink"
+free_busy_fields = "calendars(busy,errors(reason))"
+agenda_fields = "items(id,iCalUID,originalStartTime,etag,summary,start,end,htmlLink),nextPageToken"
+batch_event_fields = "id,summary,htmlLink"
+
 @try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, listing_gcal_tool_failed))
 @server.tool(
     name="list_google_calendars",
@@ -21,7 +39,7 @@ calendar_client = GoogleCalendarClientImpl()
 )
 async def list_google_calendars(ctx: Context) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    calendars = await calendar_client.list_calendars(user_uuid)
+    calendars = await calendar_client.list_calendars(user_uuid, calendars_fields)
     if not calendars:
         return types.CallToolResult(content=[types.TextContent(type="text", text="No calendars found.")])
     lines = []
@@ -29,7 +47,7 @@ async def list_google_calendars(ctx: Context) -> types.CallToolResult:
         summary = cal.get('summary', 'No Summary')
         cal_id = cal.get('id', 'Unknown')
         is_primary = " (Primary)" if cal.get('primary') else ""
-        lines.append(f"- {summary}{is_primary} (ID: {cal_id})")
+        lines.append(f"- {summary}{is_primary} (ID: {cal_id}){account_tag(cal, calendars)}")
     return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(lines))])
 
 
@@ -55,7 +73,7 @@ async def get_google_calendar_events(
         max_results: int = 25
 ) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    events = await calendar_client.get_events(user_uuid, calendar_id, time_min, time_max, max_results)
+    events = await calendar_client.get_events(user_uuid, calendar_id, time_min, time_max, max_results, events_fields)
     if not events:
         return types.CallToolResult(content=[types.TextContent(type="text", text="No events found.")])
     lines = []
@@ -63,10 +81,129 @@ async def get_google_calendar_events(
         summary = e.get('summary', 'No Title')
         start = e['start'].get('dateTime', e['start'].get('date', ''))
         link = e.get('htmlLink', '')
-        lines.append(f'- "{summary}" (Starts: {start}) | Link: {link}')
+        lines.append(f'- "{summary}" (Starts: {start}) | Link: {link}{account_tag(e, events)}')
     return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(lines))])
 
 
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, get_agenda_tool_failed))
+@server.tool(
+    name="get_agenda",
+    description=(
+            "Get one merged, time-ordered agenda across several Google Calendars in a single call.\n"
+            "Prefer this over calling `get_google_calendar_events` once per calendar.\n\n"
+            "**Parameters:**\n"
+            "- `time_min` (str): RFC3339 start datetime.\n"
+            "- `time_max` (str, optional): RFC3339 end datetime.\n"
+            "- `calendar_ids` (list[str], optional): Calendars to include (default: every selected calendar).\n"
+            f"- `max_results` (int): Max number of events (default 50, at most {gcal_agenda_max_results}).\n\n"
+            "**Returns:**\n"
+            "- Events from all calendars ordered by start time, each with its calendar name and link."
+    )
+)
+async def get_agenda(
+        ctx: Context,
+        time_min: str,
+        time_max: str = None,
+        calendar_ids: List[str] = None,
+        max_results: int = 50,
+) -> types.CallToolResult:
+    user_uuid = await fetch_user_uuid(ctx)
+    max_results = max(1, min(max_results, gcal_agenda_max_results))
+    agenda = await calendar_client.get_agenda(user_uuid, calendar_ids, time_min, time_max, max_results, agenda_fields)
+    events = agenda["events"]
+    lines = []
+    for e in events:
+        summary = e.get('summary', 'No Title')
+        start = e['start'].get('dateTime', e['start'].get('date', ''))
+        end = e.get('end', {}).get('dateTime', e.get('end', {}).get('date', ''))
+        link = e.get('htmlLink', '')
+        lines.append(
+            f'- "{summary}" (Starts: {start}, Ends: {end}) [{e["calendar"]}]{account_tag(e, events)} '
+            f'| ID: {e.get("id", "")} | ETag: {e.get("etag", "")} | Link: {link}'
+        )
+    if not lines:
+        lines.append("No events found.")
+    if agenda["failed_calendars"]:
+        lines.append(f"Could not read calendars: {', '.join(agenda['failed_calendars'])}")
+    return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(lines))])
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, find_free_slots_tool_failed))
+@server.tool(
+    name="find_free_slots",
+    description=(
+            "Find free time slots shared by the user's calendars and any attendees, using one free/busy query.\n"
+            "Prefer this over reading raw events when scheduling a meeting.\n\n"
+            "**Parameters:**\n"
+            "- `time_min` (str): RFC3339 start of the search range. Without an offset it is read in `timezone`.\n"
+            "- `time_max` (str): RFC3339 end of the search range.\n"
+            "- `calendar_ids` (list[str], optional): Calendar IDs to check (default: ['primary']).\n"
+            "- `attendees` (list[str], optional): Email addresses whose calendars must also be free.\n"
+            "- `timezone` (str): Timezone for working hours and output, e.g., 'Asia/Kolkata' (default 'UTC').\n"
+            "- `working_hours_start` (str): Daily start, 'HH:MM' (default '10:00').\n"
+            "- `working_hours_end` (str): Daily end, 'HH:MM' (default '19:00').\n"
+            "- `min_duration_minutes` (int): Shortest slot to return (default 30).\n"
+            "- `max_results` (int): Max number of slots (default 20).\n\n"
+            "**Returns:**\n"
+            "- Free slots with start, end and length, plus any calendars whose availability could not be read."
+    )
+)
+async def find_free_slots(
+        ctx: Context,
+        time_min: str,
+        time_max: str,
+        calendar_ids: List[str] = None,
+        attendees: List[str] = None,
+        timezone: str = "UTC",
+        working_hours_start: str = "10:00",
+        working_hours_end: str = "19:00",
+        min_duration_minutes: int = 30,
+        max_results: int = 20,
+) -> types.CallToolResult:
+    user_uuid = await fetch_user_uuid(ctx)
+    tz = ZoneInfo(timezone)
+    window_start = localize(datetime.fromisoformat(time_min.replace("Z", "+00:00")), tz)
+    window_end = localize(datetime.fromisoformat(time_max.replace("Z", "+00:00")), tz)
+    calendars = (calendar_ids or ["primary"]) + (attendees or [])
+    results = await calendar_client.query_free_busy(
+        user_uuid, window_start.isoformat(), window_end.isoformat(), calendars, timezone, free_busy_fields
+    )
+
+    busy = []
+    readable = set()
+    errors = {}
+    for calendar in results:
+        if calendar.get("errors"):
+            errors[calendar["calendar_id"]] = ", ".join(error.get("reason", "unknown") for error in calendar["errors"])
+            continue
+        readable.add(calendar["calendar_id"])
+        busy.extend(
+            (datetime.fromisoformat(period["start"].replace("Z", "+00:00")),
+             datetime.fromisoformat(period["end"].replace("Z", "+00:00")))
+            for period in calendar.get("busy", [])
+        )
+    windows = working_windows(
+        window_start, window_end, tz, dt_time.fromisoformat(working_hours_start), dt_time.fromisoformat(working_hours_end)
+    )
+    slots = free_slots(merge_intervals(busy), windows, timedelta(minutes=min_duration_minutes))[:max_results]
+
+    lines = [f"Free slots ({timezone}, {working_hours_start}-{working_hours_end}, at least {min_duration_minutes} min):"]
+    for start, end in slots:
+        start, end = start.astimezone(tz), end.astimezone(tz)
+        minutes = int((end - start).total_seconds() // 60)
+        lines.append(f"- {start:%a %Y-%m-%d %H:%M} - {end:%H:%M} ({minutes} min)")
+    if not slots:
+        lines.append("- None found.")
+    for calendar_id, reason in errors.items():
+        if calendar_id not in readable:
+            lines.append(f"Could not read availability of {calendar_id}: {reason}")
+    return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(lines))])
+
+
+def localize(value: datetime, tz: ZoneInfo) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=tz)
+
+
 @try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, creating_gcal_event_tool_failed))
 @server.tool(
     name="create_google_calendar_event",
@@ -98,7 +235,8 @@ async def create_google_calendar_event(
 ) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
     event = await calendar_client.create_event(
-        user_uuid, summary, start_time, end_time, calendar_id, description, location, attendees, timezone
+        user_uuid, summary, start_time, end_time, calendar_id, description, location, attendees, timezone,
+        created_event_fields
     )
     link = event.get("htmlLink", "No link available")
     confirmation = f"Event '{event.get('summary', summary)}' created. Link: {link}"
@@ -132,7 +270,8 @@ async def modify_google_calendar_event(
 ) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
     event = await calendar_client.modify_event(
-        user_uuid, event_id, calendar_id, summary, start_time, end_time, description, location, attendees, timezone
+        user_uuid, event_id, calendar_id, summary, start_time, end_time, description, location, attendees, timezone,
+        modified_event_fields
     )
     link = event.get("htmlLink", "No link available")
     confirmation = f"Event updated. Link: {link}"
@@ -159,4 +298,40 @@ async def delete_google_calendar_event(
     user_uuid = await fetch_user_uuid(ctx)
     result = await calendar_client.delete_event(user_uuid, event_id, calendar_id)
     confirmation = f"Event (ID: {event_id}) deleted." if result.get("deleted") else "Delete failed."
-    return types.CallToolResult(content=[types.TextContent(type="text", text=confirmation)])
\ No newline at end of file
+    return types.CallToolResult(content=[types.TextContent(type="text", text=confirmation)])
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, batch_gcal_events_tool_failed))
+@server.tool(
+    name="batch_google_calendar_events",
+    description=(
+            "Create, update and delete many events in the user's Google Calendar with one call.\n"
+            "Prefer this over repeated single-event calls, e.g. when rescheduling several meetings.\n\n"
+            "**Parameters:**\n"
+            f"- `operations` (list, at most {gcal_batch_max_operations}): Each item has:\n"
+            "  - `action` (str): 'create', 'update' or 'delete'.\n"
+            "  - `calendar_id` (str): Calendar ID (default: 'primary').\n"
+            "  - `event_id` (str): Required for 'update' and 'delete'.\n"
+            "  - `etag` (str, optional): ETag from `get_agenda`; the change is rejected if the event was modified since.\n"
+            "  - `summary`, `start_time`, `end_time`, `description`, `location`, `attendees`, `timezone`: As in "
+            "`create_google_calendar_event`. 'create' requires summary, start_time and end_time; 'update' only "
+            "changes the fields that are given.\n\n"
+            "**Returns:**\n"
+            "- One result line per operation, in order, with its link or error."
+    )
+)
+async def batch_google_calendar_events(ctx: Context, operations: List[CalendarEventOperation]) -> types.CallToolResult:
+    user_uuid = await fetch_user_uuid(ctx)
+    if len(operations) > gcal_batch_max_operations:
+        raise ValueError(f"At most {gcal_batch_max_operations} operations are allowed per call, got {len(operations)}.")
+    results = await calendar_client.batch_events(user_uuid, operations, batch_event_fields)
+    succeeded = sum(1 for result in results if result.get("ok"))
+    lines = [f"{succeeded} of {len(results)} operation(s) succeeded."]
+    for result in results:
+        target = result.get("summary") or result.get("event_id") or result.get("id") or ""
+        if result.get("ok"):
+            link = f" | Link: {result['htmlLink']}" if result.get("htmlLink") else ""
+            lines.append(f"{result['index'] + 1}. {result['action']} {target}: ok (ID: {result.get('id') or result.get('event_id')}){link}")
+        else:
+            lines.append(f"{result['index'] + 1}. {result['action']} {target}: failed - {result.get('error')}")
+    return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(lines))])
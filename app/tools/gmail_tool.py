@@ -10,12 +10,24 @@ from app.utils.app_utils import failed_tool_response
 from app.utils.application_constants import gmail_search_tool_failed, gmail_fetch_tool_failed, \
     gmail_fetch_batch_tool_failed, gmail_mail_send_tool_failed, gmail_draft_creation_tool_failed, \
     gmail_thread_count_tool_failed, gmail_listing_labels_tool_failed, gmail_labels_tool_failed, \
-    gmail_labels_update_tool_failed
-from app.utils.tool_util import fetch_user_uuid
+    gmail_labels_update_tool_failed, gmail_attachment_tool_failed
+from app.utils.tool_util import fetch_user_uuid, account_tag
 from app.webclients.gsuite.gmail.gmail_client import GmailClientImpl
 
 gmail_client = GmailClientImpl()
 
+# Partial-response masks (`fields=`) matching what each tool below formats.
+# Passing `None` to the client instead returns the full Gmail resource.
+search_fields = "messages(id),nextPageToken"
+search_metadata_fields = "id,threadId,snippet,payload/headers"
+message_fields = "id,threadId,payload(mimeType,filename,headers,body,parts)"
+message_metadata_fields = "id,payload/headers"
+thread_fields = f"historyId,messages({message_fields})"
+labels_fields = "labels(id,name,type)"
+label_fields = "id,name,type,labelListVisibility,messageListVisibility"
+modified_message_fields = "id,threadId,labelIds"
+attachment_fields = "size,data"
+
 @try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, gmail_search_tool_failed))
 @server.tool(
     name="search_gmail_messages",
@@ -33,19 +45,49 @@ gmail_client = GmailClientImpl()
             "- **Combine operators:** Use spaces to require all terms, `OR` for alternatives, and `-` to exclude (e.g., `from:cars24 \"exit formalities\" -is:read`).\n\n"
             "**Parameters:**\n"
             "- `query` (str): Gmail search query string (must use Gmail search syntax).\n"
-            "- `page_size` (int): Max number of results (default 10).\n\n"
+            "- `page_size` (int): Max number of results (default 10).\n"
+            "- `include_metadata` (bool): Also return date, sender, subject and snippet of every match "
+            "(default False). Prefer this over a follow-up content fetch when triaging results.\n\n"
             "**Returns:**\n"
-            "- List of matching message IDs."
+            "- List of matching message IDs, or a table of ID | Date | From | Subject | Snippet when "
+            "`include_metadata` is set."
     )
 )
-async def search_gmail_messages(ctx: Context, query: str, page_size: int = 10) -> types.CallToolResult:
+async def search_gmail_messages(ctx: Context, query: str, page_size: int = 10, include_metadata: bool = False) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    messages = await gmail_client.search_messages(user_uuid, query, page_size)
-    msg_ids = [msg["id"] for msg in messages] if messages else []
+    if include_metadata:
+        messages = await gmail_client.search_messages_with_metadata(user_uuid, query, page_size, search_metadata_fields)
+        text = format_message_table(messages) if messages else "No messages found."
+        return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
+    messages = await gmail_client.search_messages(user_uuid, query, page_size, search_fields)
+    msg_ids = [msg["id"] + account_tag(msg, messages) for msg in messages] if messages else []
     text = f"Found {len(msg_ids)} message(s):\n" + "\n".join(msg_ids) if msg_ids else "No messages found."
     return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
 
 
+def format_message_table(messages: List[dict]) -> str:
+    def cell(value: str, width: int) -> str:
+        value = " ".join((value or "").split()).replace("|", "/")
+        return value if len(value) <= width else value[:width - 1] + "…"
+
+    lines = [
+        f"Found {len(messages)} message(s):",
+        "ID | Date | From | Subject | Snippet",
+    ]
+    for msg in messages:
+        if msg.get("error"):
+            lines.append(f"{msg['id']}{account_tag(msg, messages)} | error: {cell(msg['error'], 80)}")
+            continue
+        lines.append(" | ".join([
+            msg["id"] + account_tag(msg, messages),
+            cell(msg["date"], 31),
+            cell(msg["from"], 40),
+            cell(msg["subject"], 80),
+            cell(msg["snippet"], 100),
+        ]))
+    return "\n".join(lines)
+
+
 @try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, gmail_fetch_tool_failed))
 @server.tool(
     name="get_gmail_message_content",
@@ -59,7 +101,7 @@ async def search_gmail_messages(ctx: Context, query: str, page_size: int = 10) -
 )
 async def get_gmail_message_content(ctx: Context, message_id: str) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    msg = await gmail_client.get_message_content(user_uuid, message_id)
+    msg = await gmail_client.get_message_content(user_uuid, message_id, message_fields)
     text = json.dumps(msg, indent=2)
     return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
 
@@ -78,11 +120,41 @@ async def get_gmail_message_content(ctx: Context, message_id: str) -> types.Call
 )
 async def get_gmail_messages_content_batch(ctx: Context, message_ids: List[str], format: Literal["full", "metadata"] = "full") -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    msgs = await gmail_client.get_messages_content_batch(user_uuid, message_ids, format)
+    fields = message_metadata_fields if format == "metadata" else message_fields
+    msgs = await gmail_client.get_messages_content_batch(user_uuid, message_ids, format, fields)
     text = json.dumps(msgs, indent=2)
     return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
 
 
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, gmail_attachment_tool_failed))
+@server.tool(
+    name="get_gmail_attachment",
+    description=(
+            "Download an attachment of a Gmail message. Attachment IDs, filenames and MIME types are listed "
+            "at the end of the message body returned by `get_gmail_message_content`.\n\n"
+            "**Parameters:**\n"
+            "- `message_id` (str): Gmail message ID.\n"
+            "- `attachment_id` (str): Attachment ID.\n"
+            "- `filename` (str, optional): Attachment filename.\n"
+            "- `mime_type` (str, optional): Attachment MIME type; detected from the content when omitted.\n\n"
+            "**Returns:**\n"
+            "- Text attachments: a size-capped text extract.\n"
+            "- Other attachments: size, detected type and SHA-256 only; their content is not returned."
+    )
+)
+async def get_gmail_attachment(
+        ctx: Context,
+        message_id: str,
+        attachment_id: str,
+        filename: Optional[str] = None,
+        mime_type: Optional[str] = None
+) -> types.CallToolResult:
+    user_uuid = await fetch_user_uuid(ctx)
+    attachment = await gmail_client.get_attachment(user_uuid, message_id, attachment_id, filename, mime_type, attachment_fields)
+    text = json.dumps(attachment, indent=2)
+    return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
+
+
 @try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, gmail_mail_send_tool_failed))
 @server.tool(
     name="send_gmail_message",
@@ -98,7 +170,7 @@ async def get_gmail_messages_content_batch(ctx: Context, message_ids: List[str],
 )
 async def send_gmail_message(ctx: Context, to: str, subject: str, body: str) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    message_id = await gmail_client.send_message(user_uuid, to, subject, body)
+    message_id = await gmail_client.send_message(user_uuid, to, subject, body, "id")
     return types.CallToolResult(content=[types.TextContent(type="text", text=f"Email sent! Message ID: {message_id}")])
 
 
@@ -117,7 +189,7 @@ async def send_gmail_message(ctx: Context, to: str, subject: str, body: str) ->
 )
 async def draft_gmail_message(ctx: Context, subject: str, body: str, to: Optional[str] = None) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    draft_id = await gmail_client.draft_message(user_uuid, subject, body, to)
+    draft_id = await gmail_client.draft_message(user_uuid, subject, body, to, "id")
     return types.CallToolResult(content=[types.TextContent(type="text", text=f"Draft created! Draft ID: {draft_id}")])
 
 
@@ -134,7 +206,7 @@ async def draft_gmail_message(ctx: Context, subject: str, body: str, to: Optiona
 )
 async def get_gmail_thread_content(ctx: Context, thread_id: str) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    thread_content = await gmail_client.get_thread_content(user_uuid, thread_id)
+    thread_content = await gmail_client.get_thread_content(user_uuid, thread_id, thread_fields)
     text = json.dumps(thread_content, indent=2)
     return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
 
@@ -150,7 +222,7 @@ async def get_gmail_thread_content(ctx: Context, thread_id: str) -> types.CallTo
 )
 async def list_gmail_labels(ctx: Context) -> types.CallToolResult:
     user_uuid, resolved_email = await fetch_user_uuid(ctx)
-    labels = await gmail_client.list_labels(user_uuid)
+    labels = await gmail_client.list_labels(user_uuid, labels_fields)
     text = json.dumps(labels, indent=2)
     return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
 
@@ -179,7 +251,8 @@ async def manage_gmail_label(
         message_list_visibility: Literal["show", "hide"] = "show"
 ) -> types.CallToolResult:
     user_uuid, resolved_email = await fetch_user_uuid(ctx)
-    result = await gmail_client.manage_label(user_uuid, action, name, label_id, label_list_visibility, message_list_visibility)
+    result = await gmail_client.manage_label(user_uuid, action, name, label_id, label_list_visibility,
+                                            message_list_visibility, label_fields)
     text = json.dumps(result, indent=2)
     return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
 
@@ -204,6 +277,7 @@ async def modify_gmail_message_labels(
         remove_label_ids: Optional[List[str]] = None
 ) -> types.CallToolResult:
     user_uuid, resolved_email = await fetch_user_uuid(ctx)
-    result = await gmail_client.modify_message_labels(user_uuid, message_id, add_label_ids, remove_label_ids)
+    result = await gmail_client.modify_message_labels(user_uuid, message_id, add_label_ids, remove_label_ids,
+                                                     modified_message_fields)
     text = json.dumps(result, indent=2)
     return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
@@ -1,16 +1,29 @@
+from typing import List
+
 from mcp import types
 from mcp.server.fastmcp.server import Context
 
+from app.dto.task_operation import TaskOperation
 from app.decorators.try_catch_decorator import try_catch_wrapper_no_raised_exception
 from app.mcp_server import server
 from app.utils.app_utils import failed_tool_response
 from app.utils.application_constants import gtask_listing_tool_failed, gtask_fetch_failed, gtask_listing_failed, \
-    gtask_fetch_task_failed, gtask_create_task_failed, gtask_modify_task_failed, gtask_delete_task_failed
-from app.utils.tool_util import fetch_user_uuid
+    gtask_fetch_task_failed, gtask_create_task_failed, gtask_modify_task_failed, gtask_delete_task_failed, \
+    gtask_list_all_open_failed, gtasks_all_open_max_results, gtask_batch_failed, gtasks_batch_max_operations
+from app.utils.tool_util import fetch_user_uuid, account_tag
 from app.webclients.gsuite.gtasks.gtasks_client import GoogleTasksClientImpl
 
 tasks_client = GoogleTasksClientImpl()
 
+# Partial-response masks (`fields=`) matching what each tool below formats.
+# Passing `None` to the client instead returns the full Tasks resource.
+tasklists_fields = "items(id,title)"
+tasklist_fields = "id,title,updated"
+tasks_fields = "items(id,title,due,status)"
+task_fields = "id,title,notes,due,status"
+open_tasks_fields = "items(id,title,due),nextPageToken"
+batch_task_fields = "id,title"
+
 @try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, gtask_listing_tool_failed))
 @server.tool(
     name="list_google_tasklists",
@@ -22,13 +35,13 @@ tasks_client = GoogleTasksClientImpl()
 )
 async def list_google_tasklists(ctx: Context) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    tasklists = await tasks_client.list_tasklists(user_uuid)
+    tasklists = await tasks_client.list_tasklists(user_uuid, fields=tasklists_fields)
     if not tasklists: return types.CallToolResult(content=[types.TextContent(type="text", text="No tasklists found.")])
     lines = []
     for tl in tasklists:
         title = tl.get('title', 'No Title')
         tl_id = tl.get('id', 'Unknown')
-        lines.append(f"- {title} (ID: {tl_id})")
+        lines.append(f"- {title} (ID: {tl_id}){account_tag(tl, tasklists)}")
     return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(lines))])
 
 
@@ -43,7 +56,7 @@ async def list_google_tasklists(ctx: Context) -> types.CallToolResult:
 )
 async def get_google_tasklist(ctx: Context, tasklist_id: str) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    tasklist = await tasks_client.get_tasklist(user_uuid, tasklist_id)
+    tasklist = await tasks_client.get_tasklist(user_uuid, tasklist_id, tasklist_fields)
     if not tasklist:
         return types.CallToolResult(content=[types.TextContent(type="text", text="Tasklist not found.")])
     title = tasklist.get('title', 'No Title')
@@ -67,7 +80,9 @@ async def get_google_tasklist(ctx: Context, tasklist_id: str) -> types.CallToolR
             "- max_results (optional): Maximum number of results to return.\n"
             "- due_min (optional): Earliest due date (RFC3339 timestamp).\n"
             "- due_max (optional): Latest due date (RFC3339 timestamp).\n"
-            "- page_token (optional): Page token for pagination.\n\n"
+            "- page_token (optional): Page token to start listing from; all following pages are returned.\n"
+            "- max_age_seconds (optional): How old, in seconds, a cached copy of the tasklist may be (default 30). "
+            "Use 0 to always check Google for changes first.\n\n"
             "**Returns:**\n"
             "- List of task titles, due dates, and statuses."
     )
@@ -82,11 +97,12 @@ async def list_google_tasks(
         due_min: str = None,
         due_max: str = None,
         page_token: str = None,
+        max_age_seconds: float = None,
 ) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
     tasks = await tasks_client.list_tasks(
         user_uuid, tasklist_id, show_completed, show_hidden, show_deleted,
-        max_results, due_min, due_max, page_token
+        max_results, due_min, due_max, page_token, tasks_fields, max_age_seconds
     )
     if not tasks:
         return types.CallToolResult(content=[types.TextContent(type="text", text="No tasks found in this tasklist.")])
@@ -96,7 +112,7 @@ async def list_google_tasks(
         due = task.get('due', 'No Due Date')
         status = task.get('status', 'No Status')
         task_id = task.get('id', 'Unknown')
-        lines.append(f"- {title} (ID: {task_id}, Due: {due}, Status: {status})")
+        lines.append(f"- {title} (ID: {task_id}, Due: {due}, Status: {status}){account_tag(task, tasks)}")
     return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(lines))])
 
 
@@ -107,14 +123,16 @@ async def list_google_tasks(
             "Get a specific Google Task by its ID and the parent tasklist ID.\n\n"
             "**Arguments:**\n"
             "- tasklist_id: The ID of the tasklist.\n"
-            "- task_id: The ID of the task.\n\n"
+            "- task_id: The ID of the task.\n"
+            "- max_age_seconds (optional): How old, in seconds, a cached copy of the task may be (default 30). "
+            "Use 0 to always fetch it from Google.\n\n"
             "**Returns:**\n"
             "- Task title, notes, due date, and status."
     )
 )
-async def get_google_task(ctx: Context, tasklist_id: str, task_id: str) -> types.CallToolResult:
+async def get_google_task(ctx: Context, tasklist_id: str, task_id: str, max_age_seconds: float = None) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    task = await tasks_client.get_task(user_uuid, tasklist_id, task_id)
+    task = await tasks_client.get_task(user_uuid, tasklist_id, task_id, task_fields, max_age_seconds)
     if not task:
         return types.CallToolResult(content=[types.TextContent(type="text", text="Task not found.")])
     title = task.get('title', 'No Title')
@@ -152,7 +170,7 @@ async def create_google_task(
         previous: str = None,
 ) -> types.CallToolResult:
     user_uuid = await fetch_user_uuid(ctx)
-    task = await tasks_client.create_task(user_uuid, tasklist_id, title, notes, due, status, parent, previous)
+    task = await tasks_client.create_task(user_uuid, tasklist_id, title, notes, due, status, parent, previous, "id")
     return types.CallToolResult(
         content=[types.TextContent(type="text", text=f"Task '{title}' created with ID: {task.get('id', 'Unknown')}")]
     )
@@ -197,7 +215,7 @@ async def modify_google_task(
     task = await tasks_client.modify_task(
         user_uuid, tasklist_id, task_id,
         title, notes, due, status, parent, previous,
-        completed, deleted, hidden, position
+        completed, deleted, hidden, position, "title"
     )
     return types.CallToolResult(
         content=[types.TextContent(type="text", text=f"Task '{task.get('title', 'Unknown')}' updated successfully.")]
@@ -220,3 +238,70 @@ async def delete_google_task(ctx: Context, tasklist_id: str, task_id: str) -> ty
     return types.CallToolResult(
         content=[types.TextContent(type="text", text=f"Task {task_id} deleted successfully.")]
     )
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, gtask_list_all_open_failed))
+@server.tool(
+    name="list_all_open_tasks",
+    description=(
+            "List the user's open (not completed, not hidden) Google Tasks across every tasklist in one call.\n"
+            "Prefer this over listing tasklists and then tasks per tasklist.\n\n"
+            "**Arguments:**\n"
+            "- due_max (optional): Only tasks due before this RFC3339 timestamp.\n"
+            f"- max_results (optional): Maximum number of tasks to return (default 100, at most {gtasks_all_open_max_results}).\n\n"
+            "**Returns:**\n"
+            "- Open tasks grouped by tasklist, with IDs and due dates, and whether listing stopped at max_results."
+    )
+)
+async def list_all_open_tasks(ctx: Context, due_max: str = None, max_results: int = 100) -> types.CallToolResult:
+    user_uuid = await fetch_user_uuid(ctx)
+    max_results = max(1, min(max_results, gtasks_all_open_max_results))
+    result = await tasks_client.list_all_open_tasks(user_uuid, max_results, due_max, open_tasks_fields)
+    tasks = result["tasks"]
+    if not tasks:
+        return types.CallToolResult(content=[types.TextContent(type="text", text="No open tasks found.")])
+    lines = []
+    current_list = None
+    for task in tasks:
+        if (task["account"], task["tasklist_id"]) != current_list:
+            current_list = (task["account"], task["tasklist_id"])
+            lines.append(f"{task['tasklist']} (Tasklist ID: {task['tasklist_id']}){account_tag(task, tasks)}:")
+        lines.append(f"- {task.get('title', 'No Title')} (ID: {task.get('id', 'Unknown')}, Due: {task.get('due', 'No Due Date')})")
+    if result["truncated"]:
+        lines.append(f"Stopped at {len(tasks)} tasks; more open tasks may exist.")
+    return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(lines))])
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, gtask_batch_failed))
+@server.tool(
+    name="batch_google_tasks",
+    description=(
+            "Create, update and delete many Google Tasks with one call, e.g. to turn meeting notes into TODOs.\n\n"
+            "**Arguments:**\n"
+            f"- operations (at most {gtasks_batch_max_operations}): Each item has:\n"
+            "  - action: 'create', 'update' or 'delete'.\n"
+            "  - tasklist_id: The ID of the tasklist (default '@default').\n"
+            "  - task_id: Required for 'update' and 'delete'.\n"
+            "  - title, notes, due, status (optional): Task fields; 'create' requires title.\n"
+            "  - parent, previous (optional): Make the task a subtask of `parent` and/or place it after `previous`.\n"
+            "  task_id, parent and previous may be '$N' to refer to the task created by operation N (0-based, earlier in the list).\n"
+            "- keep_order (optional): Create tasks of the same list in the given order (default False; "
+            "slower, as those creates run one after another).\n\n"
+            "**Returns:**\n"
+            "- One result line per operation, in order, with the task ID or the error."
+    )
+)
+async def batch_google_tasks(ctx: Context, operations: List[TaskOperation], keep_order: bool = False) -> types.CallToolResult:
+    user_uuid = await fetch_user_uuid(ctx)
+    if len(operations) > gtasks_batch_max_operations:
+        raise ValueError(f"At most {gtasks_batch_max_operations} operations are allowed per call, got {len(operations)}.")
+    results = await tasks_client.batch_tasks(user_uuid, operations, keep_order, batch_task_fields)
+    succeeded = sum(1 for result in results if result.get("ok"))
+    lines = [f"{succeeded} of {len(results)} operation(s) succeeded."]
+    for result in results:
+        target = result.get("title") or result.get("task_id") or ""
+        if result.get("ok"):
+            lines.append(f"{result['index']}. {result['action']} {target}: ok (ID: {result.get('id') or result.get('task_id')})")
+        else:
+            lines.append(f"{result['index']}. {result['action']} {target}: failed - {result.get('error')}")
+    return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(lines))])
@@ -1,8 +1,22 @@
 import json
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Literal, Optional
 from mcp import types
 from mcp.server.fastmcp.server import Context
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from app.decorators.try_catch_decorator import try_catch_wrapper_no_raised_exception
 from app.mcp_server import server
+from app.utils.app_utils import failed_tool_response
+from app.utils.application_constants import slack_list_conversations_failed, slack_channel_info_failed, \
+    slack_read_messages_failed, slack_thread_replies_failed, slack_user_info_failed, slack_list_users_failed, \
+    slack_search_messages_failed, slack_search_mentions_failed, slack_bot_membership_failed, \
+    slack_channel_members_failed, slack_dm_channel_failed, slack_list_max_results, slack_replies_max_results, \
+    slack_resolve_entity_failed, slack_resolve_default_limit, slack_resolve_max_limit, slack_history_max_results, \
+    slack_page_limit, slack_search_workspace_failed, slack_workspace_search_default_limit, \
+    slack_workspace_search_max_limit
 from app.webclients.slack.slack_client import SlackClientImpl
+from app.webclients.slack.slack_workspaces import fan_out_slack_workspaces
 from app.utils.tool_util import fetch_user_uuid
 from app.service.external_token_service import ExternalTokenService
 
@@ -10,21 +24,84 @@ slack_client = SlackClientImpl()
 token_service = ExternalTokenService()
 client_name = "slack"
 
+
+async def workspaces_response(ctx: Context, read: Callable[[str], Awaitable[str]]) -> types.CallToolResult:
+    """
+    Runs `read` for every Slack workspace of the user concurrently and maps each bot token to its text,
+    or to its error when that workspace failed.
+    """
+    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
+    results = await fan_out_slack_workspaces(bot_tokens or [], read)
+    output = {
+        result.bot_token: result.result if result.error is None else f"Error: {result.error}"
+        for result in results
+    }
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=json.dumps(output))]
+    )
+
+
+@server.custom_route("/metrics/slack", methods=["GET"])
+async def slack_rate_limit_metrics(request: Request) -> JSONResponse:
+    """
+    Queue depth, calls, 429s and wait times of the Slack scheduler, per API method. The route has no
+    authentication, so workspaces are aggregated rather than labelled.
+    """
+    return JSONResponse(slack_client.scheduler.metrics())
+
+
+def truncation_note(truncated: bool, max_results: int) -> str:
+    return f"\n\n(Stopped at {max_results} results; more exist.)" if truncated else ""
+
+
+def slack_ts(value: Optional[str]) -> Optional[str]:
+    """
+    Slack message ts for an epoch timestamp ("1714557600" or a ts itself) or an ISO 8601 date or datetime
+    (UTC unless it has an offset).
+    """
+    if not value:
+        return None
+    try:
+        return f"{float(value):.6f}"
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}': expected an ISO 8601 date/datetime or epoch seconds.") from None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return f"{parsed.timestamp():.6f}"
+
+
+def author_prefix(message: dict) -> str:
+    return f"@{message['user_name']}: " if message.get("user_name") else ""
+
+
+def index_coverage_note(searched_back_to: Optional[str]) -> str:
+    if not searched_back_to:
+        return ""
+    since = datetime.fromtimestamp(float(searched_back_to), timezone.utc).isoformat(timespec="seconds")
+    return f"\n\n(Searched messages since {since}; older history is not indexed yet.)"
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_list_conversations_failed))
 @server.tool(
     name="list_conversations",
     description=(
             "List all Slack conversations the bot has access to for the current user.\n\n"
             "Includes public channels, private channels, group DMs (mpim), and direct messages (im).\n"
-            "Returns a mapping of Slack bot tokens to their accessible conversation types and names."
+            "Returns a mapping of Slack bot tokens to their accessible conversation types and names.\n"
+            "To look up the ID of a channel or user by name, use `resolve_slack_entity` instead.\n\n"
+            "**Parameters:**\n"
+            f"- `max_results`: Max number of conversations to list per workspace (default: {slack_list_max_results})."
     )
 )
-async def list_conversations(ctx: Context) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-
-    for bot_token in bot_tokens:
-        response = await slack_client.list_conversations(bot_token)
-        channels = response.get("channels", [])
+async def list_conversations(ctx: Context, max_results: int = slack_list_max_results) -> types.CallToolResult:
+    async def read(bot_token: str) -> str:
+        directory_channels = await slack_client.directory.channels(bot_token)
+        channels = list(directory_channels.values())[:max_results]
+        truncated = len(directory_channels) > max_results
         categorized = {
             "Public Channels": [],
             "Private Channels": [],
@@ -45,15 +122,14 @@ async def list_conversations(ctx: Context) -> types.CallToolResult:
             else:
                 categorized["Public Channels"].append(channel_info)
 
-        output[bot_token] = "\n\n".join(
+        return "\n\n".join(
             f"{k}:\n{chr(10).join(v) or 'None'}" for k, v in categorized.items()
-        )
+        ) + truncation_note(truncated, max_results)
 
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
-    )
+    return await workspaces_response(ctx, read)
 
 
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_channel_info_failed))
 @server.tool(
     name="get_channel_info",
     description=(
@@ -63,59 +139,82 @@ async def list_conversations(ctx: Context) -> types.CallToolResult:
     )
 )
 async def get_channel_info(ctx: Context, channel_id: str) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
-        response = await slack_client.get_conversation_info(bot_token, channel_id)
-        channel = response.get("channel", {})
+    async def read(bot_token: str) -> str:
+        channel = await slack_client.directory.get_channel(bot_token, channel_id)
         visibility = "private" if channel.get("is_private") else "public"
-        output[bot_token] = f"Channel #{channel.get('name', 'N/A')} is {visibility}."
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
-    )
+        return f"Channel #{channel.get('name', 'N/A')} is {visibility}."
 
+    return await workspaces_response(ctx, read)
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_read_messages_failed))
 @server.tool(
     name="read_channel_messages",
     description=(
-            "Read recent messages from a Slack channel across all connected workspaces for the user.\n\n"
+            "Read recent messages from a Slack channel across all connected workspaces for the user, "
+            "optionally only those within a time window.\n"
+            "Messages show their ts, their author and the names of mentioned users and channels.\n\n"
             "**Parameters:**\n"
             "- `channel_id`: ID of the channel.\n"
-            "- `limit`: Max number of messages to retrieve (default: 5)."
+            f"- `limit`: Max number of messages to retrieve, newest first (default: 5, max: {slack_history_max_results}).\n"
+            "- `oldest`: Only messages after this time, as ISO 8601 (e.g. `2024-05-01T00:00:00Z`, UTC if no offset) "
+            "or epoch seconds (optional).\n"
+            "- `latest`: Only messages before this time, same formats (optional)."
     )
 )
-async def read_channel_messages(ctx: Context, channel_id: str, limit: int = 5) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
-        response = await slack_client.get_conversation_history(bot_token, channel_id, limit)
-        messages = response.get("messages", [])
-        summary = "\n".join(f"- {m['text']}" for m in messages if m.get("text"))
-        output[bot_token] = summary or "No messages found."
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
-    )
+async def read_channel_messages(ctx: Context, channel_id: str, limit: int = 5, oldest: Optional[str] = None,
+                                latest: Optional[str] = None) -> types.CallToolResult:
+    limit = max(1, min(limit, slack_history_max_results))
+    oldest_ts, latest_ts = slack_ts(oldest), slack_ts(latest)
 
+    async def read(bot_token: str) -> str:
+        messages, truncated = [], False
+        # Slack filters the window; pages are only fetched until `limit` messages are found.
+        async for m in slack_client.iter_conversation_history(
+                bot_token, channel_id, oldest_ts, latest_ts, limit=min(limit + 1, slack_page_limit)
+        ):
+            if not m.get("text"):
+                continue
+            if len(messages) >= limit:
+                truncated = True
+                break
+            messages.append(m)
+        messages = await slack_client.directory.render_mentions(bot_token, messages)
+        summary = "\n".join(f"- [{m['ts']}] {author_prefix(m)}{m['text']}" for m in messages)
+        return summary + truncation_note(truncated, limit) if summary else "No messages found."
+
+    return await workspaces_response(ctx, read)
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_thread_replies_failed))
 @server.tool(
     name="read_thread_replies",
     description=(
-            "Retrieve replies to a specific thread in a Slack channel for all user workspaces.\n\n"
+            "Retrieve replies to a specific thread in a Slack channel for all user workspaces.\n"
+            "Messages show their author and the names of mentioned users and channels.\n\n"
             "**Parameters:**\n"
             "- `channel_id`: Channel ID where the thread exists.\n"
             "- `thread_ts`: Timestamp of the root message."
     )
 )
 async def read_thread_replies(ctx: Context, channel_id: str, thread_ts: str) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
-        response = await slack_client.get_conversation_replies(bot_token, channel_id, thread_ts)
-        replies = response.get("messages", [])[1:]  # skip thread root
-        texts = "\n".join(f"- {msg.get('text')}" for msg in replies if msg.get("text"))
-        output[bot_token] = texts or "No replies found."
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
-    )
+    async def read(bot_token: str) -> str:
+        replies, truncated = [], False
+        async for msg in slack_client.iter_conversation_replies(bot_token, channel_id, thread_ts):
+            if msg.get("ts") == thread_ts or not msg.get("text"):
+                continue  # skip thread root and messages without text
+            if len(replies) >= slack_replies_max_results:
+                truncated = True
+                break
+            replies.append(msg)
+        replies = await slack_client.directory.render_mentions(bot_token, replies)
+        texts = "\n".join(f"- {author_prefix(msg)}{msg['text']}" for msg in replies)
+        return texts + truncation_note(truncated, slack_replies_max_results) if texts else "No replies found."
+
+    return await workspaces_response(ctx, read)
 
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_user_info_failed))
 @server.tool(
     name="get_user_info",
     description=(
@@ -125,97 +224,150 @@ async def read_thread_replies(ctx: Context, channel_id: str, thread_ts: str) ->
     )
 )
 async def get_user_info(ctx: Context, user_id: str) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
-        response = await slack_client.get_user_info(bot_token, user_id)
-        user = response.get("user", {})
+    async def read(bot_token: str) -> str:
+        user = await slack_client.directory.get_user(bot_token, user_id)
         email = user.get("profile", {}).get("email", "N/A")
-        output[bot_token] = f"User {user.get('name')} — Email: {email}"
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
-    )
+        return f"User {user.get('name')} — Email: {email}"
 
+    return await workspaces_response(ctx, read)
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_list_users_failed))
 @server.tool(
     name="list_users",
     description=(
-            "List all active users in the Slack workspace with their display names and user IDs for all workspaces the user is connected to."
+            "List all active users in the Slack workspace with their display names and user IDs for all workspaces the user is connected to.\n\n"
+            "**Parameters:**\n"
+            f"- `max_results`: Max number of users to list per workspace (default: {slack_list_max_results})."
     )
 )
-async def list_users(ctx: Context) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
-        response = await slack_client.list_users(bot_token)
-        members = response.get("members", [])
-        user_list = [
-            f"user_name: {user['name']} (ID: {user['id']})"
-            for user in members if not user.get("deleted")
-        ]
-        output[bot_token] = "\n".join(user_list) or "No users found."
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
-    )
+async def list_users(ctx: Context, max_results: int = slack_list_max_results) -> types.CallToolResult:
+    async def read(bot_token: str) -> str:
+        user_list, truncated = [], False
+        for user in (await slack_client.directory.users(bot_token)).values():
+            if user.get("deleted"):
+                continue
+            if len(user_list) >= max_results:
+                truncated = True
+                break
+            user_list.append(f"user_name: {user['name']} (ID: {user['id']})")
+        return "\n".join(user_list) + truncation_note(truncated, max_results) if user_list else "No users found."
 
+    return await workspaces_response(ctx, read)
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_search_messages_failed))
 @server.tool(
     name="search_messages_in_channel",
     description=(
-            "Search recent messages in a specific Slack channel for a given keyword across all user-connected workspaces.\n\n"
+            "Search recent messages in a specific Slack channel for a given keyword across all user-connected workspaces.\n"
+            "Messages show their author and the names of mentioned users and channels.\n\n"
             "**Parameters:**\n"
             "- `channel_id`: Channel ID to search in.\n"
             "- `keyword`: Word or phrase to look for.\n"
-            "- `limit`: Number of recent messages to scan (default: 10).\n\n"
+            "- `limit`: Max number of matching messages to return, newest first (default: 10).\n\n"
             "Returns a JSON with each bot token mapped to matched messages and their timestamps."
     )
 )
 async def search_messages(ctx: Context, channel_id: str, keyword: str, limit: int = 10) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
+    async def read(bot_token: str) -> str:
+        if slack_client.message_index:
+            found, searched_back_to = await slack_client.message_index.search(
+                bot_token, channel_id, keyword=keyword, limit=limit, skip_subtypes=True
+            )
+            found = await slack_client.directory.render_mentions(bot_token, found)
+            matches = [f"- [{m['ts']}] {author_prefix(m)}{m['text']}" for m in found]
+            text = "\n".join(matches) or f"No messages containing '{keyword}' found."
+            return text + index_coverage_note(searched_back_to)
         response = await slack_client.search_messages_in_conversation({
             "bot_token": bot_token,
             "channel_id": channel_id,
             "limit": limit
         })
-        matches = []
-        for m in response.get("messages", []):
-            if m.get("subtype"):
-                continue
-            text = m.get("text", "")
-            if keyword.lower() in text.lower():
-                ts = m.get("ts")
-                matches.append(f"- [{ts}] {text}")
-        output[bot_token] = "\n".join(matches[:limit]) or f"No messages containing '{keyword}' found."
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
+        found = [
+            m for m in response.get("messages", [])
+            if not m.get("subtype") and keyword.lower() in m.get("text", "").lower()
+        ][:limit]
+        found = await slack_client.directory.render_mentions(bot_token, found)
+        matches = [f"- [{m.get('ts')}] {author_prefix(m)}{m['text']}" for m in found]
+        return "\n".join(matches) or f"No messages containing '{keyword}' found."
+
+    return await workspaces_response(ctx, read)
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_search_workspace_failed))
+@server.tool(
+    name="search_slack_workspace",
+    description=(
+            "Search messages containing a keyword across the channels of all connected Slack workspaces in one call, "
+            "newest first. Prefer this over calling `search_messages_in_channel` once per channel.\n"
+            "Messages show their ts, channel, author and the names of mentioned users and channels.\n\n"
+            "**Parameters:**\n"
+            "- `keyword`: Word or phrase to look for.\n"
+            "- `channel_ids`: Channels to search (optional; default: every channel the bot is a member of).\n"
+            "- `oldest`: Only messages after this time, as ISO 8601 (e.g. `2024-05-01T00:00:00Z`, UTC if no offset) "
+            "or epoch seconds (optional).\n"
+            "- `latest`: Only messages before this time, same formats (optional).\n"
+            f"- `limit`: Max number of messages per workspace (default: {slack_workspace_search_default_limit}, "
+            f"max: {slack_workspace_search_max_limit})."
     )
+)
+async def search_slack_workspace(ctx: Context, keyword: str, channel_ids: Optional[List[str]] = None,
+                                 oldest: Optional[str] = None, latest: Optional[str] = None,
+                                 limit: int = slack_workspace_search_default_limit) -> types.CallToolResult:
+    limit = max(1, min(limit, slack_workspace_search_max_limit))
+    oldest_ts, latest_ts = slack_ts(oldest), slack_ts(latest)
+
+    async def read(bot_token: str) -> str:
+        result = await slack_client.workspace_search.search(bot_token, keyword, channel_ids, oldest_ts, latest_ts, limit)
+        hits = await slack_client.directory.render_mentions(bot_token, result.hits)
+        lines = [
+            f"- [{m['ts']}] #{m.get('channel_name') or m['channel']} ({m['channel']}) {author_prefix(m)}{m['text']}"
+            for m in hits
+        ]
+        text = "\n".join(lines) or f"No messages containing '{keyword}' found."
+        if result.unsearched_channels:
+            text += f"\n\n({result.unsearched_channels} channels could not be searched in time or failed.)"
+        return text + truncation_note(result.truncated, limit) + index_coverage_note(result.searched_back_to)
 
+    return await workspaces_response(ctx, read)
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_search_mentions_failed))
 @server.tool(
     name="search_mentions",
     description=(
-            "Search for messages in a Slack channel where a specific user was mentioned, for all user-connected workspaces.\n\n"
+            "Search for messages in a Slack channel where a specific user was mentioned, for all user-connected workspaces.\n"
+            "Messages show their author and the names of mentioned users and channels.\n\n"
             "**Parameters:**\n"
             "- `user_id`: Slack user ID to search mentions of.\n"
             "- `channel_id`: Channel in which to perform the search.\n"
-            "- `limit`: Number of recent messages to scan (default: 10)."
+            "- `limit`: Max number of mentioning messages to return, newest first (default: 10)."
     )
 )
 async def search_mentions(ctx: Context, user_id: str, channel_id: str, limit: int = 10) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
+    async def read(bot_token: str) -> str:
+        if slack_client.message_index:
+            found, searched_back_to = await slack_client.message_index.search(
+                bot_token, channel_id, mentioned_user_id=user_id, limit=limit
+            )
+            found = await slack_client.directory.render_mentions(bot_token, found)
+            messages = [f"{author_prefix(m)}{m['text']}" for m in found]
+            return ("\n".join(messages) or "No mentions found.") + index_coverage_note(searched_back_to)
         response = await slack_client.get_messages_mentioning_user({
             "bot_token": bot_token,
             "user_id": user_id,
             "channel_id": channel_id,
             "limit": limit
         })
-        messages = [m["text"] for m in response.get("messages", [])]
-        output[bot_token] = "\n".join(messages[:limit]) or "No mentions found."
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
-    )
+        found = await slack_client.directory.render_mentions(bot_token, response.get("messages", [])[:limit])
+        messages = [f"{author_prefix(m)}{m['text']}" for m in found]
+        return "\n".join(messages) or "No mentions found."
 
+    return await workspaces_response(ctx, read)
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_bot_membership_failed))
 @server.tool(
     name="is_bot_in_channel",
     description=(
@@ -226,18 +378,17 @@ async def search_mentions(ctx: Context, user_id: str, channel_id: str, limit: in
     )
 )
 async def is_bot_in_channel(ctx: Context, channel_id: str) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
+    async def read(bot_token: str) -> str:
         is_member = await slack_client.is_bot_member_of_conversation({
             "bot_token": bot_token,
             "channel_id": channel_id
         })
-        output[bot_token] = "Yes" if is_member else "No"
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
-    )
+        return "Yes" if is_member else "No"
+
+    return await workspaces_response(ctx, read)
 
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_channel_members_failed))
 @server.tool(
     name="get_channel_members",
     description=(
@@ -247,20 +398,19 @@ async def is_bot_in_channel(ctx: Context, channel_id: str) -> types.CallToolResu
     )
 )
 async def get_channel_members(ctx: Context, channel_id: str) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
+    async def read(bot_token: str) -> str:
         response = await slack_client.get_conversation_members({
             "bot_token": bot_token,
             "channel_id": channel_id
         })
         members = response.get("members", [])
         summary = ", ".join(f"{m['name']}" for m in members)
-        output[bot_token] = summary or "No members found."
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
-    )
+        return summary or "No members found."
+
+    return await workspaces_response(ctx, read)
 
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_dm_channel_failed))
 @server.tool(
     name="get_dm_channel_with_user",
     description=(
@@ -271,15 +421,42 @@ async def get_channel_members(ctx: Context, channel_id: str) -> types.CallToolRe
     )
 )
 async def get_dm_channel_with_user(ctx: Context, user_id: str) -> types.CallToolResult:
-    bot_tokens = await token_service.fetch_user_access_token(await fetch_user_uuid(ctx), client_name)
-    output = {}
-    for bot_token in bot_tokens:
-        try:
-            dm_channel_id = await slack_client.get_dm_channel_with_user(bot_token, user_id)
-            output[bot_token] = f"DM channel ID with user {user_id}: {dm_channel_id}"
-        except Exception as e:
-            output[bot_token] = f"Failed to retrieve DM channel ID: {str(e)}"
-    return types.CallToolResult(
-        content=[types.TextContent(type="text", text=json.dumps(output))]
+    async def read(bot_token: str) -> str:
+        dm_channel_id = await slack_client.get_dm_channel_with_user(bot_token, user_id)
+        return f"DM channel ID with user {user_id}: {dm_channel_id}"
+
+    return await workspaces_response(ctx, read)
+
+
+@try_catch_wrapper_no_raised_exception(logger_fn= lambda e: failed_tool_response(e, slack_resolve_entity_failed))
+@server.tool(
+    name="resolve_slack_entity",
+    description=(
+            "Find Slack channel and user IDs by name in all connected workspaces, without listing every conversation.\n\n"
+            "Matches exact names first, then prefixes, then names containing the query, then close misspellings. "
+            "Users are matched by handle, display name and real name.\n\n"
+            "**Parameters:**\n"
+            "- `name`: Channel or user name, with or without `#`/`@` (e.g. `eng-backend`, `@alice`).\n"
+            "- `kind`: `channel`, `user` or `any` (default: `any`).\n"
+            f"- `limit`: Max number of matches per workspace (default: {slack_resolve_default_limit}).\n\n"
+            "Returns a JSON of bot token to the best matches with their IDs."
     )
+)
+async def resolve_slack_entity(ctx: Context, name: str, kind: Literal["channel", "user", "any"] = "any",
+                               limit: int = slack_resolve_default_limit) -> types.CallToolResult:
+    kinds = ["channel", "user"] if kind == "any" else [kind]
+    limit = max(1, min(limit, slack_resolve_max_limit))
+
+    async def read(bot_token: str) -> str:
+        matches = await slack_client.directory.search(bot_token, name, kinds, limit)
+        lines = []
+        for _, match_kind, record in matches:
+            if match_kind == "channel":
+                label = f"#{record.get('name')}" if record.get("name") else record["id"]
+            else:
+                real_name = record.get("real_name") or (record.get("profile") or {}).get("real_name")
+                label = f"@{record.get('name')}" + (f" ({real_name})" if real_name else "")
+            lines.append(f"- {label} ({match_kind}, ID: {record['id']})")
+        return "\n".join(lines) or f"No channel or user matching '{name}' found."
 
+    return await workspaces_response(ctx, read)
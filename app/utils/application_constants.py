@@ -9,6 +9,92 @@ google_tasks_service_version = "v1"
 EMBEDDING_MODEL_NAME= 'BAAI/bge-large-en-v1.5'
 QDRANT_GRPC_URL='http://localhost:6333'
 THRESHOLD_VECTOR_MATCHING_SCORE=0.5
+gmail_max_body_chars = 50000
+gmail_attachment_max_text_chars = 50000
+google_batch_max_requests = 50
+google_fan_out_deadline_seconds = 20
+google_fan_out_concurrency = 5
+google_batch_concurrency = 4
+google_response_cache_max_bytes = 64 * 1024 * 1024
+google_response_cache_max_entry_bytes = 1024 * 1024
+gmail_list_max_page_size = 500
+gmail_mirror_max_mailboxes = 100
+gmail_mirror_max_messages_per_user = 500
+gmail_mirror_freshness_seconds = 60
+gmail_mirror_sync_interval_seconds = 15
+gmail_mirror_idle_timeout_seconds = 900
+gmail_mirror_labels_ttl_seconds = 300
+gmail_mirror_sync_concurrency = 8
+gcal_index_max_calendars = 200
+gcal_index_max_calendars_per_user = 20
+gcal_index_max_events_per_calendar = 5000
+gcal_index_freshness_seconds = 30
+gcal_index_lookback_days = 30
+gcal_index_lookahead_days = 365
+gcal_agenda_max_results = 250
+gcal_agenda_page_size = 250
+gcal_agenda_concurrency = 8
+gcal_batch_max_operations = 100
+gtasks_page_size = 100
+gtasks_tasklist_concurrency = 8
+gtasks_all_open_max_results = 200
+gtasks_batch_max_operations = 100
+gtasks_cache_max_tasklists = 500
+gtasks_cache_max_tasks_per_list = 2000
+gtasks_cache_clock_skew_seconds = 60
+gtasks_cache_default_max_age_seconds = 30
+gtasks_cache_failure_ttl_seconds = 60
+gmail_rate_limit_per_second = 40
+gcal_rate_limit_per_second = 10
+gtasks_rate_limit_per_second = 10
+google_rate_limit_burst = 20
+google_rate_limit_min_per_second = 1
+google_rate_limit_recovery_step = 0.05
+google_rate_limit_max_buckets = 10000
+google_retry_max_attempts = 4
+google_retry_base_delay_seconds = 0.5
+google_retry_max_delay_seconds = 30
+google_retry_budget_ratio = 0.2
+google_retry_budget_max_tokens = 20
+google_retry_budget_min_per_second = 1
+google_executor_max_workers = 32
+slack_fan_out_deadline_seconds = 20
+slack_fan_out_concurrency = 5
+slack_page_limit = 200
+slack_search_page_limit = 100
+slack_list_max_results = 1000
+slack_replies_max_results = 500
+slack_history_max_results = 1000
+slack_directory_ttl_seconds = 300
+slack_directory_max_stale_seconds = 3600
+slack_directory_max_workspaces = 200
+slack_directory_max_records = 50000
+slack_directory_lookup_concurrency = 5
+slack_directory_max_lookups = 50
+slack_resolve_default_limit = 5
+slack_resolve_max_limit = 25
+slack_message_index_max_channels = 500
+slack_message_index_max_messages_per_channel = 20000
+slack_message_index_max_messages = 200000
+slack_message_index_freshness_seconds = 15
+slack_message_index_backfill_pages = 5
+slack_message_index_unreachable_ttl_seconds = 300
+slack_rate_limit_max_buckets = 20000
+slack_rate_limit_max_retries = 3
+slack_rate_limit_default_retry_after_seconds = 30
+slack_rate_limit_slow_wait_seconds = 5
+slack_http_connection_limit = 100
+slack_http_dns_cache_seconds = 300
+slack_http_keepalive_seconds = 60
+slack_http_timeout_seconds = 30
+slack_http_connect_timeout_seconds = 5
+slack_http_max_clients = 1000
+slack_workspace_search_default_limit = 20
+slack_workspace_search_max_limit = 100
+slack_workspace_search_max_channels = 200
+slack_workspace_search_concurrency = 8
+slack_workspace_search_max_pages = 5
+slack_workspace_search_deadline_seconds = 15
 
 # Defaults
 default_google_token_uri = 'https://oauth2.googleapis.com/token'
@@ -19,6 +105,10 @@ google_token_uri_key = 'GOOGLE_TOKEN_URI'
 db_url_key = 'DATABASE_URL'
 google_client_id_key = "GOOGLE_CLIENT_ID"
 google_client_secret_key = "GOOGLE_CLIENT_SECRET"
+gmail_mirror_enabled_key = "GMAIL_MIRROR_ENABLED"
+gcal_event_index_enabled_key = "GCAL_EVENT_INDEX_ENABLED"
+gtasks_cache_enabled_key = "GTASKS_CACHE_ENABLED"
+slack_message_index_enabled_key = "SLACK_MESSAGE_INDEX_ENABLED"
 
 # Exceptions
 db_fetch_token_failed= 'Exception while fetching token for user and client'
@@ -33,6 +123,9 @@ fetching_gcal_events_tool_failed="Error getting Google Calendar events"
 creating_gcal_event_tool_failed="Error creating Google Calendar event"
 update_gcal_event_tool_failed="Error modifying Google Calendar event"
 delete_gcal_event_tool_failed="Error deleting Google Calendar event"
+find_free_slots_tool_failed="Error finding free Google Calendar slots"
+get_agenda_tool_failed="Error getting Google Calendar agenda"
+batch_gcal_events_tool_failed="Error running batch Google Calendar event operations"
 gmail_search_tool_failed="Error searching Gmail messages"
 gmail_fetch_tool_failed="Error getting Gmail message content"
 gmail_fetch_batch_tool_failed="Error getting Gmail messages content batch"
@@ -42,6 +135,7 @@ gmail_thread_count_tool_failed="Error getting Gmail thread content"
 gmail_listing_labels_tool_failed="Error listing Gmail labels"
 gmail_labels_tool_failed="Error managing Gmail label"
 gmail_labels_update_tool_failed="Error modifying Gmail message labels"
+gmail_attachment_tool_failed="Error getting Gmail attachment"
 gtask_listing_tool_failed="Error listing Google Tasklists"
 gtask_fetch_failed="Error getting Google Tasklist"
 gtask_listing_failed="Error listing Google Tasks"
@@ -49,5 +143,20 @@ gtask_fetch_task_failed="Error getting Google Task"
 gtask_create_task_failed="Error creating Google Task"
 gtask_modify_task_failed="Error modifying Google Task"
 gtask_delete_task_failed="Error deleting Google Task"
+gtask_list_all_open_failed="Error listing open Google Tasks"
+gtask_batch_failed="Error running batch Google Task operations"
+slack_list_conversations_failed="Error listing Slack conversations"
+slack_channel_info_failed="Error getting Slack channel info"
+slack_read_messages_failed="Error reading Slack channel messages"
+slack_thread_replies_failed="Error reading Slack thread replies"
+slack_user_info_failed="Error getting Slack user info"
+slack_list_users_failed="Error listing Slack users"
+slack_search_messages_failed="Error searching Slack channel messages"
+slack_search_mentions_failed="Error searching Slack mentions"
+slack_bot_membership_failed="Error checking Slack bot channel membership"
+slack_channel_members_failed="Error getting Slack channel members"
+slack_dm_channel_failed="Error getting Slack DM channel"
+slack_resolve_entity_failed="Error resolving Slack channel or user"
+slack_search_workspace_failed="Error searching Slack workspace"
 pensieve_search_failed="Error searching Pensieve chunks"
 pensieve_search_chat_failed="Error searching user's chat"
\ No newline at end of file
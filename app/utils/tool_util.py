@@ -2,6 +2,7 @@ from mcp.server.fastmcp import Context
 import importlib
 import pkgutil
 import logging
+from typing import List
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +10,13 @@ async def fetch_user_uuid(ctx: Context):
     header_dict = {k.decode().lower(): v.decode() for k, v in ctx.request_context.request.headers.raw}
     return header_dict.get("user_uuid")
 
+def account_tag(item: dict, items: List[dict]) -> str:
+    """
+    " [account]" suffix for one merged result, only when the results span more than one connected account.
+    """
+    accounts = {entry.get("account") for entry in items}
+    return f" [{item.get('account')}]" if len(accounts) > 1 else ""
+
 def load_package(package_name: str):
     """
     Dynamically imports all modules in a given package to trigger decorator registration.
@@ -1,35 +1,128 @@
 import asyncio
-from typing import List, Optional, Any
+import heapq
+import os
+from typing import Dict, List, Optional, Any
+
+from googleapiclient.errors import HttpError
 
 from app.config.logging_config import logger
-from app.decorators.retry_decorator import async_retryable
-from app.utils.application_constants import gcalendar_service_name, gcalendar_service_version
+from app.utils.application_constants import gcalendar_service_name, gcalendar_service_version, \
+    gcal_event_index_enabled_key, gcal_agenda_page_size, gcal_agenda_concurrency
 from app.webclients.gsuite.gcalendar.base import GoogleCalendarClientBase
-from app.webclients.gsuite.google_service_builder import generate_authenticated_client
+from app.webclients.gsuite.gcalendar.gcal_event_index import GoogleCalendarEventIndex
+from app.webclients.gsuite.gcalendar.gcal_util import event_start_key, build_event_body, event_occurrence_key
+from app.webclients.gsuite.google_batch import execute_batch
+from app.dto.calendar_event_operation import CalendarEventOperation
+from app.webclients.gsuite.google_service_builder import fan_out_google_accounts, generate_primary_authenticated_client, \
+    is_not_found
+from app.webclients.gsuite.google_rate_limiter import run_google_call
+
+agenda_calendars_fields = "items(id,summary,primary,selected),nextPageToken"
+
+
+async def list_event_pages(service, calendar_id: str, time_min: str, time_max: Optional[str], max_results: int,
+                           fields: Optional[str]) -> List[dict]:
+    """
+    Events of one calendar ordered by start, following nextPageToken until `max_results` events are collected.
+    `fields` must include nextPageToken.
+    """
+    events = []
+    page_token = None
+    while len(events) < max_results:
+        response = await run_google_call(
+            service.events().list(
+                calendarId=calendar_id,
+                timeMin=time_min,
+                timeMax=time_max,
+                maxResults=min(gcal_agenda_page_size, max_results - len(events)),
+                singleEvents=True,
+                orderBy="startTime",
+                pageToken=page_token,
+                fields=fields,
+            ).execute
+        )
+        events.extend(response.get("items", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+    return events[:max_results]
+
+
+def log_calendar_error(error: Exception, action: str) -> None:
+    """
+    Logs a failed call on a calendar by ID. A calendar other than "primary" is usually visible to only some of
+    the user's accounts, so a 404 from the others is expected and only logged at debug level.
+    """
+    if is_not_found(error):
+        logger.debug(f"Calendar API {action}: not found in this account")
+    else:
+        logger.error(f"Calendar API error {action}: {error}", exc_info=True)
+
+
+def validate_event_operation(operation: CalendarEventOperation) -> Optional[str]:
+    if operation.action == "create" and not (operation.summary and operation.start_time and operation.end_time):
+        return "create requires summary, start_time and end_time"
+    if operation.action in ("update", "delete") and not operation.event_id:
+        return f"{operation.action} requires event_id"
+    return None
+
+
+def event_operation_request(service, operation: CalendarEventOperation, fields: Optional[str]):
+    body = build_event_body(
+        operation.summary, operation.start_time, operation.end_time, operation.description, operation.location,
+        operation.attendees, operation.timezone
+    )
+    if operation.action == "create":
+        return service.events().insert(calendarId=operation.calendar_id, body=body, fields=fields)
+    if operation.action == "update":
+        # patch only touches the given fields, unlike update, which replaces the whole event.
+        request = service.events().patch(calendarId=operation.calendar_id, eventId=operation.event_id, body=body, fields=fields)
+    else:
+        request = service.events().delete(calendarId=operation.calendar_id, eventId=operation.event_id)
+    if operation.etag:
+        request.headers["If-Match"] = operation.etag
+    return request
+
+
+def describe_batch_error(error: Exception) -> str:
+    if isinstance(error, HttpError):
+        if error.resp.status == 412:
+            return "event changed since it was read (ETag mismatch); read it again before retrying"
+        return f"{error.resp.status}: {error.reason}"
+    return str(error)
 
 
 class GoogleCalendarClientImpl(GoogleCalendarClientBase):
+    def __init__(self):
+        index_enabled = os.getenv(gcal_event_index_enabled_key, "true").lower() == "true"
+        self.event_index = GoogleCalendarEventIndex() if index_enabled else None
 
-    @async_retryable()
-    async def list_calendars(self, user_uuid: str) -> Any:
-        services = await generate_authenticated_client(user_uuid, gcalendar_service_name, gcalendar_service_version)
-        for service in services:
+    async def list_calendars(self, user_uuid: str, fields: Optional[str] = None) -> Any:
+        async def fetch(service) -> list:
             try:
-                response = await asyncio.to_thread(
-                    service.calendarList().list().execute
+                response = await run_google_call(
+                    service.calendarList().list(fields=fields).execute
                 )
                 return response.get("items", [])
             except Exception as e:
                 logger.error(f"Calendar API error listing calendars: {e}", exc_info=True)
                 raise
 
+        results = await fan_out_google_accounts(user_uuid, gcalendar_service_name, gcalendar_service_version, fetch)
+        return [
+            {**calendar, "account": result.account}
+            for result in results if result.error is None
+            for calendar in result.result
+        ]
 
-    @async_retryable()
-    async def get_events(self, user_uuid: str, calendar_id: str, time_min: Optional[str], time_max: Optional[str], max_results: int) -> Any:
-        services = await generate_authenticated_client(user_uuid, gcalendar_service_name, gcalendar_service_version)
-        for service in services:
+    async def get_events(self, user_uuid: str, calendar_id: str, time_min: Optional[str], time_max: Optional[str], max_results: int, fields: Optional[str] = None) -> Any:
+        async def fetch(account: str, service) -> list:
+            if self.event_index:
+                indexed = await self.event_index.get_events(user_uuid, account, calendar_id, service, time_min, time_max, max_results)
+                if indexed is not None:
+                    return indexed
             try:
-                response = await asyncio.to_thread(
+                response = await run_google_call(
                     service.events().list(
                         calendarId=calendar_id,
                         timeMin=time_min,
@@ -37,84 +130,190 @@ class GoogleCalendarClientImpl(GoogleCalendarClientBase):
                         maxResults=max_results,
                         singleEvents=True,
                         orderBy="startTime",
+                        fields=fields,
                     ).execute
                 )
                 return response.get("items", [])
             except Exception as e:
-                logger.error(f"Calendar API error getting events: {e}", exc_info=True)
+                log_calendar_error(e, "getting events")
                 raise
 
-    @async_retryable()
-    async def create_event(self, user_uuid: str, summary: str, start_time: str, end_time: str, calendar_id: str = "primary",
-                           description: Optional[str] = None, location: Optional[str] = None, attendees: Optional[List[str]] = None, timezone: Optional[str] = None) -> Any:
-        services = await generate_authenticated_client(user_uuid, gcalendar_service_name, gcalendar_service_version)
-        for service in services:
+        results = await fan_out_google_accounts(user_uuid, gcalendar_service_name, gcalendar_service_version, fetch,
+                                                with_account=True)
+        events = [
+            {**event, "account": result.account}
+            for result in results if result.error is None
+            for event in result.result
+        ]
+        events.sort(key=event_start_key)
+        return events[:max_results]
+
+    async def get_agenda(self, user_uuid: str, calendar_ids: Optional[List[str]], time_min: str, time_max: Optional[str], max_results: int,
+                         fields: Optional[str] = None) -> Any:
+        async def fetch(account: str, service) -> Dict[str, Any]:
+            calendars = {calendar_id: calendar_id for calendar_id in calendar_ids or []}
+            if not calendars:
+                response = await run_google_call(
+                    service.calendarList().list(fields=agenda_calendars_fields).execute
+                )
+                calendars = {
+                    calendar["id"]: calendar.get("summary", calendar["id"])
+                    for calendar in response.get("items", []) if calendar.get("selected") or calendar.get("primary")
+                }
+            semaphore = asyncio.Semaphore(gcal_agenda_concurrency)
+
+            async def fetch_calendar(calendar_id: str) -> Optional[List[dict]]:
+                async with semaphore:
+                    try:
+                        if self.event_index:
+                            indexed = await self.event_index.get_events(user_uuid, account, calendar_id, service, time_min, time_max, max_results)
+                            if indexed is not None:
+                                return indexed
+                        return await list_event_pages(service, calendar_id, time_min, time_max, max_results, fields)
+                    except Exception as e:
+                        if is_not_found(e):
+                            logger.debug(f"Calendar {calendar_id} not found in account {account}")
+                        else:
+                            logger.warning(f"Calendar API error getting agenda of calendar {calendar_id} for account {account}: {e}")
+                        return None
+
+            streams = await asyncio.gather(*(fetch_calendar(calendar_id) for calendar_id in calendars))
+            return {
+                "streams": [
+                    [{**event, "calendar": calendars[calendar_id], "account": account} for event in stream]
+                    for calendar_id, stream in zip(calendars, streams) if stream is not None
+                ],
+                "read": {calendar_id for calendar_id, stream in zip(calendars, streams) if stream is not None},
+                "failed": {calendar_id for calendar_id, stream in zip(calendars, streams) if stream is None},
+            }
+
+        results = await fan_out_google_accounts(user_uuid, gcalendar_service_name, gcalendar_service_version, fetch,
+                                                with_account=True)
+        succeeded = [result.result for result in results if result.error is None]
+        # Each stream is already ordered by start, so a heap merge yields the global order lazily
+        # and stops as soon as the cap is reached.
+        merged = heapq.merge(*(stream for result in succeeded for stream in result["streams"]), key=event_start_key)
+        events = []
+        seen = set()
+        for event in merged:
+            key = event_occurrence_key(event)
+            if key in seen:
+                continue
+            seen.add(key)
+            events.append(event)
+            if len(events) >= max_results:
+                break
+        # A shared calendar may only be readable from some accounts; report it only when no account could read it.
+        failed = set().union(*(result["failed"] for result in succeeded)) - set().union(*(result["read"] for result in succeeded))
+        return {"events": events, "failed_calendars": sorted(failed)}
+
+    async def query_free_busy(self, user_uuid: str, time_min: str, time_max: str, calendar_ids: List[str], timezone: Optional[str],
+                              fields: Optional[str] = None) -> Any:
+        async def fetch(service) -> dict:
             try:
-                event_body = {
-                    "summary": summary,
-                    "start": {"dateTime": start_time} if "T" in start_time else {"date": start_time},
-                    "end": {"dateTime": end_time} if "T" in end_time else {"date": end_time},
+                body = {
+                    "timeMin": time_min,
+                    "timeMax": time_max,
+                    "items": [{"id": calendar_id} for calendar_id in calendar_ids],
                 }
-                if location:
-                    event_body["location"] = location
-                if description:
-                    event_body["description"] = description
                 if timezone:
-                    if "dateTime" in event_body["start"]:
-                        event_body["start"]["timeZone"] = timezone
-                    if "dateTime" in event_body["end"]:
-                        event_body["end"]["timeZone"] = timezone
-                if attendees:
-                    event_body["attendees"] = [{"email": email} for email in attendees]
-                created_event = await asyncio.to_thread(
-                    service.events().insert(calendarId=calendar_id, body=event_body).execute
+                    body["timeZone"] = timezone
+                response = await run_google_call(
+                    service.freebusy().query(body=body, fields=fields).execute
                 )
-                return created_event
+                return response.get("calendars", {})
             except Exception as e:
-                logger.error(f"Calendar API error creating event: {e}", exc_info=True)
+                logger.error(f"Calendar API error querying free/busy: {e}", exc_info=True)
                 raise
 
-    @async_retryable()
+        # The user is busy when any of their accounts is, so busy intervals of every account are kept.
+        results = await fan_out_google_accounts(user_uuid, gcalendar_service_name, gcalendar_service_version, fetch)
+        return [
+            {"calendar_id": calendar_id, "account": result.account, **calendar}
+            for result in results if result.error is None
+            for calendar_id, calendar in result.result.items()
+        ]
+
+    async def create_event(self, user_uuid: str, summary: str, start_time: str, end_time: str, calendar_id: str = "primary",
+                           description: Optional[str] = None, location: Optional[str] = None, attendees: Optional[List[str]] = None, timezone: Optional[str] = None,
+                           fields: Optional[str] = None) -> Any:
+        service = await generate_primary_authenticated_client(user_uuid, gcalendar_service_name, gcalendar_service_version)
+        try:
+            event_body = build_event_body(summary, start_time, end_time, description, location, attendees, timezone)
+            created_event = await run_google_call(
+                service.events().insert(calendarId=calendar_id, body=event_body, fields=fields).execute
+            )
+            return created_event
+        except Exception as e:
+            logger.error(f"Calendar API error creating event: {e}", exc_info=True)
+            raise
+        finally:
+            if self.event_index:
+                # "primary" and the calendar's own ID index separately, so every calendar of the user resyncs.
+                self.event_index.invalidate(user_uuid)
+
     async def modify_event(self, user_uuid: str, event_id: str, calendar_id: str = "primary", summary: Optional[str] = None,
                            start_time: Optional[str] = None, end_time: Optional[str] = None, description: Optional[str] = None,
-                           location: Optional[str] = None, attendees: Optional[List[str]] = None, timezone: Optional[str] = None) -> Any:
-        services = await generate_authenticated_client(user_uuid, gcalendar_service_name, gcalendar_service_version)
-        for service in services:
-            try:
-                event_body = {}
-                if summary is not None:
-                    event_body["summary"] = summary
-                if start_time is not None:
-                    event_body["start"] = {"dateTime": start_time} if "T" in start_time else {"date": start_time}
-                    if timezone and "dateTime" in event_body["start"]:
-                        event_body["start"]["timeZone"] = timezone
-                if end_time is not None:
-                    event_body["end"] = {"dateTime": end_time} if "T" in end_time else {"date": end_time}
-                    if timezone and "dateTime" in event_body["end"]:
-                        event_body["end"]["timeZone"] = timezone
-                if description is not None:
-                    event_body["description"] = description
-                if location is not None:
-                    event_body["location"] = location
-                if attendees is not None:
-                    event_body["attendees"] = [{"email": email} for email in attendees]
-                updated_event = await asyncio.to_thread(
-                    service.events().update(calendarId=calendar_id, eventId=event_id, body=event_body).execute
-                )
-                return updated_event
-            except Exception as e:
-                logger.error(f"Calendar API error modifying event: {e}", exc_info=True)
-                raise
+                           location: Optional[str] = None, attendees: Optional[List[str]] = None, timezone: Optional[str] = None,
+                           fields: Optional[str] = None) -> Any:
+        service = await generate_primary_authenticated_client(user_uuid, gcalendar_service_name, gcalendar_service_version)
+        try:
+            event_body = build_event_body(summary, start_time, end_time, description, location, attendees, timezone)
+            # The body only holds the given fields; update would clear every other field of the event.
+            updated_event = await run_google_call(
+                service.events().patch(calendarId=calendar_id, eventId=event_id, body=event_body, fields=fields).execute
+            )
+            return updated_event
+        except Exception as e:
+            logger.error(f"Calendar API error modifying event: {e}", exc_info=True)
+            raise
+        finally:
+            if self.event_index:
+                # "primary" and the calendar's own ID index separately, so every calendar of the user resyncs.
+                self.event_index.invalidate(user_uuid)
 
-    @async_retryable()
     async def delete_event(self, user_uuid: str, event_id: str, calendar_id: str = "primary") -> Any:
-        services = await generate_authenticated_client(user_uuid, gcalendar_service_name, gcalendar_service_version)
-        for service in services:
-            try:
-                await asyncio.to_thread(
-                    service.events().delete(calendarId=calendar_id, eventId=event_id).execute
-                )
-                return {"deleted": True, "event_id": event_id}
-            except Exception as e:
-                logger.error(f"Calendar API error deleting event: {e}", exc_info=True)
-                raise
+        service = await generate_primary_authenticated_client(user_uuid, gcalendar_service_name, gcalendar_service_version)
+        try:
+            await run_google_call(
+                service.events().delete(calendarId=calendar_id, eventId=event_id).execute
+            )
+            return {"deleted": True, "event_id": event_id}
+        except Exception as e:
+            logger.error(f"Calendar API error deleting event: {e}", exc_info=True)
+            raise
+        finally:
+            if self.event_index:
+                # "primary" and the calendar's own ID index separately, so every calendar of the user resyncs.
+                self.event_index.invalidate(user_uuid)
+
+    async def batch_events(self, user_uuid: str, operations: List[CalendarEventOperation], fields: Optional[str] = None) -> Any:
+        service = await generate_primary_authenticated_client(user_uuid, gcalendar_service_name, gcalendar_service_version)
+        results: List[dict] = [
+            {"index": index, "action": operation.action, "event_id": operation.event_id}
+            for index, operation in enumerate(operations)
+        ]
+        requests = []
+        pending = []
+        for index, operation in enumerate(operations):
+            error = validate_event_operation(operation)
+            if error:
+                results[index]["error"] = error
+                continue
+            requests.append(event_operation_request(service, operation, fields))
+            pending.append(index)
+        try:
+            for index, (response, error) in zip(pending, await execute_batch(service, requests)):
+                if error:
+                    results[index]["error"] = describe_batch_error(error)
+                    continue
+                results[index]["ok"] = True
+                if response:
+                    results[index].update({key: response[key] for key in ("id", "summary", "htmlLink") if key in response})
+            return results
+        except Exception as e:
+            logger.error(f"Calendar API error running batch event operations: {e}", exc_info=True)
+            raise
+        finally:
+            if self.event_index:
+                self.event_index.invalidate(user_uuid)
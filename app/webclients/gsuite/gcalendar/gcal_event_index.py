@@ -0,0 +1,246 @@
+import asyncio
+import bisect
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from app.config.logging_config import logger
+from app.utils.application_constants import gcal_index_max_calendars, gcal_index_max_events_per_calendar, \
+    gcal_index_freshness_seconds, gcal_index_lookback_days, gcal_index_lookahead_days, gcal_index_max_calendars_per_user
+from app.webclients.gsuite.gcalendar.gcal_util import parse_event_time
+from app.webclients.gsuite.google_rate_limiter import run_google_call
+
+# Event shape kept in the index; a superset of what the calendar tools format.
+index_event_fields = "id,status,iCalUID,originalStartTime,etag,summary,description,location,start,end,htmlLink,attendees(email,responseStatus)"
+sync_fields = f"items({index_event_fields}),timeZone,nextPageToken,nextSyncToken"
+sync_page_size = 2500
+
+
+def parse_query_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class _CalendarIndex:
+    """
+    Expanded (`singleEvents`) events of one calendar inside the synced window, ordered by start time.
+
+    `starts` holds (start, event_id) pairs sorted by start. An event overlapping [a, b) must start before b and,
+    because no event lasts longer than `max_duration`, no earlier than a - max_duration, so a window lookup is
+    one bisect plus a scan of the candidates in that range. All-day events start and end at midnight in the
+    calendar's time zone.
+    """
+
+    def __init__(self, window_start: datetime, window_end: datetime):
+        self.window_start = window_start
+        self.window_end = window_end
+        self.events: Dict[str, dict] = {}
+        self.bounds: Dict[str, Tuple[datetime, datetime]] = {}
+        self.starts: List[Tuple[datetime, str]] = []
+        self.timezone: Optional[str] = None
+        self.max_duration = timedelta(0)
+        self.sync_token: Optional[str] = None
+        self.synced_at = 0.0
+        self.failed_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    def is_fresh(self, freshness_seconds: float) -> bool:
+        return self.sync_token is not None and time.monotonic() - self.synced_at <= freshness_seconds
+
+    def reset(self) -> None:
+        self.events.clear()
+        self.bounds.clear()
+        self.starts.clear()
+        self.max_duration = timedelta(0)
+        self.sync_token = None
+
+    def apply(self, event: dict) -> None:
+        self.remove(event["id"])
+        if event.get("status") == "cancelled":
+            return
+        start = parse_event_time(event.get("start"), self.timezone)
+        end = parse_event_time(event.get("end"), self.timezone)
+        self.events[event["id"]] = event
+        self.bounds[event["id"]] = (start, end)
+        bisect.insort(self.starts, (start, event["id"]))
+        self.max_duration = max(self.max_duration, end - start)
+
+    def set_timezone(self, timezone_name: str) -> None:
+        """
+        Takes the calendar's time zone from a list response; a change re-places the all-day events.
+        """
+        if timezone_name == self.timezone:
+            return
+        self.timezone = timezone_name
+        events = list(self.events.values())
+        self.reset()
+        for event in events:
+            self.apply(event)
+
+    def remove(self, event_id: str) -> None:
+        if self.events.pop(event_id, None) is None:
+            return
+        start, _ = self.bounds.pop(event_id)
+        key = (start, event_id)
+        position = bisect.bisect_left(self.starts, key)
+        if position < len(self.starts) and self.starts[position] == key:
+            del self.starts[position]
+
+    def query(self, time_min: datetime, time_max: Optional[datetime], max_results: int) -> Optional[List[dict]]:
+        """
+        Events overlapping [time_min, time_max) ordered by start, or None when the synced window cannot
+        answer the query exactly.
+        """
+        if time_min < self.window_start:
+            return None
+        end_bound = min(time_max, self.window_end) if time_max else self.window_end
+        first = bisect.bisect_left(self.starts, (time_min - self.max_duration, ""))
+        last = bisect.bisect_left(self.starts, (end_bound, ""))
+        matches = []
+        for start, event_id in self.starts[first:last]:
+            if self.bounds[event_id][1] > time_min:
+                matches.append(self.events[event_id])
+                if len(matches) >= max_results:
+                    return matches
+        # Fewer than max_results events: the answer is only complete if the window covers the whole range.
+        if time_max is None or time_max > self.window_end:
+            return None
+        return matches
+
+
+class GoogleCalendarEventIndex:
+    """
+    Per-user, per-account, per-calendar index of expanded events, kept current through Calendar `syncToken`
+    incremental sync.
+
+    The first query of a calendar runs a full sync of the window [now - lookback, now + lookahead] and keeps the
+    returned `nextSyncToken`. Queries served within `freshness_seconds` of the last sync are answered locally;
+    older ones first send an incremental `events.list(syncToken=...)`, which only returns changed and cancelled
+    events. A 410 Gone means the token expired, so the calendar is resynced from scratch. Queries the synced window
+    cannot answer exactly return None and the caller asks the API directly.
+    At most `max_calendars` calendars are indexed, and at most `max_calendars_per_user` of them for one user,
+    so a user with many shared calendars cannot push everyone else out.
+    """
+
+    def __init__(
+            self,
+            max_calendars: int = gcal_index_max_calendars,
+            max_events_per_calendar: int = gcal_index_max_events_per_calendar,
+            freshness_seconds: float = gcal_index_freshness_seconds,
+            lookback_days: int = gcal_index_lookback_days,
+            lookahead_days: int = gcal_index_lookahead_days,
+            max_calendars_per_user: int = gcal_index_max_calendars_per_user
+    ):
+        self.max_calendars = max_calendars
+        self.max_calendars_per_user = max_calendars_per_user
+        self.max_events_per_calendar = max_events_per_calendar
+        self.freshness_seconds = freshness_seconds
+        self.lookback = timedelta(days=lookback_days)
+        self.lookahead = timedelta(days=lookahead_days)
+        self._calendars: "OrderedDict[Tuple[str, str, str], _CalendarIndex]" = OrderedDict()
+
+    async def get_events(self, user_uuid: str, account: str, calendar_id: str, service, time_min: Optional[str],
+                         time_max: Optional[str], max_results: int) -> Optional[List[dict]]:
+        query_min = parse_query_time(time_min)
+        query_max = parse_query_time(time_max)
+        if query_min is None or (time_max and query_max is None):
+            return None
+        index = self._calendar(user_uuid, account, calendar_id)
+        async with index.lock:
+            if index.failed_at is not None and time.monotonic() - index.failed_at <= self.freshness_seconds:
+                return None
+            if not index.is_fresh(self.freshness_seconds):
+                try:
+                    await self._sync(service, calendar_id, index)
+                    index.failed_at = None
+                except Exception as e:
+                    logger.warning(f"Calendar index sync failed for user {user_uuid}, calendar {calendar_id}: {e}")
+                    index.reset()
+                    index.failed_at = time.monotonic()
+                    return None
+            if index.sync_token is None:
+                return None
+            return index.query(query_min, query_max, max_results)
+
+    def invalidate(self, user_uuid: str) -> None:
+        """
+        Marks the user's calendars stale so the next query syncs the change made through this service first.
+        """
+        for (index_user, _, _), index in self._calendars.items():
+            if index_user == user_uuid:
+                index.synced_at = 0.0
+
+    def _calendar(self, user_uuid: str, account: str, calendar_id: str) -> _CalendarIndex:
+        key = (user_uuid, account, calendar_id)
+        index = self._calendars.get(key)
+        if index is None:
+            now = datetime.now(timezone.utc)
+            index = _CalendarIndex(now - self.lookback, now + self.lookahead)
+            self._calendars[key] = index
+            user_keys = [cached for cached in self._calendars if cached[0] == user_uuid]
+            for evicted in user_keys[:max(0, len(user_keys) - self.max_calendars_per_user)]:
+                del self._calendars[evicted]
+            while len(self._calendars) > self.max_calendars:
+                self._calendars.popitem(last=False)
+        self._calendars.move_to_end(key)
+        return index
+
+    async def _sync(self, service, calendar_id: str, index: _CalendarIndex) -> None:
+        if index.sync_token is None:
+            await self._full_sync(service, calendar_id, index)
+            return
+        try:
+            sync_token = await self._list_pages(service, index, calendarId=calendar_id, syncToken=index.sync_token)
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            # The sync token expired; drop the calendar and sync it again from scratch.
+            await self._full_sync(service, calendar_id, index)
+            return
+        index.sync_token = sync_token
+        index.synced_at = time.monotonic()
+
+    async def _full_sync(self, service, calendar_id: str, index: _CalendarIndex) -> None:
+        index.reset()
+        now = datetime.now(timezone.utc)
+        index.window_start = now - self.lookback
+        index.window_end = now + self.lookahead
+        index.sync_token = await self._list_pages(
+            service,
+            index,
+            calendarId=calendar_id,
+            timeMin=index.window_start.isoformat(),
+            timeMax=index.window_end.isoformat(),
+        )
+        index.synced_at = time.monotonic()
+
+    async def _list_pages(self, service, index: _CalendarIndex, **params) -> str:
+        page_token = None
+        while True:
+            response = await run_google_call(
+                service.events().list(
+                    singleEvents=True,
+                    showDeleted=True,
+                    maxResults=sync_page_size,
+                    pageToken=page_token,
+                    fields=sync_fields,
+                    **params
+                ).execute
+            )
+            if response.get("timeZone"):
+                index.set_timezone(response["timeZone"])
+            for event in response.get("items", []):
+                index.apply(event)
+            if len(index.events) > self.max_events_per_calendar:
+                raise OverflowError(f"calendar has more than {self.max_events_per_calendar} events in the index window")
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return response.get("nextSyncToken")
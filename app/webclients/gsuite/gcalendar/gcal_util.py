@@ -0,0 +1,123 @@
+from datetime import datetime, time as dt_time, timedelta, timezone, tzinfo
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+def event_tzinfo(timezone_name: Optional[str]) -> tzinfo:
+    try:
+        return ZoneInfo(timezone_name) if timezone_name else timezone.utc
+    except (ValueError, ZoneInfoNotFoundError):
+        return timezone.utc
+
+
+def parse_event_time(value: dict, calendar_timezone: Optional[str] = None) -> datetime:
+    """
+    Parses an event `start`/`end` object. All-day events carry only a `date`, which starts at midnight in the
+    event's own time zone, else in `calendar_timezone` (the `timeZone` of the events.list response), else UTC.
+    """
+    value = value or {}
+    try:
+        if value.get("dateTime"):
+            parsed = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=event_tzinfo(value.get("timeZone") or calendar_timezone))
+        if value.get("date"):
+            return datetime.fromisoformat(value["date"]).replace(tzinfo=event_tzinfo(value.get("timeZone") or calendar_timezone))
+    except ValueError:
+        pass
+    return datetime.max.replace(tzinfo=timezone.utc)
+
+
+def event_time(value: str, timezone_name: Optional[str]) -> dict:
+    time_value = {"dateTime": value} if "T" in value else {"date": value}
+    if timezone_name and "dateTime" in time_value:
+        time_value["timeZone"] = timezone_name
+    return time_value
+
+
+def build_event_body(summary: Optional[str] = None, start_time: Optional[str] = None, end_time: Optional[str] = None,
+                     description: Optional[str] = None, location: Optional[str] = None,
+                     attendees: Optional[List[str]] = None, timezone_name: Optional[str] = None) -> dict:
+    """
+    Event resource holding only the given fields, usable both for insert and for patch.
+    """
+    event_body = {}
+    if summary is not None:
+        event_body["summary"] = summary
+    if start_time is not None:
+        event_body["start"] = event_time(start_time, timezone_name)
+    if end_time is not None:
+        event_body["end"] = event_time(end_time, timezone_name)
+    if description is not None:
+        event_body["description"] = description
+    if location is not None:
+        event_body["location"] = location
+    if attendees is not None:
+        event_body["attendees"] = [{"email": email} for email in attendees]
+    return event_body
+
+
+def event_start_key(event: dict) -> datetime:
+    return parse_event_time(event.get("start"))
+
+
+def event_occurrence_key(event: dict) -> Tuple[str, datetime]:
+    """
+    Identifies one occurrence of an event across accounts and calendars. Instances of a recurring event share
+    their iCalUID, so the occurrence's original start tells them apart.
+    """
+    return event.get("iCalUID") or event.get("id"), parse_event_time(event.get("originalStartTime") or event.get("start"))
+
+
+def merge_intervals(intervals: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """
+    Sort-and-sweep union of possibly overlapping intervals; touching intervals are joined.
+    """
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def working_windows(window_start: datetime, window_end: datetime, tz: tzinfo, day_start: dt_time,
+                    day_end: dt_time) -> List[Tuple[datetime, datetime]]:
+    """
+    Daily working-hour intervals in `tz`, clipped to [window_start, window_end).
+    """
+    windows = []
+    day = window_start.astimezone(tz).date()
+    last_day = window_end.astimezone(tz).date()
+    while day <= last_day:
+        start = max(datetime.combine(day, day_start, tz), window_start)
+        end = min(datetime.combine(day, day_end, tz), window_end)
+        if start < end:
+            windows.append((start, end))
+        day += timedelta(days=1)
+    return windows
+
+
+def free_slots(busy: List[Tuple[datetime, datetime]], windows: List[Tuple[datetime, datetime]],
+               min_duration: timedelta) -> List[Tuple[datetime, datetime]]:
+    """
+    Gaps of at least `min_duration` inside `windows` not covered by `busy`. Both inputs must be sorted and
+    non-overlapping (see `merge_intervals`), so one pass over each list suffices.
+    """
+    slots = []
+    position = 0
+    for window_start, window_end in windows:
+        while position < len(busy) and busy[position][1] <= window_start:
+            position += 1
+        cursor = window_start
+        scan = position
+        while scan < len(busy) and busy[scan][0] < window_end:
+            busy_start, busy_end = busy[scan]
+            if busy_start - cursor >= min_duration:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            scan += 1
+        if window_end - cursor >= min_duration:
+            slots.append((cursor, window_end))
+    return slots
@@ -1,271 +1,460 @@
 import asyncio
 import base64
+import heapq
 import logging
+import os
+from datetime import datetime, timezone
 from email.mime.text import MIMEText
-from typing import List, Optional, Literal, Any
-from app.decorators.retry_decorator import async_retryable
+from email.utils import parsedate_to_datetime
+from itertools import islice
+from typing import Dict, List, Optional, Literal, Any
+
+
+from app.webclients.gsuite.gmail.gmail_mirror import GmailMirror
 from app.webclients.gsuite.gmail.gmail_util import (
+    attachment_payload,
+    build_message_record,
+    extract_attachment,
     extract_message_body,
     extract_headers,
     generate_gmail_web_url,
 )
-from app.webclients.gsuite.google_service_builder import generate_authenticated_client
+from app.webclients.gsuite.google_batch import execute_batch
+from app.webclients.gsuite.google_service_builder import generate_authenticated_accounts, \
+    generate_primary_authenticated_client, fan_out_google_accounts, first_account_result, is_not_found
 from app.webclients.gsuite.gmail.base import GmailClientBase
-from app.utils.application_constants import gmail_service_name, gmail_service_version
+from app.utils.application_constants import gmail_service_name, gmail_service_version, gmail_list_max_page_size, \
+    gmail_mirror_enabled_key
+from app.webclients.gsuite.google_rate_limiter import run_google_call
 
 
 logger = logging.getLogger(__name__)
 
-class GmailClientImpl(GmailClientBase):
+message_ids_fields = "messages(id),nextPageToken"
+
+
+async def list_messages(service, query: str, page_size: int, fields: Optional[str] = None) -> List[dict]:
+    """
+    Pages through messages().list, following nextPageToken until `page_size` messages are collected.
+    """
+    messages = []
+    page_token = None
+    while len(messages) < page_size:
+        response = await run_google_call(
+            service.users().messages().list(
+                userId="me",
+                q=query,
+                maxResults=min(page_size - len(messages), gmail_list_max_page_size),
+                pageToken=page_token,
+                fields=fields,
+            ).execute
+        )
+        messages.extend(response.get("messages", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+    return messages[:page_size]
+
+
+def log_by_id_error(error: Exception, action: str) -> None:
+    """
+    Logs a failed read or write of a message or thread by ID. IDs exist in only one of the user's accounts,
+    so a 404 from every other account is expected and only logged at debug level.
+    """
+    if is_not_found(error):
+        logger.debug(f"Gmail {action}: not found in this account")
+    else:
+        logger.error(f"Gmail API error {action}: {error}", exc_info=True)
+
+
+def message_id_key(message: dict) -> int:
+    # Gmail message IDs are hex numbers that grow with the time the message was received.
+    try:
+        return int(message.get("id") or "0", 16)
+    except ValueError:
+        return 0
+
 
-    @async_retryable()
-    async def search_messages(self, user_uuid: str, query: str, page_size: int = 10) -> Any:
-        gmail_authenticated_clients = await generate_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
+def message_date_key(message: dict) -> datetime:
+    try:
+        date = parsedate_to_datetime(message.get("date") or "")
+        return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return datetime.min.replace(tzinfo=timezone.utc)
+
+
+def to_message_content(record: dict, account: str) -> dict:
+    return {
+        "subject": record["subject"] or "(no subject)",
+        "from": record["from"] or "(unknown sender)",
+        "body": record["body"],
+        "id": record["id"],
+        "web_url": generate_gmail_web_url(record["id"]),
+        "account": account
+    }
+
+
+def to_thread_message(record: dict, account: str) -> dict:
+    return {
+        "from": record["from"],
+        "date": record["date"],
+        "subject": record["subject"],
+        "body": record["body"],
+        "account": account
+    }
+
+
+async def account_authenticated_client(user_uuid: str, account: str):
+    accounts = await generate_authenticated_accounts(user_uuid, gmail_service_name, gmail_service_version)
+    return next((service for label, service in accounts if label == account), None)
+
+
+class GmailClientImpl(GmailClientBase):
+    def __init__(self):
+        mirror_enabled = os.getenv(gmail_mirror_enabled_key, "false").lower() == "true"
+        self.mirror = GmailMirror(account_authenticated_client) if mirror_enabled else None
 
-        for service in gmail_authenticated_clients:
+    async def search_messages(self, user_uuid: str, query: str, page_size: int = 10, fields: Optional[str] = None) -> Any:
+        async def search(service) -> List[dict]:
             try:
-                response = await asyncio.to_thread(
-                    service.users().messages().list(userId="me", q=query, maxResults=page_size).execute
-                )
-                messages = response.get("messages", [])
-                return messages
+                return await list_messages(service, query, page_size, fields)
             except Exception as e:
                 logger.error(f"Gmail API error searching messages: {e}", exc_info=True)
                 raise
 
-    @async_retryable()
-    async def get_message_content(self, user_uuid: str, message_id: str) -> Any:
-        gmail_authenticated_clients = await generate_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
+        results = await fan_out_google_accounts(user_uuid, gmail_service_name, gmail_service_version, search)
+        # Each account's list is newest first; the merge keeps the newest `page_size` across accounts.
+        merged = heapq.merge(
+            *([{**message, "account": result.account} for message in result.result]
+              for result in results if result.error is None),
+            key=message_id_key, reverse=True
+        )
+        return list(islice(merged, page_size))
 
-        for service in gmail_authenticated_clients:
+    async def search_messages_with_metadata(self, user_uuid: str, query: str, page_size: int = 10, fields: Optional[str] = None) -> Any:
+        async def search(service) -> List[dict]:
             try:
-                message_metadata = await asyncio.to_thread(
+                messages = await list_messages(service, query, page_size, message_ids_fields)
+                requests = [
                     service.users().messages().get(
                         userId="me",
-                        id=message_id,
+                        id=msg["id"],
                         format="metadata",
-                        metadataHeaders=["Subject", "From"],
-                    ).execute
-                )
+                        metadataHeaders=["Subject", "From", "Date"],
+                        fields=fields,
+                    )
+                    for msg in messages
+                ]
+                output_messages = []
+                for msg, (response, error) in zip(messages, await execute_batch(service, requests)):
+                    if error:
+                        logger.warning(f"Error retrieving metadata for message {msg['id']}: {error}")
+                        output_messages.append({"id": msg["id"], "error": str(error)})
+                        continue
+                    headers = extract_headers(response.get("payload", {}), ["Subject", "From", "Date"])
+                    output_messages.append({
+                        "id": msg["id"],
+                        "thread_id": response.get("threadId"),
+                        "date": headers.get("Date", ""),
+                        "from": headers.get("From", "(unknown sender)"),
+                        "subject": headers.get("Subject", "(no subject)"),
+                        "snippet": response.get("snippet", ""),
+                    })
+                return output_messages
+            except Exception as e:
+                logger.error(f"Gmail API error searching messages with metadata: {e}", exc_info=True)
+                raise
 
-                headers = {
-                    h["name"]: h["value"]
-                    for h in message_metadata.get("payload", {}).get("headers", [])
-                }
-                subject = headers.get("Subject", "(no subject)")
-                sender = headers.get("From", "(unknown sender)")
+        results = await fan_out_google_accounts(user_uuid, gmail_service_name, gmail_service_version, search)
+        merged = [
+            {**message, "account": result.account}
+            for result in results if result.error is None
+            for message in result.result
+        ]
+        merged.sort(key=message_date_key, reverse=True)
+        return merged[:page_size]
 
-                message_full = await asyncio.to_thread(
+    async def get_message_content(self, user_uuid: str, message_id: str, fields: Optional[str] = None) -> Any:
+        if self.mirror:
+            cached = self.mirror.get_message(user_uuid, message_id)
+            if cached:
+                account, record = cached
+                return to_message_content(record, account)
+
+        async def fetch(service) -> dict:
+            try:
+                message_full = await run_google_call(
                     service.users().messages().get(
                         userId="me",
                         id=message_id,
                         format="full",
+                        fields=fields,
                     ).execute
                 )
-                payload = message_full.get("payload", {})
-                body_data = extract_message_body(payload)
-
-                return {
-                    "subject": subject,
-                    "from": sender,
-                    "body": body_data,
-                    "id": message_id,
-                    "web_url": generate_gmail_web_url(message_id)
-                }
+                return build_message_record({"id": message_id, **message_full})
             except Exception as e:
-                logger.error(f"Gmail API error getting message content: {e}", exc_info=True)
+                log_by_id_error(e, "getting message content")
                 raise
 
-    @async_retryable()
-    async def get_messages_content_batch(self, user_uuid: str, message_ids: List[str], format: Literal["full", "metadata"] = "full") -> Any:
-        gmail_authenticated_clients = await generate_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
-
-        for service in gmail_authenticated_clients:
-            output_messages = []
-            for mid in message_ids:
-                try:
-                    if format == "metadata":
-                        msg = await asyncio.to_thread(
-                            service.users().messages().get(
-                                userId="me",
-                                id=mid,
-                                format="metadata",
-                                metadataHeaders=["Subject", "From"]
-                            ).execute
-                        )
-                    else:
-                        msg = await asyncio.to_thread(
-                            service.users().messages().get(
-                                userId="me",
-                                id=mid,
-                                format="full"
-                            ).execute
-                        )
-                    payload = msg.get("payload", {})
-                    if format == "metadata":
-                        headers = extract_headers(payload, ["Subject", "From"])
-                        output_messages.append({
-                            "id": mid,
-                            "subject": headers.get("Subject", "(no subject)"),
-                            "from": headers.get("From", "(unknown sender)"),
-                            "web_url": generate_gmail_web_url(mid)
-                        })
-                    else:
-                        headers = extract_headers(payload, ["Subject", "From"])
-                        body = extract_message_body(payload)
-                        output_messages.append({
-                            "id": mid,
-                            "subject": headers.get("Subject", "(no subject)"),
-                            "from": headers.get("From", "(unknown sender)"),
-                            "body": body,
-                            "web_url": generate_gmail_web_url(mid)
-                        })
-                except Exception as e:
-                    logger.warning(f"Error retrieving message {mid}: {e}")
-                    output_messages.append({"id": mid, "error": str(e)})
-            return output_messages
-
-    @async_retryable()
-    async def send_message(self, user_uuid: str, to: str, subject: str, body: str) -> Any:
-        gmail_authenticated_clients = await generate_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
-
-        for service in gmail_authenticated_clients:
-            try:
-                message = MIMEText(body)
-                message["to"] = to
-                message["subject"] = subject
-                raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-                send_body = {"raw": raw_message}
-                sent_message = await asyncio.to_thread(
-                    service.users().messages().send(userId="me", body=send_body).execute
-                )
-                return sent_message.get("id")
-            except Exception as e:
-                logger.error(f"Gmail API error sending message: {e}", exc_info=True)
-                raise
+        results = await fan_out_google_accounts(user_uuid, gmail_service_name, gmail_service_version, fetch)
+        account, record = first_account_result(results)
+        if record is None:
+            return None
+        if self.mirror:
+            self.mirror.put_message(user_uuid, account, record)
+        return to_message_content(record, account)
 
-    @async_retryable()
-    async def draft_message(self, user_uuid: str, subject: str, body: str, to: Optional[str] = None) -> Any:
-        gmail_authenticated_clients = await generate_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
+    async def get_messages_content_batch(self, user_uuid: str, message_ids: List[str], format: Literal["full", "metadata"] = "full",
+                                         fields: Optional[str] = None) -> Any:
+        async def fetch(service) -> List[tuple]:
+            if format == "metadata":
+                requests = [
+                    service.users().messages().get(
+                        userId="me",
+                        id=mid,
+                        format="metadata",
+                        metadataHeaders=["Subject", "From"],
+                        fields=fields
+                    )
+                    for mid in message_ids
+                ]
+            else:
+                requests = [
+                    service.users().messages().get(
+                        userId="me",
+                        id=mid,
+                        format="full",
+                        fields=fields
+                    )
+                    for mid in message_ids
+                ]
+            return await execute_batch(service, requests)
 
-        for service in gmail_authenticated_clients:
+        results = await fan_out_google_accounts(user_uuid, gmail_service_name, gmail_service_version, fetch)
+        output_messages = []
+        for index, mid in enumerate(message_ids):
+            # Message IDs belong to exactly one account; take the account that returned it.
+            owner = next(
+                ((result.account, result.result[index][0]) for result in results
+                 if result.error is None and result.result[index][1] is None),
+                None
+            )
+            if owner is None:
+                error = next((result.result[index][1] for result in results if result.error is None), None)
+                logger.warning(f"Error retrieving message {mid}: {error}")
+                output_messages.append({"id": mid, "error": str(error)})
+                continue
+            account, msg = owner
+            payload = msg.get("payload", {})
+            headers = extract_headers(payload, ["Subject", "From"])
+            output_message = {
+                "id": mid,
+                "subject": headers.get("Subject", "(no subject)"),
+                "from": headers.get("From", "(unknown sender)"),
+                "web_url": generate_gmail_web_url(mid),
+                "account": account
+            }
+            if format != "metadata":
+                output_message["body"] = extract_message_body(payload)
+            output_messages.append(output_message)
+        return output_messages
+
+    async def get_attachment(self, user_uuid: str, message_id: str, attachment_id: str, filename: Optional[str] = None,
+                             mime_type: Optional[str] = None, fields: Optional[str] = None) -> Any:
+        async def fetch(service) -> bytes:
             try:
-                message = MIMEText(body)
-                message["subject"] = subject
-                if to:
-                    message["to"] = to
-                raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-                draft_body = {"message": {"raw": raw_message}}
-                created_draft = await asyncio.to_thread(
-                    service.users().drafts().create(userId="me", body=draft_body).execute
+                request = service.users().messages().attachments().get(
+                    userId="me",
+                    messageId=message_id,
+                    id=attachment_id,
+                    fields=fields,
                 )
-                return created_draft.get("id")
+                # Kept as the raw body: JSON-decoding it would hold a second full copy of the base64 data.
+                request.postproc = lambda response, content: content
+                return await run_google_call(request.execute)
             except Exception as e:
-                logger.error(f"Gmail API error creating draft: {e}", exc_info=True)
+                log_by_id_error(e, "getting attachment")
                 raise
 
-    @async_retryable()
-    async def get_thread_content(self, user_uuid: str, thread_id: str) -> Any:
-        gmail_authenticated_clients = await generate_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
+        def extract(content: bytes) -> dict:
+            size, data = attachment_payload(content)
+            return {"size": size, **extract_attachment(data, filename, mime_type)}
+
+        results = await fan_out_google_accounts(user_uuid, gmail_service_name, gmail_service_version, fetch)
+        account, content = first_account_result(results)
+        if content is None:
+            return None
+        # CPU-bound decoding stays off the Google API worker pool, which is sized for rate-limited I/O.
+        extracted = await asyncio.to_thread(extract, content)
+        del content
+        return {
+            "message_id": message_id,
+            "attachment_id": attachment_id,
+            "filename": filename,
+            "mime_type": mime_type,
+            "account": account,
+            **extracted
+        }
+
+    async def send_message(self, user_uuid: str, to: str, subject: str, body: str, fields: Optional[str] = None) -> Any:
+        service = await generate_primary_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
+        try:
+            message = MIMEText(body)
+            message["to"] = to
+            message["subject"] = subject
+            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+            send_body = {"raw": raw_message}
+            sent_message = await run_google_call(
+                service.users().messages().send(userId="me", body=send_body, fields=fields).execute
+            )
+            return sent_message.get("id")
+        except Exception as e:
+            logger.error(f"Gmail API error sending message: {e}", exc_info=True)
+            raise
+
+    async def draft_message(self, user_uuid: str, subject: str, body: str, to: Optional[str] = None, fields: Optional[str] = None) -> Any:
+        service = await generate_primary_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
+        try:
+            message = MIMEText(body)
+            message["subject"] = subject
+            if to:
+                message["to"] = to
+            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+            draft_body = {"message": {"raw": raw_message}}
+            created_draft = await run_google_call(
+                service.users().drafts().create(userId="me", body=draft_body, fields=fields).execute
+            )
+            return created_draft.get("id")
+        except Exception as e:
+            logger.error(f"Gmail API error creating draft: {e}", exc_info=True)
+            raise
 
-        for service in gmail_authenticated_clients:
+    async def get_thread_content(self, user_uuid: str, thread_id: str, fields: Optional[str] = None) -> Any:
+        if self.mirror:
+            cached = self.mirror.get_thread(user_uuid, thread_id)
+            if cached is not None:
+                account, records = cached
+                return [to_thread_message(record, account) for record in records]
+
+        async def fetch(service) -> Dict[str, Any]:
             try:
-                thread_response = await asyncio.to_thread(
-                    service.users().threads().get(userId="me", id=thread_id, format="full").execute
+                thread_response = await run_google_call(
+                    service.users().threads().get(userId="me", id=thread_id, format="full", fields=fields).execute
                 )
-                messages = thread_response.get("messages", [])
-                thread_content = []
-                for message in messages:
-                    payload = message.get("payload", {})
-                    headers = extract_headers(payload, ["Subject", "From", "Date"])
-                    body = extract_message_body(payload)
-                    thread_content.append({
-                        "from": headers.get("From"),
-                        "date": headers.get("Date"),
-                        "subject": headers.get("Subject"),
-                        "body": body
-                    })
-                return thread_content
+                return {
+                    "history_id": thread_response.get("historyId"),
+                    "records": [
+                        build_message_record({"threadId": thread_id, **message})
+                        for message in thread_response.get("messages", [])
+                    ],
+                }
             except Exception as e:
-                logger.error(f"Gmail API error getting thread content: {e}", exc_info=True)
+                log_by_id_error(e, "getting thread content")
                 raise
 
-    @async_retryable()
-    async def list_labels(self, user_uuid: str) -> Any:
-        gmail_authenticated_clients = await generate_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
+        results = await fan_out_google_accounts(user_uuid, gmail_service_name, gmail_service_version, fetch)
+        account, thread = first_account_result(results)
+        if thread is None:
+            return []
+        records = thread["records"]
+        if self.mirror and all(record["id"] for record in records):
+            self.mirror.put_thread(user_uuid, account, thread_id, records, thread["history_id"])
+        return [to_thread_message(record, account) for record in records]
 
-        for service in gmail_authenticated_clients:
+    async def list_labels(self, user_uuid: str, fields: Optional[str] = None) -> Any:
+        if self.mirror:
+            cached = self.mirror.get_labels(user_uuid, fields)
+            if cached is not None:
+                return [{**label, "account": account} for account, labels in cached for label in labels]
+
+        async def fetch(service) -> list:
             try:
-                response = await asyncio.to_thread(
-                    service.users().labels().list(userId="me").execute
+                response = await run_google_call(
+                    service.users().labels().list(userId="me", fields=fields).execute
                 )
                 return response.get("labels", [])
             except Exception as e:
                 logger.error(f"Gmail API error listing labels: {e}", exc_info=True)
                 raise
 
-    @async_retryable()
+        results = await fan_out_google_accounts(user_uuid, gmail_service_name, gmail_service_version, fetch)
+        if self.mirror:
+            self.mirror.set_accounts(user_uuid, [result.account for result in results])
+            for result in results:
+                if result.error is None:
+                    self.mirror.put_labels(user_uuid, result.account, fields, result.result)
+        return [
+            {**label, "account": result.account}
+            for result in results if result.error is None
+            for label in result.result
+        ]
+
     async def manage_label(self, user_uuid: str, action: Literal["create", "update", "delete"], name: Optional[str] = None,
                            label_id: Optional[str] = None, label_list_visibility: Literal["labelShow", "labelHide"] = "labelShow",
-                           message_list_visibility: Literal["show", "hide"] = "show") -> Any:
-        gmail_authenticated_clients = await generate_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
-
-        for service in gmail_authenticated_clients:
-            try:
-                if action == "create":
-                    label_object = {
-                        "name": name,
-                        "labelListVisibility": label_list_visibility,
-                        "messageListVisibility": message_list_visibility,
-                    }
-                    created_label = await asyncio.to_thread(
-                        service.users().labels().create(userId="me", body=label_object).execute
-                    )
-                    return created_label
+                           message_list_visibility: Literal["show", "hide"] = "show", fields: Optional[str] = None) -> Any:
+        # Label IDs such as system labels exist in every account, so label management stays on the primary account.
+        service = await generate_primary_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
+        try:
+            if action == "create":
+                label_object = {
+                    "name": name,
+                    "labelListVisibility": label_list_visibility,
+                    "messageListVisibility": message_list_visibility,
+                }
+                created_label = await run_google_call(
+                    service.users().labels().create(userId="me", body=label_object, fields=fields).execute
+                )
+                return created_label
 
-                elif action == "update":
-                    current_label = await asyncio.to_thread(
-                        service.users().labels().get(userId="me", id=label_id).execute
-                    )
-                    label_object = {
-                        "id": label_id,
-                        "name": name if name is not None else current_label["name"],
-                        "labelListVisibility": label_list_visibility,
-                        "messageListVisibility": message_list_visibility,
-                    }
-                    updated_label = await asyncio.to_thread(
-                        service.users().labels().update(userId="me", id=label_id, body=label_object).execute
-                    )
-                    return updated_label
+            elif action == "update":
+                current_label = await run_google_call(
+                    service.users().labels().get(userId="me", id=label_id, fields="name").execute
+                )
+                label_object = {
+                    "id": label_id,
+                    "name": name if name is not None else current_label["name"],
+                    "labelListVisibility": label_list_visibility,
+                    "messageListVisibility": message_list_visibility,
+                }
+                updated_label = await run_google_call(
+                    service.users().labels().update(userId="me", id=label_id, body=label_object, fields=fields).execute
+                )
+                return updated_label
 
-                elif action == "delete":
-                    label = await asyncio.to_thread(
-                        service.users().labels().get(userId="me", id=label_id).execute
-                    )
-                    await asyncio.to_thread(
-                        service.users().labels().delete(userId="me", id=label_id).execute
-                    )
-                    return {"deleted": True, "name": label["name"], "id": label_id}
-            except Exception as e:
-                logger.error(f"Gmail API error managing label: {e}", exc_info=True)
-                raise
+            elif action == "delete":
+                label = await run_google_call(
+                    service.users().labels().get(userId="me", id=label_id, fields="name").execute
+                )
+                await run_google_call(
+                    service.users().labels().delete(userId="me", id=label_id).execute
+                )
+                return {"deleted": True, "name": label["name"], "id": label_id}
+        except Exception as e:
+            logger.error(f"Gmail API error managing label: {e}", exc_info=True)
+            raise
+        finally:
+            if self.mirror:
+                self.mirror.invalidate_labels(user_uuid)
 
-    @async_retryable()
     async def modify_message_labels(self, user_uuid: str, message_id: str, add_label_ids: Optional[List[str]] = None,
-                                    remove_label_ids: Optional[List[str]] = None) -> Any:
-        gmail_authenticated_clients = await generate_authenticated_client(user_uuid, gmail_service_name, gmail_service_version)
+                                    remove_label_ids: Optional[List[str]] = None, fields: Optional[str] = None) -> Any:
+        body = {}
+        if add_label_ids:
+            body["addLabelIds"] = add_label_ids
+        if remove_label_ids:
+            body["removeLabelIds"] = remove_label_ids
 
-        for service in gmail_authenticated_clients:
+        async def modify(service) -> dict:
             try:
-                body = {}
-                if add_label_ids:
-                    body["addLabelIds"] = add_label_ids
-                if remove_label_ids:
-                    body["removeLabelIds"] = remove_label_ids
-                result = await asyncio.to_thread(
-                    service.users().messages().modify(userId="me", id=message_id, body=body).execute
+                return await run_google_call(
+                    service.users().messages().modify(userId="me", id=message_id, body=body, fields=fields).execute
                 )
-                return result
             except Exception as e:
-                logger.error(f"Gmail API error modifying message labels: {e}", exc_info=True)
+                log_by_id_error(e, "modifying message labels")
                 raise
+
+        # Message IDs are unique per account, so only the owning account applies the change.
+        results = await fan_out_google_accounts(user_uuid, gmail_service_name, gmail_service_version, modify,
+                                                deadline_seconds=None)
+        _, result = first_account_result(results)
+        return result
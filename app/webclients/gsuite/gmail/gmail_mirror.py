@@ -0,0 +1,266 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from app.config.logging_config import logger
+from app.utils.application_constants import gmail_mirror_max_mailboxes, gmail_mirror_max_messages_per_user, \
+    gmail_mirror_freshness_seconds, gmail_mirror_sync_interval_seconds, gmail_mirror_idle_timeout_seconds, \
+    gmail_mirror_sync_concurrency, gmail_mirror_labels_ttl_seconds
+from app.webclients.gsuite.google_rate_limiter import run_google_call
+
+history_fields = "history(id,messagesAdded/message(id,threadId),messagesDeleted/message(id,threadId)),historyId,nextPageToken"
+
+
+class _Mailbox:
+    """
+    Local copy of the Gmail data of one connected account of a user. Message records are kept in LRU order and capped at `max_messages`.
+    """
+
+    def __init__(self, max_messages: int):
+        self.max_messages = max_messages
+        self.messages: "OrderedDict[str, dict]" = OrderedDict()
+        self.threads: Dict[str, List[str]] = {}
+        # historyId of the last change history sync saw per thread, to reject thread fetches that predate it.
+        self.thread_changes: "OrderedDict[str, int]" = OrderedDict()
+        self.labels: Dict[Optional[str], Tuple[float, list]] = {}
+        self.history_id: Optional[str] = None
+        self.synced_at = 0.0
+        self.accessed_at = time.monotonic()
+        self.sync_task: Optional[asyncio.Task] = None
+
+    def is_fresh(self, freshness_seconds: float) -> bool:
+        return self.history_id is not None and time.monotonic() - self.synced_at <= freshness_seconds
+
+    def get_message(self, message_id: str) -> Optional[dict]:
+        record = self.messages.get(message_id)
+        if record is not None:
+            self.messages.move_to_end(message_id)
+        return record
+
+    def put_message(self, record: dict) -> None:
+        self.messages[record["id"]] = record
+        self.messages.move_to_end(record["id"])
+        while len(self.messages) > self.max_messages:
+            _, evicted = self.messages.popitem(last=False)
+            self.threads.pop(evicted.get("thread_id"), None)
+
+    def thread_changed(self, thread_id: Optional[str], history_id: str) -> None:
+        self.threads.pop(thread_id, None)
+        if thread_id is None:
+            return
+        self.thread_changes[thread_id] = int(history_id)
+        self.thread_changes.move_to_end(thread_id)
+        while len(self.thread_changes) > self.max_messages:
+            self.thread_changes.popitem(last=False)
+
+    def drop_message(self, message_id: str, thread_id: Optional[str]) -> None:
+        self.messages.pop(message_id, None)
+        self.threads.pop(thread_id, None)
+
+    def reset(self) -> None:
+        self.messages.clear()
+        self.threads.clear()
+        self.thread_changes.clear()
+        self.labels.clear()
+        self.history_id = None
+
+
+class GmailMirror:
+    """
+    Optional per-user, per-account store of Gmail message records, thread listings and labels.
+
+    Each active mailbox gets a background task that keeps the store current through `history.list`, starting
+    from the last seen historyId. Reads are only served while that sync is fresh; callers fall back to the API
+    on a miss. Label create/delete does not show up in mailbox history, so labels also expire after a TTL.
+    Sync calls across all mailboxes share one semaphore, and idle mailboxes stop syncing and are evicted in LRU
+    order once `max_mailboxes` is exceeded.
+    """
+
+    def __init__(
+            self,
+            service_factory: Callable[[str, str], Awaitable[Any]],
+            max_mailboxes: int = gmail_mirror_max_mailboxes,
+            max_messages_per_user: int = gmail_mirror_max_messages_per_user,
+            freshness_seconds: float = gmail_mirror_freshness_seconds,
+            sync_interval_seconds: float = gmail_mirror_sync_interval_seconds,
+            idle_timeout_seconds: float = gmail_mirror_idle_timeout_seconds,
+            labels_ttl_seconds: float = gmail_mirror_labels_ttl_seconds,
+            sync_concurrency: int = gmail_mirror_sync_concurrency
+    ):
+        self.service_factory = service_factory
+        self.max_mailboxes = max_mailboxes
+        self.max_messages_per_user = max_messages_per_user
+        self.freshness_seconds = freshness_seconds
+        self.sync_interval_seconds = sync_interval_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.labels_ttl_seconds = labels_ttl_seconds
+        self._mailboxes: "OrderedDict[Tuple[str, str], _Mailbox]" = OrderedDict()
+        self._accounts: Dict[str, List[str]] = {}
+        self._sync_semaphore = asyncio.Semaphore(sync_concurrency)
+
+    def set_accounts(self, user_uuid: str, accounts: List[str]) -> None:
+        self._accounts[user_uuid] = list(accounts)
+
+    def get_message(self, user_uuid: str, message_id: str) -> Optional[Tuple[str, dict]]:
+        for account, mailbox in self._fresh_mailboxes(user_uuid):
+            record = mailbox.get_message(message_id)
+            if record is not None:
+                self._touch(mailbox)
+                return account, record
+        return None
+
+    def put_message(self, user_uuid: str, account: str, record: dict) -> None:
+        mailbox = self._mailbox(user_uuid, account)
+        if mailbox.history_id is not None:
+            mailbox.put_message(record)
+
+    def get_thread(self, user_uuid: str, thread_id: str) -> Optional[Tuple[str, List[dict]]]:
+        for account, mailbox in self._fresh_mailboxes(user_uuid):
+            if thread_id not in mailbox.threads:
+                continue
+            records = [mailbox.get_message(message_id) for message_id in mailbox.threads[thread_id]]
+            if all(record is not None for record in records):
+                self._touch(mailbox)
+                return account, records
+        return None
+
+    def put_thread(self, user_uuid: str, account: str, thread_id: str, records: List[dict],
+                   history_id: Optional[str] = None) -> None:
+        """
+        Stores a fetched thread, unless history sync has already seen a change of it newer than the fetch's
+        `history_id` (the thread's historyId).
+        """
+        mailbox = self._mailbox(user_uuid, account)
+        if mailbox.history_id is None or len(records) > mailbox.max_messages:
+            return
+        if history_id is not None and int(history_id) < mailbox.thread_changes.get(thread_id, 0):
+            return
+        for record in records:
+            mailbox.put_message(record)
+        mailbox.threads[thread_id] = [record["id"] for record in records]
+
+    def get_labels(self, user_uuid: str, fields: Optional[str]) -> Optional[List[Tuple[str, list]]]:
+        """
+        Labels of every account registered through `set_accounts`, or None unless all of them are cached.
+        """
+        accounts = self._accounts.get(user_uuid)
+        if not accounts:
+            return None
+        fresh = dict(self._fresh_mailboxes(user_uuid))
+        labels_by_account = []
+        for account in accounts:
+            mailbox = fresh.get(account)
+            if not mailbox or fields not in mailbox.labels:
+                return None
+            stored_at, labels = mailbox.labels[fields]
+            if time.monotonic() - stored_at > self.labels_ttl_seconds:
+                return None
+            labels_by_account.append((account, labels))
+        for mailbox in fresh.values():
+            self._touch(mailbox)
+        return labels_by_account
+
+    def put_labels(self, user_uuid: str, account: str, fields: Optional[str], labels: list) -> None:
+        mailbox = self._mailbox(user_uuid, account)
+        if mailbox.history_id is not None:
+            mailbox.labels[fields] = (time.monotonic(), labels)
+
+    def invalidate_labels(self, user_uuid: str) -> None:
+        for (mailbox_user, _), mailbox in self._mailboxes.items():
+            if mailbox_user == user_uuid:
+                mailbox.labels.clear()
+
+    def _fresh_mailboxes(self, user_uuid: str) -> List[Tuple[str, _Mailbox]]:
+        """
+        The user's mailboxes with a fresh sync. Looking them up neither counts as access nor restarts syncing;
+        only a read they actually answer does (`_touch`).
+        """
+        return [
+            (account, mailbox) for (mailbox_user, account), mailbox in self._mailboxes.items()
+            if mailbox_user == user_uuid and mailbox.is_fresh(self.freshness_seconds)
+        ]
+
+    @staticmethod
+    def _touch(mailbox: _Mailbox) -> None:
+        mailbox.accessed_at = time.monotonic()
+
+    def _mailbox(self, user_uuid: str, account: str) -> _Mailbox:
+        key = (user_uuid, account)
+        mailbox = self._mailboxes.get(key)
+        if mailbox is None:
+            mailbox = _Mailbox(self.max_messages_per_user)
+            self._mailboxes[key] = mailbox
+            while len(self._mailboxes) > self.max_mailboxes:
+                _, evicted = self._mailboxes.popitem(last=False)
+                if evicted.sync_task:
+                    evicted.sync_task.cancel()
+        self._mailboxes.move_to_end(key)
+        mailbox.accessed_at = time.monotonic()
+        if mailbox.sync_task is None or mailbox.sync_task.done():
+            mailbox.sync_task = asyncio.create_task(self._sync_loop(user_uuid, account, mailbox))
+        return mailbox
+
+    async def _sync_loop(self, user_uuid: str, account: str, mailbox: _Mailbox) -> None:
+        try:
+            service = await self.service_factory(user_uuid, account)
+            if service is None:
+                return
+            while time.monotonic() - mailbox.accessed_at <= self.idle_timeout_seconds:
+                try:
+                    await self._sync(service, mailbox)
+                except Exception as e:
+                    logger.warning(f"Gmail mirror sync failed for user {user_uuid}, account {account}: {e}")
+                await asyncio.sleep(self.sync_interval_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Gmail mirror could not start syncing for user {user_uuid}, account {account}: {e}")
+
+    async def _sync(self, service, mailbox: _Mailbox) -> None:
+        async with self._sync_semaphore:
+            if mailbox.history_id is None:
+                await self._reset_baseline(service, mailbox)
+                return
+            page_token = None
+            history_id = mailbox.history_id
+            while True:
+                try:
+                    response = await run_google_call(
+                        service.users().history().list(
+                            userId="me",
+                            startHistoryId=mailbox.history_id,
+                            historyTypes=["messageAdded", "messageDeleted"],
+                            pageToken=page_token,
+                            fields=history_fields,
+                        ).execute
+                    )
+                except HttpError as e:
+                    if e.resp.status == 404:
+                        # startHistoryId is too old to replay; start over from the current mailbox state.
+                        await self._reset_baseline(service, mailbox)
+                        return
+                    raise
+                for record in response.get("history", []):
+                    for added in record.get("messagesAdded", []):
+                        mailbox.thread_changed(added["message"].get("threadId"), record["id"])
+                    for deleted in record.get("messagesDeleted", []):
+                        mailbox.drop_message(deleted["message"]["id"], deleted["message"].get("threadId"))
+                        mailbox.thread_changed(deleted["message"].get("threadId"), record["id"])
+                history_id = response.get("historyId", history_id)
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    break
+            mailbox.history_id = history_id
+            mailbox.synced_at = time.monotonic()
+
+    @staticmethod
+    async def _reset_baseline(service, mailbox: _Mailbox) -> None:
+        profile = await run_google_call(
+            service.users().getProfile(userId="me", fields="historyId").execute
+        )
+        mailbox.reset()
+        mailbox.history_id = profile["historyId"]
+        mailbox.synced_at = time.monotonic()
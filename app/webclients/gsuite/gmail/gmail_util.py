@@ -1,13 +1,135 @@
 import base64
-from typing import List, Dict
+import codecs
+import hashlib
+import mimetypes
+import re
+from html.parser import HTMLParser
+from typing import List, Dict, Iterator, Optional, Any, Tuple, Union
 
+from app.utils.application_constants import gmail_max_body_chars, gmail_attachment_max_text_chars
 
-def extract_message_body(payload):
+# Multiple of 4 so every slice of a base64url string decodes on its own.
+_BASE64_CHUNK_CHARS = 64 * 1024
+
+_TEXT_MIME_TYPES = {
+    "application/json", "application/xml", "application/csv", "application/javascript", "application/x-yaml",
+    "application/x-sh", "application/sql",
+}
+
+_ATTACHMENT_SIZE = re.compile(rb'"size"\s*:\s*(\d+)')
+_ATTACHMENT_DATA = re.compile(rb'"data"\s*:\s*"')
+
+Base64Data = Union[str, bytes, memoryview]
+
+_HTML_SKIPPED_TAGS = {"script", "style", "head", "title"}
+_HTML_BLOCK_TAGS = {"p", "div", "br", "tr", "li", "h1", "h2", "h3", "h4", "h5", "h6", "table", "blockquote"}
+
+
+class _BoundedText:
+    """
+    Accumulates text fragments until `max_chars` is reached, then drops the rest.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.length = 0
+        self.truncated = False
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def append(self, text: str) -> None:
+        if not text:
+            return
+        if self.full:
+            self.truncated = True
+            return
+        remaining = self.max_chars - self.length
+        if len(text) > remaining:
+            text = text[:remaining]
+            self.truncated = True
+        self.parts.append(text)
+        self.length += len(text)
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+class _HtmlTextExtractor(HTMLParser):
+    """
+    Incremental HTML to plain-text converter; fed decoded chunks as they arrive.
+    """
+
+    def __init__(self, sink: _BoundedText):
+        super().__init__(convert_charrefs=True)
+        self.sink = sink
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HTML_SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in _HTML_BLOCK_TAGS:
+            self.sink.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _HTML_SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in _HTML_BLOCK_TAGS:
+            self.sink.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.sink.append(data)
+
+
+def iter_message_parts(payload: dict) -> Iterator[dict]:
+    """
+    Depth-first walk over a Gmail message payload, yielding leaf MIME parts in document order.
+    Part bodies are not touched, so walking is cheap regardless of message size.
+    """
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        children = part.get("parts")
+        if children:
+            stack.extend(reversed(children))
+        else:
+            yield part
+
+
+def iter_decoded_bytes(data: Base64Data, chunk_chars: int = _BASE64_CHUNK_CHARS) -> Iterator[bytes]:
+    """
+    Lazily decodes base64url data (a string, or bytes or a view of them), one bounded chunk at a time.
+    """
+    for offset in range(0, len(data), chunk_chars):
+        chunk = data[offset:offset + chunk_chars]
+        if len(chunk) % 4:
+            padding = "=" * (-len(chunk) % 4)
+            chunk = chunk + padding if isinstance(chunk, str) else bytes(chunk) + padding.encode()
+        yield base64.urlsafe_b64decode(chunk)
+
+
+def iter_decoded_text(data: Base64Data, chunk_chars: int = _BASE64_CHUNK_CHARS) -> Iterator[str]:
+    """
+    Lazily decodes a base64url encoded body into UTF-8 text, one bounded chunk at a time.
     """
-    Extracts all text/plain and text/html content and attachment metadata from Gmail message payload.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    for chunk in iter_decoded_bytes(data, chunk_chars):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def extract_message_body(payload, max_body_chars: Optional[int] = gmail_max_body_chars):
+    """
+    Extracts the text body and attachment metadata from Gmail message payload.
+    Prefers text/plain parts; when there are none, text/html parts are converted to text incrementally.
+    Only the chosen parts are decoded, and decoding stops once `max_body_chars` is reached.
 
     Args:
         payload (dict): Gmail API message payload
+        max_body_chars (int, optional): Body size cap in characters; None disables the cap
 
     Returns:
         str: A combined plain-text body, including attachment info
@@ -16,26 +138,17 @@ def extract_message_body(payload):
     html_text_parts = []
     attachments = []
 
-    parts = [payload] if "parts" not in payload else payload.get("parts", [])
-    part_queue = list(parts)  # BFS traversal of parts
-
-    while part_queue:
-        part = part_queue.pop(0)
+    for part in iter_message_parts(payload):
         mime_type = part.get("mimeType", "")
         body = part.get("body", {})
         data = body.get("data")
         filename = part.get("filename")
 
         if mime_type == "text/plain" and data:
-            decoded = base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
-            plain_text_parts.append(decoded)
+            plain_text_parts.append(data)
 
         elif mime_type == "text/html" and data:
-            decoded = base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
-            html_text_parts.append(decoded)
-
-        elif mime_type.startswith("multipart/") and "parts" in part:
-            part_queue.extend(part["parts"])
+            html_text_parts.append(data)
 
         elif filename and body.get("attachmentId"):
             attachments.append({
@@ -45,17 +158,40 @@ def extract_message_body(payload):
                 "size": body.get("size", "unknown")
             })
 
-    # Build final message
-    message_text = "\n\n".join(plain_text_parts).strip()
+    sink = _BoundedText(max_body_chars if max_body_chars is not None else float("inf"))
+    if plain_text_parts:
+        for index, data in enumerate(plain_text_parts):
+            if sink.full:
+                break
+            if index:
+                sink.append("\n\n")
+            for text in iter_decoded_text(data):
+                sink.append(text)
+                if sink.truncated:
+                    break
+    else:
+        # Fallback to HTML if no plain text
+        for index, data in enumerate(html_text_parts):
+            if sink.full:
+                break
+            if index:
+                sink.append("\n\n")
+            parser = _HtmlTextExtractor(sink)
+            for html in iter_decoded_text(data):
+                parser.feed(html)
+                if sink.truncated:
+                    break
+            parser.close()
 
-    # Fallback to HTML if no plain text
-    if not message_text and html_text_parts:
-        message_text = "\n\n".join(html_text_parts).strip()
+    # Build final message
+    message_text = sink.text().strip()
+    if sink.truncated:
+        message_text += f"\n\n[Body truncated at {max_body_chars} characters]"
 
     # Add formatted attachment summary
     if attachments:
         attachment_texts = [
-            f"[Attachment] {a['filename']} ({a['mime_type']}, size: {a['size']})"
+            f"[Attachment] {a['filename']} ({a['mime_type']}, size: {a['size']}, attachment_id: {a['attachment_id']})"
             for a in attachments
         ]
         message_text += "\n\nAttachments:\n" + "\n".join(attachment_texts)
@@ -63,6 +199,93 @@ def extract_message_body(payload):
     return message_text
 
 
+def is_text_attachment(data: Base64Data, mime_type: Optional[str]) -> bool:
+    """
+    Decide whether an attachment can be returned as text, from its MIME type or, when unknown, by checking that
+    its first chunk is valid UTF-8.
+    """
+    if mime_type:
+        return mime_type.startswith("text/") or mime_type in _TEXT_MIME_TYPES
+    head = next(iter_decoded_bytes(data[:4096]), b"")
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head)
+        return b"\x00" not in head
+    except UnicodeDecodeError:
+        return False
+
+
+def attachment_payload(content: bytes) -> Tuple[Optional[int], memoryview]:
+    """
+    (size, base64url data) of a raw `attachments.get` response body, read without JSON-decoding it, so the data
+    is a view into `content` rather than a second full copy. base64url contains no quotes or escapes, so the
+    value ends at the next quote.
+    """
+    view = memoryview(content)
+    size = _ATTACHMENT_SIZE.search(content)
+    start = _ATTACHMENT_DATA.search(content)
+    if start is None:
+        return (int(size.group(1)) if size else None), view[:0]
+    end = content.index(b'"', start.end())
+    return (int(size.group(1)) if size else None), view[start.end():end]
+
+
+def extract_attachment(data: Base64Data, filename: Optional[str] = None, mime_type: Optional[str] = None,
+                       max_text_chars: int = gmail_attachment_max_text_chars) -> Dict[str, Any]:
+    """
+    Decodes a base64url attachment payload in bounded chunks without materialising the decoded blob.
+
+    Text attachments are returned as an extract capped at `max_text_chars`. For anything else only metadata is
+    returned: size, type and SHA-256. Nothing is written to disk.
+
+    Args:
+        data: base64url attachment data from the Gmail API, as a string or as (a view of) bytes
+        filename: Original filename, used to guess the type of binary attachments
+        mime_type: Attachment MIME type, sniffed from the content when omitted
+        max_text_chars: Cap on the returned text extract
+
+    Returns:
+        Dict with either `text` and `truncated`, or `size_bytes`, `detected_mime_type` and `sha256`
+    """
+    if is_text_attachment(data, mime_type):
+        sink = _BoundedText(max_text_chars)
+        for text in iter_decoded_text(data):
+            sink.append(text)
+            if sink.truncated:
+                break
+        return {"text": sink.text(), "truncated": sink.truncated}
+
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter_decoded_bytes(data):
+        digest.update(chunk)
+        size += len(chunk)
+    return {
+        "size_bytes": size,
+        "detected_mime_type": mime_type or (mimetypes.guess_type(filename)[0] if filename else None),
+        "sha256": digest.hexdigest(),
+    }
+
+
+def build_message_record(message: dict) -> Dict[str, Optional[str]]:
+    """
+    Reduce a Gmail message resource to the fields the Gmail tools render.
+
+    Args:
+        message: A Gmail API message resource fetched with format="full"
+
+    Returns:
+        Dict with id, thread_id, subject, from, date and the extracted body
+    """
+    payload = message.get("payload", {})
+    headers = extract_headers(payload, ["Subject", "From", "Date"])
+    return {
+        "id": message.get("id"),
+        "thread_id": message.get("threadId"),
+        "subject": headers.get("Subject"),
+        "from": headers.get("From"),
+        "date": headers.get("Date"),
+        "body": extract_message_body(payload),
+    }
 
 
 def extract_headers(payload: dict, header_names: List[str]) -> Dict[str, str]:
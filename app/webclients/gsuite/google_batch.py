@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, List, Optional, Tuple
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import HttpRequest
+
+from app.utils.application_constants import google_batch_max_requests, google_batch_concurrency
+from app.webclients.gsuite.google_rate_limiter import RateLimitedHttp, run_google_call
+
+BatchResult = Tuple[Any, Optional[Exception]]
+
+
+def _fresh_http(request: HttpRequest, cost: int) -> Optional[AuthorizedHttp]:
+    """
+    httplib2.Http is not thread-safe, so every batch that runs in its own thread gets its own connection,
+    authorised with the same credentials and paced by the same rate limit as the service the requests were built
+    from. Each request inside the batch counts against the limit.
+    """
+    credentials = getattr(request.http, "credentials", None)
+    if not credentials:
+        return None
+    limited = getattr(request.http, "http", None)
+    http = limited.fork(httplib2.Http(), cost) if isinstance(limited, RateLimitedHttp) else httplib2.Http()
+    return AuthorizedHttp(credentials, http=http)
+
+
+def _execute_chunk(service, requests: List[HttpRequest]) -> List[BatchResult]:
+    results: List[BatchResult] = [(None, None)] * len(requests)
+
+    def callback(request_id, response, exception):
+        results[int(request_id)] = (response, exception)
+
+    batch = service.new_batch_http_request(callback=callback)
+    for index, request in enumerate(requests):
+        batch.add(request, request_id=str(index))
+    batch.execute(http=_fresh_http(requests[0], len(requests)))
+    return results
+
+
+async def execute_batch(
+        service,
+        requests: List[HttpRequest],
+        batch_size: int = google_batch_max_requests,
+        concurrency: int = google_batch_concurrency
+) -> List[BatchResult]:
+    """
+    Sends requests through the service's batch endpoint, `batch_size` requests per HTTP call,
+    with at most `concurrency` batch calls in flight.
+
+    Returns:
+        One (response, exception) pair per request, in the order the requests were given.
+    """
+    if not requests:
+        return []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(chunk: List[HttpRequest]) -> List[BatchResult]:
+        async with semaphore:
+            return await run_google_call(_execute_chunk, service, chunk)
+
+    chunks = [requests[i:i + batch_size] for i in range(0, len(requests), batch_size)]
+    chunk_results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    return [result for chunk_result in chunk_results for result in chunk_result]
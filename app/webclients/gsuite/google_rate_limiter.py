@@ -0,0 +1,326 @@
+import asyncio
+import email.utils
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import httplib2
+
+from app.config.logging_config import logger
+from app.utils.application_constants import gmail_service_name, gcalendar_service_name, google_tasks_service_name, \
+    gmail_rate_limit_per_second, gcal_rate_limit_per_second, gtasks_rate_limit_per_second, google_rate_limit_burst, \
+    google_rate_limit_min_per_second, google_rate_limit_recovery_step, google_rate_limit_max_buckets, \
+    google_retry_max_attempts, google_retry_base_delay_seconds, google_retry_max_delay_seconds, \
+    google_retry_budget_ratio, google_retry_budget_max_tokens, google_retry_budget_min_per_second, \
+    google_executor_max_workers
+
+T = TypeVar("T")
+
+api_rate_limits = {
+    gmail_service_name: gmail_rate_limit_per_second,
+    gcalendar_service_name: gcal_rate_limit_per_second,
+    google_tasks_service_name: gtasks_rate_limit_per_second,
+}
+idempotent_methods = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+server_error_statuses = {500, 502, 503, 504}
+rate_limit_reasons = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+
+class GoogleWait(Exception):
+    """
+    Raised by RateLimitedHttp inside a `run_google_call` worker instead of sleeping there: the caller waits
+    `seconds` on the event loop and runs the call again, so a throttled user does not hold a worker thread.
+    """
+
+    def __init__(self, seconds: float):
+        super().__init__(f"wait {seconds:.2f}s")
+        self.seconds = seconds
+
+
+class _CallState:
+    """
+    Progress of one API call across the runs `run_google_call` makes of it.
+    """
+
+    def __init__(self, blocking: bool = False):
+        self.blocking = blocking
+        self.attempt = 1
+        self.deposited = False
+        self.prepaid = False
+
+
+_current_call = threading.local()
+google_executor = ThreadPoolExecutor(max_workers=google_executor_max_workers, thread_name_prefix="google-api")
+
+
+async def run_google_call(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Runs a blocking Google API call (`request.execute`, a batch, `build`, ...) on the Google worker pool.
+    Rate-limit pacing and retry backoff of the call are awaited here, between runs, instead of in the worker.
+    """
+    state = _CallState()
+
+    def run() -> T:
+        _current_call.state = state
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_call.state = None
+
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            return await loop.run_in_executor(google_executor, run)
+        except GoogleWait as wait:
+            await asyncio.sleep(wait.seconds)
+
+
+def is_rate_limited(status: int, content: bytes) -> bool:
+    """
+    Google reports quota exhaustion as 429, or as 403 with a rate-limit reason; other 403s are permission errors.
+    """
+    if status == 429:
+        return True
+    if status != 403:
+        return False
+    try:
+        errors = json.loads(content).get("error", {}).get("errors", [])
+    except (ValueError, TypeError, AttributeError):
+        return False
+    return any(error.get("reason") in rate_limit_reasons for error in errors)
+
+
+def retry_after_seconds(response: httplib2.Response) -> Optional[float]:
+    value = response.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Pace of one user's requests to one Google API: `rate` requests per second with bursts of up to `capacity`.
+
+    The rate adapts: every rate-limit answer halves it (down to `min_rate`) and every other answer adds back
+    `recovery_step` of the configured rate, so a user who hits quota slows down and then creeps back up.
+    Callers reserve tokens ahead of time, which queues concurrent requests in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float, min_rate: float, recovery_step: float):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.recovery_step = recovery_step
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """
+        Takes `cost` tokens and returns the number of seconds the caller must wait before sending.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def throttle(self, retry_after: Optional[float]) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def recover(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery_step)
+
+
+class RetryBudget:
+    """
+    Retries allowed against one Google API across all users.
+
+    Every first attempt deposits `ratio` tokens and every retry spends one, so retries stay within roughly
+    `ratio` of the traffic however many requests fail at once; an outage is not multiplied by the retry count.
+    `min_per_second` tokens are added over time so a quiet API can still retry.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float, min_per_second: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.min_per_second = min_per_second
+        self.tokens = max_tokens
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+
+class RateLimitedHttp:
+    """
+    httplib2.Http wrapper that paces requests through a TokenBucket and retries failed ones in place, on the same
+    connection and credentials, without rebuilding the API client.
+
+    A request is retried only if its method is idempotent and it failed with a rate-limit answer, a 5xx or a
+    connection error. It is retried at most `max_attempts` times in total, and only while the API's RetryBudget
+    allows. The wait honours `Retry-After` when Google sends one and is otherwise full-jitter exponential backoff.
+    Answers asking for a wait longer than `max_delay` are returned as they are.
+
+    Under `run_google_call`, waits are handed back to the event loop as GoogleWait; anywhere else they sleep.
+    """
+
+    def __init__(self, http: httplib2.Http, bucket: TokenBucket, budget: RetryBudget, cost: float = 1.0,
+                 max_attempts: int = google_retry_max_attempts, base_delay: float = google_retry_base_delay_seconds,
+                 max_delay: float = google_retry_max_delay_seconds):
+        self.http = http
+        self.bucket = bucket
+        self.budget = budget
+        self.cost = cost
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def fork(self, http: httplib2.Http, cost: float = 1.0) -> "RateLimitedHttp":
+        """
+        The same limits over another connection; `cost` is the number of API calls one request carries (batches).
+        """
+        return RateLimitedHttp(http, self.bucket, self.budget, cost, self.max_attempts, self.base_delay, self.max_delay)
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        method = method.upper()
+        state = getattr(_current_call, "state", None) or _CallState(blocking=True)
+        if not state.deposited:
+            self.budget.deposit()
+            state.deposited = True
+        while True:
+            if state.prepaid:
+                # The slot was reserved by the run that handed its wait to the event loop.
+                state.prepaid = False
+            else:
+                wait = self.bucket.reserve(self.cost)
+                if wait > 0:
+                    self._wait(state, wait, prepaid=True)
+            try:
+                response, content = self.http.request(uri, method, body, headers, *args, **kwargs)
+            except (OSError, httplib2.ServerNotFoundError) as e:
+                if not self._may_retry(method, state.attempt, None):
+                    raise
+                logger.warning(f"Google request {method} {uri} failed ({e}); retrying, attempt {state.attempt + 1}")
+                state.attempt += 1
+                self._wait(state, self._backoff(state.attempt - 1))
+                continue
+
+            retry_after = retry_after_seconds(response)
+            rate_limited = is_rate_limited(response.status, content)
+            if rate_limited:
+                self.bucket.throttle(retry_after)
+            else:
+                self.bucket.recover()
+            if not (rate_limited or response.status in server_error_statuses) \
+                    or not self._may_retry(method, state.attempt, retry_after):
+                return response, content
+            logger.warning(f"Google request {method} {uri} returned {response.status}; "
+                           f"retrying, attempt {state.attempt + 1}")
+            state.attempt += 1
+            if retry_after is None:
+                self._wait(state, self._backoff(state.attempt - 1))
+            elif not rate_limited:
+                self._wait(state, retry_after)
+            # A rate-limit answer already blocked the bucket until Retry-After; the next reserve() waits it out.
+
+    @staticmethod
+    def _wait(state: _CallState, seconds: float, prepaid: bool = False) -> None:
+        if state.blocking:
+            time.sleep(seconds)
+            return
+        state.prepaid = prepaid
+        raise GoogleWait(seconds)
+
+    def _may_retry(self, method: str, attempt: int, retry_after: Optional[float]) -> bool:
+        if method not in idempotent_methods or attempt >= self.max_attempts:
+            return False
+        if retry_after is not None and retry_after > self.max_delay:
+            return False
+        return self.budget.try_spend()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def __getattr__(self, name):
+        # Connection settings (timeout, connections, ...) are read through to the wrapped Http.
+        return getattr(self.http, name)
+
+
+class GoogleRateLimiter:
+    """
+    Process-wide registry of TokenBuckets per (user, Google API) and RetryBuckets per Google API.
+    Buckets of inactive users are evicted in LRU order once `max_buckets` is exceeded.
+    """
+
+    def __init__(self, burst: float = google_rate_limit_burst, min_rate: float = google_rate_limit_min_per_second,
+                 recovery_step: float = google_rate_limit_recovery_step, max_buckets: int = google_rate_limit_max_buckets):
+        self.burst = burst
+        self.min_rate = min_rate
+        self.recovery_step = recovery_step
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._budgets: Dict[str, RetryBudget] = {}
+        self._lock = threading.Lock()
+
+    def http(self, user_uuid: str, service_name: str, http: httplib2.Http) -> RateLimitedHttp:
+        return RateLimitedHttp(http, self.bucket(user_uuid, service_name), self.budget(service_name))
+
+    def bucket(self, user_uuid: str, service_name: str) -> TokenBucket:
+        key = (user_uuid, service_name)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate = api_rate_limits.get(service_name, gtasks_rate_limit_per_second)
+                bucket = TokenBucket(rate, self.burst, self.min_rate, self.recovery_step)
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(key)
+            return bucket
+
+    def budget(self, service_name: str) -> RetryBudget:
+        with self._lock:
+            if service_name not in self._budgets:
+                self._budgets[service_name] = RetryBudget(
+                    google_retry_budget_ratio, google_retry_budget_max_tokens, google_retry_budget_min_per_second
+                )
+            return self._budgets[service_name]
+
+
+google_rate_limiter = GoogleRateLimiter()
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.utils.application_constants import google_response_cache_max_bytes, google_response_cache_max_entry_bytes
+
+
+class GoogleResponseCache:
+    """
+    Process-wide LRU store of Google API GET responses, bounded by the total size of the stored entries.
+
+    httplib2 does the HTTP side: it stores each cacheable GET response together with its ETag, sends
+    `If-None-Match` on the next request for the same URI and serves the stored body when Google answers 304.
+    Google marks API responses `max-age=0, must-revalidate`, so every read is still revalidated and never stale.
+    Entries are keyed by (user, account, URI) because API URIs such as `users/me/labels` are the same for
+    every account.
+    """
+
+    def __init__(self, max_bytes: int = google_response_cache_max_bytes,
+                 max_entry_bytes: int = google_response_cache_max_entry_bytes):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def for_account(self, user_uuid: str, account: str) -> "AccountResponseCache":
+        return AccountResponseCache(self, user_uuid, account)
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Tuple[str, str, str], value: bytes) -> None:
+        with self._lock:
+            self._pop(key)
+            if len(value) > self.max_entry_bytes:
+                return
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def delete(self, key: Tuple[str, str, str]) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key: Tuple[str, str, str]) -> None:
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self.size -= len(value)
+
+
+class AccountResponseCache:
+    """
+    The get/set/delete view of GoogleResponseCache for one (user, account) that `httplib2.Http(cache=...)` expects.
+    """
+
+    def __init__(self, store: GoogleResponseCache, user_uuid: str, account: str):
+        self.store = store
+        self.user_uuid = user_uuid
+        self.account = account
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.store.get((self.user_uuid, self.account, key))
+
+    def set(self, key: str, value: bytes) -> None:
+        self.store.set((self.user_uuid, self.account, key), value)
+
+    def delete(self, key: str) -> None:
+        self.store.delete((self.user_uuid, self.account, key))
+
+
+google_response_cache = GoogleResponseCache()
@@ -1,40 +1,162 @@
+import asyncio
 import datetime
 import os
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
 
+import httplib2
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.auth.exceptions import RefreshError
 
+from app.dto.google_account_result import GoogleAccountResult
 from app.dto.token_metadata import TokenMetadata
 from app.exceptions.GoogleAuthReauthRequired import GoogleAuthReauthRequired
 from app.service.external_token_service import ExternalTokenService
 from app.utils.application_constants import google_client_id_key, google_client_secret_key, google_external_client, \
-    app_env_key, google_token_uri_key, default_google_token_uri
+    app_env_key, google_token_uri_key, default_google_token_uri, google_fan_out_deadline_seconds, \
+    google_fan_out_concurrency
 from app.utils.google_oauth_utils import run_local_oauth_flow
+from app.webclients.gsuite.google_rate_limiter import google_rate_limiter, run_google_call
+from app.webclients.gsuite.google_response_cache import google_response_cache
 from app.webclients.gsuite.google_scopes import SCOPES
 from app.config.logging_config import logger
 
 external_token_service = ExternalTokenService()
 
+T = TypeVar("T")
+
+
+def is_not_found(error: BaseException) -> bool:
+    """
+    A 404 from Google; reads and writes by ID reach every account, and all but the owning one answer 404.
+    """
+    return isinstance(error, HttpError) and error.resp.status == 404
+
+
+def account_label(token_data: TokenMetadata, index: int) -> str:
+    """
+    Human-readable tag for one connected Google account, used to attribute merged results.
+    """
+    metadata = token_data.metadata or {}
+    return metadata.get("email") or metadata.get("account_email") or f"account_{index + 1}"
+
+
 async def generate_authenticated_client(user_uuid: str, service_name: str, version: str):
+    accounts = await generate_authenticated_accounts(user_uuid, service_name, version)
+    return [service for _, service in accounts]
+
+
+async def generate_authenticated_accounts(user_uuid: str, service_name: str, version: str) -> List[Tuple[str, Any]]:
+    """
+    Builds a service for every Google account of the user concurrently, tagged with its account label.
+    """
+    tokens_data = await external_token_service.fetch_external_token_records(user_uuid, google_external_client) or []
+    services = await asyncio.gather(*(
+        build_google_service(user_uuid, service_name, version, token_data, account_label(token_data, index))
+        for index, token_data in enumerate(tokens_data)
+    ))
+    return [(account_label(token_data, index), service) for index, (token_data, service) in enumerate(zip(tokens_data, services))]
+
+
+async def generate_primary_authenticated_client(user_uuid: str, service_name: str, version: str):
+    """
+    Builds a service for the user's first connected Google account only; used for writes that must not fan out.
+    """
+    _, service = await generate_primary_authenticated_account(user_uuid, service_name, version)
+    return service
+
+
+async def generate_primary_authenticated_account(user_uuid: str, service_name: str, version: str) -> Tuple[str, Any]:
+    """
+    Same as `generate_primary_authenticated_client`, together with the account label.
+    """
     tokens_data = await external_token_service.fetch_external_token_records(user_uuid, google_external_client)
-    authenticated_google_client = []
-    for token_data in tokens_data:
-        client = await build_google_service(user_uuid, service_name, version, token_data)
-        authenticated_google_client.append(client)
+    if not tokens_data:
+        raise GoogleAuthReauthRequired("No Google account connected; user must authorize.")
+    account = account_label(tokens_data[0], 0)
+    return account, await build_google_service(user_uuid, service_name, version, tokens_data[0], account)
+
+
+async def fan_out_google_accounts(
+        user_uuid: str,
+        service_name: str,
+        version: str,
+        request_fn: Callable[..., Awaitable[T]],
+        deadline_seconds: Optional[float] = google_fan_out_deadline_seconds,
+        concurrency: int = google_fan_out_concurrency,
+        with_account: bool = False
+) -> List[GoogleAccountResult]:
+    """
+    Builds a service and runs `request_fn` for every Google account of the user concurrently, with at most
+    `concurrency` accounts in flight. An account that fails or misses the deadline is reported with its error
+    instead of blocking the others. Only when every account failed is an error raised: the first one that is
+    not a 404, so a real failure of the owning account is not masked by the others not knowing the ID.
+    Writes pass `deadline_seconds=None`: cancelling a write that is already in flight would report it as failed
+    while it may still be applied. With `with_account`, `request_fn` is called as `request_fn(account, service)`.
+
+    Returns:
+        One GoogleAccountResult per account, in token-record order.
+    """
+    tokens_data = await external_token_service.fetch_external_token_records(user_uuid, google_external_client) or []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(account: str, token_data: TokenMetadata) -> T:
+        async with semaphore:
+            service = await build_google_service(user_uuid, service_name, version, token_data, account)
+            return await (request_fn(account, service) if with_account else request_fn(service))
+
+    outcomes = await asyncio.gather(
+        *(asyncio.wait_for(run(account_label(token_data, index), token_data), timeout=deadline_seconds)
+          for index, token_data in enumerate(tokens_data)),
+        return_exceptions=True
+    )
+    results = []
+    errors = []
+    for index, (token_data, outcome) in enumerate(zip(tokens_data, outcomes)):
+        account = account_label(token_data, index)
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, asyncio.TimeoutError):
+                outcome = TimeoutError(f"Google account {account} did not respond within {deadline_seconds}s")
+            if is_not_found(outcome):
+                logger.debug(f"Google {service_name} request found nothing in account {account}")
+            else:
+                logger.warning(f"Google {service_name} request failed for account {account}: {outcome}")
+            errors.append(outcome)
+            results.append(GoogleAccountResult(account=account, error=str(outcome)))
+        else:
+            results.append(GoogleAccountResult(account=account, result=outcome))
+    if errors and len(errors) == len(results):
+        raise next((error for error in errors if not is_not_found(error)), errors[0])
+    return results
+
 
-    return authenticated_google_client
+def first_account_result(results: List[GoogleAccountResult]) -> Tuple[Optional[str], Any]:
+    """
+    Picks the first successful account result; used for reads by ID, where only the owning account succeeds.
+    """
+    for result in results:
+        if result.error is None:
+            return result.account, result.result
+    return None, None
 
 
-async def build_google_service(user_uuid: str, service_name: str, version: str, token_data: TokenMetadata):
+async def build_google_service(user_uuid: str, service_name: str, version: str, token_data: TokenMetadata, account: str):
     if token_data.expires_at and token_data.expires_at < datetime.datetime.utcnow():
         token_data = await refresh_google_access_token(token_data, user_uuid)
         await external_token_service.update_external_token(token_data, google_external_client, user_uuid)
-        return token_data
 
     creds = generate_google_creds(token_data)
-    return build(service_name, version, credentials=creds)
+    # GET responses are revalidated with If-None-Match against the account's cached ETag; a 304 is served locally.
+    # Requests are paced per (user, API) and retryable failures are retried in place, without rebuilding the client.
+    http = httplib2.Http(cache=google_response_cache.for_account(user_uuid, account))
+    # With a cache, httplib2 would also send If-Match with the cached ETag on PUT/PATCH, failing updates with 412
+    # after any concurrent change; preconditions are only sent where a caller sets them explicitly.
+    http.optimistic_concurrency_methods = []
+    http = AuthorizedHttp(creds, http=google_rate_limiter.http(user_uuid, service_name, http))
+    return await run_google_call(build, service_name, version, http=http)
 
 
 def generate_google_creds(token_data: TokenMetadata):
@@ -51,7 +173,7 @@ def generate_google_creds(token_data: TokenMetadata):
 async def refresh_google_access_token(token_data: TokenMetadata, user_uuid: str) -> TokenMetadata:
     creds = generate_google_creds(token_data)
     try:
-        creds.refresh(Request())
+        await run_google_call(creds.refresh, Request())
         return TokenMetadata(
             access_token=creds.token,
             refresh_token=creds.refresh_token,
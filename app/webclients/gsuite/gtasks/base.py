@@ -1,16 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from typing import List, Optional, Any
+
+from app.dto.task_operation import TaskOperation
 
 class GoogleTasksClientBase(ABC):
     @abstractmethod
-    async def list_tasklists(self, user_uuid: str, max_results: Optional[int] = None, page_token: Optional[str] = None) -> Any:
+    async def list_tasklists(self, user_uuid: str, max_results: Optional[int] = None, page_token: Optional[str] = None,
+                             fields: Optional[str] = None) -> Any:
         """
         Lists all task lists for the authenticated user.
         """
         pass
 
     @abstractmethod
-    async def get_tasklist(self, user_uuid: str, tasklist_id: str) -> Any:
+    async def get_tasklist(self, user_uuid: str, tasklist_id: str, fields: Optional[str] = None) -> Any:
         """
         Gets a single task list by ID.
         """
@@ -20,16 +23,18 @@ class GoogleTasksClientBase(ABC):
     async def list_tasks(self, user_uuid: str, tasklist_id: str, show_completed: Optional[bool] = None,
                          show_hidden: Optional[bool] = None, show_deleted: Optional[bool] = None,
                          max_results: Optional[int] = None, due_min: Optional[str] = None,
-                         due_max: Optional[str] = None, page_token: Optional[str] = None) -> Any:
+                         due_max: Optional[str] = None, page_token: Optional[str] = None,
+                         fields: Optional[str] = None, max_age_seconds: Optional[float] = None) -> Any:
         """
-        Lists all tasks in the specified task list.
+        Lists all tasks in the specified task list, served from a cached copy at most `max_age_seconds` old.
         """
         pass
 
     @abstractmethod
-    async def get_task(self, user_uuid: str, tasklist_id: str, task_id: str) -> Any:
+    async def get_task(self, user_uuid: str, tasklist_id: str, task_id: str, fields: Optional[str] = None,
+                       max_age_seconds: Optional[float] = None) -> Any:
         """
-        Gets a single task by ID from the specified task list.
+        Gets a single task by ID from the specified task list, served from a cached copy at most `max_age_seconds` old.
         """
         pass
 
@@ -37,7 +42,7 @@ class GoogleTasksClientBase(ABC):
     async def create_task(self, user_uuid: str, tasklist_id: str, title: str,
                           notes: Optional[str] = None, due: Optional[str] = None,
                           status: Optional[str] = None, parent: Optional[str] = None,
-                          previous: Optional[str] = None) -> Any:
+                          previous: Optional[str] = None, fields: Optional[str] = None) -> Any:
         """
         Creates a new task in the specified task list.
         """
@@ -49,7 +54,8 @@ class GoogleTasksClientBase(ABC):
                           due: Optional[str] = None, status: Optional[str] = None,
                           parent: Optional[str] = None, previous: Optional[str] = None,
                           completed: Optional[str] = None, deleted: Optional[bool] = None,
-                          hidden: Optional[bool] = None, position: Optional[str] = None) -> Any:
+                          hidden: Optional[bool] = None, position: Optional[str] = None,
+                          fields: Optional[str] = None) -> Any:
         """
         Updates an existing task in the specified task list.
         """
@@ -61,3 +67,19 @@ class GoogleTasksClientBase(ABC):
         Deletes a task from the specified task list.
         """
         pass
+
+    @abstractmethod
+    async def list_all_open_tasks(self, user_uuid: str, max_results: int, due_max: Optional[str] = None,
+                                  fields: Optional[str] = None) -> Any:
+        """
+        Lists incomplete, visible tasks across every task list, up to max_results.
+        """
+        pass
+
+    @abstractmethod
+    async def batch_tasks(self, user_uuid: str, operations: List[TaskOperation], keep_order: bool = False,
+                          fields: Optional[str] = None) -> Any:
+        """
+        Applies create, update and delete operations in batch requests and returns one outcome per operation.
+        """
+        pass
@@ -0,0 +1,189 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.config.logging_config import logger
+from app.utils.application_constants import gtasks_cache_max_tasklists, gtasks_cache_max_tasks_per_list, \
+    gtasks_cache_clock_skew_seconds, gtasks_page_size, gtasks_cache_failure_ttl_seconds
+from app.webclients.gsuite.google_rate_limiter import run_google_call
+from app.webclients.gsuite.google_service_builder import is_not_found
+
+# Task shape kept in the cache; a superset of what the task tools format.
+cache_task_fields = "id,title,notes,due,status,completed,hidden,deleted,parent,position,updated"
+sync_fields = f"items({cache_task_fields}),nextPageToken"
+
+
+def parse_rfc3339(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class _Tasklist:
+    def __init__(self):
+        self.tasks: Dict[str, dict] = {}
+        self.updated_min: Optional[str] = None
+        self.refreshed_at = 0.0
+        self.failed_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    def reset(self) -> None:
+        self.tasks = {}
+        self.updated_min = None
+
+    def age(self) -> float:
+        return time.monotonic() - self.refreshed_at if self.updated_min else float("inf")
+
+    def apply(self, task: dict) -> None:
+        if task.get("deleted"):
+            self.tasks.pop(task["id"], None)
+        else:
+            self.tasks[task["id"]] = {**self.tasks.get(task["id"], {}), **task}
+
+    def ordered(self) -> List[dict]:
+        """
+        Tasks in list order: top-level tasks by position, each followed by its subtasks.
+        """
+        def key(task: dict) -> Tuple[str, int, str]:
+            parent = self.tasks.get(task.get("parent") or "")
+            if parent:
+                return parent.get("position", ""), 1, task.get("position", "")
+            return task.get("position", ""), 0, ""
+        return sorted(self.tasks.values(), key=key)
+
+
+class GoogleTasksCache:
+    """
+    Per-user, per-account copy of task lists, refreshed incrementally.
+
+    The first read of a task list downloads it in full. Later refreshes ask only for tasks updated since the
+    previous refresh (`updatedMin`, moved back by `clock_skew_seconds` so no change is missed), with
+    `showDeleted=True` so deletions arrive as tombstones. Callers pass the staleness they accept; older
+    task lists are refreshed before use. Writes made through this service are applied directly.
+    A task list whose refresh failed is not answered from the cache, nor refreshed again, for
+    `failure_ttl_seconds`; callers read it from the API directly in the meantime.
+    """
+
+    def __init__(
+            self,
+            max_tasklists: int = gtasks_cache_max_tasklists,
+            max_tasks_per_list: int = gtasks_cache_max_tasks_per_list,
+            clock_skew_seconds: float = gtasks_cache_clock_skew_seconds,
+            failure_ttl_seconds: float = gtasks_cache_failure_ttl_seconds
+    ):
+        self.max_tasklists = max_tasklists
+        self.max_tasks_per_list = max_tasks_per_list
+        self.clock_skew = timedelta(seconds=clock_skew_seconds)
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self._tasklists: "OrderedDict[Tuple[str, str, str], _Tasklist]" = OrderedDict()
+
+    async def list_tasks(self, user_uuid: str, account: str, tasklist_id: str, service, max_age_seconds: float,
+                         show_completed: Optional[bool] = None, show_hidden: Optional[bool] = None,
+                         show_deleted: Optional[bool] = None, max_results: Optional[int] = None,
+                         due_min: Optional[str] = None, due_max: Optional[str] = None) -> Optional[List[dict]]:
+        """
+        Tasks matching the same filters as `tasks.list`, or None when the cache cannot answer.
+        """
+        if show_deleted:
+            return None
+        tasklist = self._tasklist(user_uuid, account, tasklist_id)
+        async with tasklist.lock:
+            if tasklist.failed_at is not None and time.monotonic() - tasklist.failed_at <= self.failure_ttl_seconds:
+                return None
+            if tasklist.age() > max_age_seconds:
+                try:
+                    await self._refresh(service, tasklist_id, tasklist)
+                    tasklist.failed_at = None
+                except Exception as e:
+                    if is_not_found(e):
+                        # Tasklist IDs other than "@default" exist in only one of the user's accounts.
+                        logger.debug(f"Tasks cache: tasklist {tasklist_id} not found in account {account}")
+                    else:
+                        logger.warning(f"Tasks cache refresh failed for user {user_uuid}, tasklist {tasklist_id}: {e}")
+                    tasklist.reset()
+                    tasklist.failed_at = time.monotonic()
+                    return None
+            due_after, due_before = parse_rfc3339(due_min), parse_rfc3339(due_max)
+            tasks = []
+            for task in tasklist.ordered():
+                if show_completed is False and task.get("status") == "completed":
+                    continue
+                # Like tasks.list, hidden tasks are left out unless asked for.
+                if not show_hidden and task.get("hidden"):
+                    continue
+                due = parse_rfc3339(task.get("due"))
+                if (due_after or due_before) and due is None:
+                    continue
+                if (due_after and due < due_after) or (due_before and due >= due_before):
+                    continue
+                tasks.append(task)
+            return tasks[:max_results] if max_results else tasks
+
+    def get_task(self, user_uuid: str, tasklist_id: str, task_id: str, max_age_seconds: float) -> Optional[Tuple[str, dict]]:
+        """
+        (account, task) from any account whose copy of the task list was refreshed within `max_age_seconds`;
+        never triggers a refresh.
+        """
+        for (cached_user, account, cached_tasklist), tasklist in self._tasklists.items():
+            if (cached_user, cached_tasklist) != (user_uuid, tasklist_id) or tasklist.age() > max_age_seconds:
+                continue
+            if task_id in tasklist.tasks:
+                return account, tasklist.tasks[task_id]
+        return None
+
+    def put(self, user_uuid: str, account: str, tasklist_id: str, task: dict) -> None:
+        self._write(user_uuid, account, tasklist_id, task)
+
+    def remove(self, user_uuid: str, account: str, tasklist_id: str, task_id: str) -> None:
+        self._write(user_uuid, account, tasklist_id, {"id": task_id, "deleted": True})
+
+    def _write(self, user_uuid: str, account: str, tasklist_id: str, task: dict) -> None:
+        for (cached_user, cached_account, cached_tasklist), tasklist in self._tasklists.items():
+            if cached_user != user_uuid or cached_account != account:
+                continue
+            if cached_tasklist == tasklist_id:
+                tasklist.apply(task)
+            else:
+                # "@default" and the list's own ID are cached separately; let the alias catch up on its next read.
+                tasklist.refreshed_at = 0.0
+
+    def _tasklist(self, user_uuid: str, account: str, tasklist_id: str) -> _Tasklist:
+        key = (user_uuid, account, tasklist_id)
+        tasklist = self._tasklists.get(key)
+        if tasklist is None:
+            tasklist = _Tasklist()
+            self._tasklists[key] = tasklist
+            while len(self._tasklists) > self.max_tasklists:
+                self._tasklists.popitem(last=False)
+        self._tasklists.move_to_end(key)
+        return tasklist
+
+    async def _refresh(self, service, tasklist_id: str, tasklist: _Tasklist) -> None:
+        started = datetime.now(timezone.utc)
+        params = {
+            "tasklist": tasklist_id,
+            "showCompleted": True,
+            "showHidden": True,
+            "maxResults": gtasks_page_size,
+            "fields": sync_fields,
+        }
+        if tasklist.updated_min:
+            params["updatedMin"] = tasklist.updated_min
+            params["showDeleted"] = True
+        page_token = None
+        while True:
+            response = await run_google_call(
+                service.tasks().list(pageToken=page_token, **params).execute
+            )
+            for task in response.get("items", []):
+                tasklist.apply(task)
+            if len(tasklist.tasks) > self.max_tasks_per_list:
+                raise OverflowError(f"task list has more than {self.max_tasks_per_list} tasks")
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        tasklist.updated_min = (started - self.clock_skew).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        tasklist.refreshed_at = time.monotonic()
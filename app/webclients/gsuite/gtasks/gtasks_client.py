@@ -1,51 +1,174 @@
 import asyncio
 import logging
-from typing import Any, Optional
-from app.decorators.retry_decorator import async_retryable
+import os
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.dto.task_operation import TaskOperation
+from app.webclients.gsuite.google_batch import execute_batch
 from app.webclients.gsuite.gtasks.base import GoogleTasksClientBase
-from app.webclients.gsuite.google_service_builder import generate_authenticated_client
-from app.utils.application_constants import google_tasks_service_version, google_tasks_service_name
+from app.webclients.gsuite.gtasks.gtasks_cache import GoogleTasksCache, cache_task_fields
+from app.webclients.gsuite.google_service_builder import fan_out_google_accounts, first_account_result, \
+    generate_primary_authenticated_account, is_not_found
+from app.utils.application_constants import google_tasks_service_version, google_tasks_service_name, \
+    gtasks_page_size, gtasks_tasklist_concurrency, gtasks_cache_enabled_key, gtasks_cache_default_max_age_seconds
+from app.webclients.gsuite.google_rate_limiter import run_google_call
 
 logger = logging.getLogger(__name__)
 
+default_tasklist_id = "@default"
+all_tasklists_fields = "items(id,title),nextPageToken"
+tasklist_ids_fields = "items(id),nextPageToken"
+# "$3" in task_id, parent or previous of a batch operation stands for the ID of the task created by operation 3.
+operation_reference = re.compile(r"^\$(\d+)$")
+
+
+async def iter_pages(list_fn: Callable[..., Any], page_token: Optional[str] = None,
+                     **params) -> AsyncIterator[List[dict]]:
+    """
+    Yields the items of each page of a Tasks `list` call, starting at `page_token` and following nextPageToken.
+    `fields` in `params` must include nextPageToken. Stopping the iteration stops fetching further pages.
+    """
+    while True:
+        response = await run_google_call(list_fn(pageToken=page_token, **params).execute)
+        yield response.get("items", [])
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+
+async def collect_pages(list_fn: Callable[..., Any], max_results: Optional[int] = None,
+                        page_token: Optional[str] = None, fields: Optional[str] = None, **params) -> List[dict]:
+    """
+    Items of every page of a Tasks `list` call from `page_token` on, or of as many pages as `max_results` needs.
+    """
+    if fields and "nextPageToken" not in fields:
+        fields = f"{fields},nextPageToken"
+    page_size = min(max_results, gtasks_page_size) if max_results else gtasks_page_size
+    items = []
+    async for page in iter_pages(list_fn, page_token, maxResults=page_size, fields=fields, **params):
+        items.extend(page)
+        if max_results and len(items) >= max_results:
+            break
+    return items[:max_results] if max_results else items
+
+
+def log_by_id_error(error: Exception, action: str) -> None:
+    """
+    Logs a failed call on a tasklist or task by ID. IDs other than "@default" exist in only one of the user's
+    accounts, so a 404 from every other account is expected and only logged at debug level.
+    """
+    if is_not_found(error):
+        logger.debug(f"Tasks API {action}: not found in this account")
+    else:
+        logger.error(f"Tasks API error {action}: {error}", exc_info=True)
+
+
+async def write_tasklist(user_uuid: str, tasklist_id: str, request_fn: Callable[[Any], Awaitable[Any]]) -> Tuple[Optional[str], Any]:
+    """
+    Runs a write against the account that owns `tasklist_id`. "@default" resolves in every account, so it
+    targets the primary account; any other tasklist ID exists in exactly one account, which is found by fan-out.
+
+    Returns:
+        (account, response) of the account that applied the write.
+    """
+    if tasklist_id == default_tasklist_id:
+        account, service = await generate_primary_authenticated_account(user_uuid, google_tasks_service_name, google_tasks_service_version)
+        return account, await request_fn(service)
+    results = await fan_out_google_accounts(user_uuid, google_tasks_service_name, google_tasks_service_version, request_fn,
+                                            deadline_seconds=None)
+    return first_account_result(results)
+
+def operation_references(operation: TaskOperation) -> Set[int]:
+    values = (operation.task_id, operation.parent, operation.previous)
+    return {int(match.group(1)) for match in (operation_reference.match(value or "") for value in values) if match}
+
+
+def validate_task_operation(index: int, operation: TaskOperation) -> Optional[str]:
+    if operation.action == "create" and not operation.title:
+        return "create requires title"
+    if operation.action in ("update", "delete") and not operation.task_id:
+        return f"{operation.action} requires task_id"
+    if operation.action == "update" and not any(
+            (operation.title, operation.notes, operation.due, operation.status, operation.parent, operation.previous)):
+        return "update requires at least one field to change"
+    if any(reference >= index for reference in operation_references(operation)):
+        return "references must point to an earlier operation"
+    return None
+
+
+def task_operation_requests(service, operation: TaskOperation, resolve: Callable[[Optional[str]], Optional[str]],
+                            fields: Optional[str]) -> list:
+    body = {key: value for key, value in
+            (("title", operation.title), ("notes", operation.notes), ("due", operation.due), ("status", operation.status))
+            if value}
+    task_id, parent, previous = resolve(operation.task_id), resolve(operation.parent), resolve(operation.previous)
+    if operation.action == "create":
+        return [service.tasks().insert(tasklist=operation.tasklist_id, body=body, parent=parent, previous=previous, fields=fields)]
+    if operation.action == "delete":
+        return [service.tasks().delete(tasklist=operation.tasklist_id, task=task_id)]
+    requests = []
+    if body:
+        requests.append(service.tasks().patch(tasklist=operation.tasklist_id, task=task_id, body=body, fields=fields))
+    if parent or previous:
+        requests.append(service.tasks().move(tasklist=operation.tasklist_id, task=task_id, parent=parent, previous=previous, fields=fields))
+    return requests
+
+
 class GoogleTasksClientImpl(GoogleTasksClientBase):
+    def __init__(self):
+        cache_enabled = os.getenv(gtasks_cache_enabled_key, "true").lower() == "true"
+        self.tasks_cache = GoogleTasksCache() if cache_enabled else None
 
-    @async_retryable()
-    async def list_tasklists(self, user_uuid: str, max_results: Optional[int] = None, page_token: Optional[str] = None) -> Any:
-        services = await generate_authenticated_client(user_uuid, google_tasks_service_name, google_tasks_service_version)
-        for service in services:
+    def write_fields(self, fields: Optional[str]) -> Optional[str]:
+        # Single-task responses come back in the full cached shape so they can be stored as is.
+        return cache_task_fields if self.tasks_cache and fields else fields
+
+    async def list_tasklists(self, user_uuid: str, max_results: Optional[int] = None, page_token: Optional[str] = None,
+                             fields: Optional[str] = None) -> Any:
+        async def fetch(service) -> list:
             try:
-                req = service.tasklists().list()
-                if max_results:
-                    req = req.maxResults(max_results)
-                if page_token:
-                    req = req.pageToken(page_token)
-                response = await asyncio.to_thread(req.execute)
-                return response.get("items", [])
+                return await collect_pages(service.tasklists().list, max_results, page_token, fields)
             except Exception as e:
                 logger.error(f"Tasks API error listing tasklists: {e}", exc_info=True)
                 raise
 
-    @async_retryable()
-    async def get_tasklist(self, user_uuid: str, tasklist_id: str) -> Any:
-        services = await generate_authenticated_client(user_uuid, google_tasks_service_name, google_tasks_service_version)
-        for service in services:
+        results = await fan_out_google_accounts(user_uuid, google_tasks_service_name, google_tasks_service_version, fetch)
+        return [
+            {**tasklist, "account": result.account}
+            for result in results if result.error is None
+            for tasklist in result.result
+        ]
+
+    async def get_tasklist(self, user_uuid: str, tasklist_id: str, fields: Optional[str] = None) -> Any:
+        async def fetch(service) -> dict:
             try:
-                response = await asyncio.to_thread(
-                    service.tasklists().get(tasklist=tasklist_id).execute
+                response = await run_google_call(
+                    service.tasklists().get(tasklist=tasklist_id, fields=fields).execute
                 )
                 return response
             except Exception as e:
-                logger.error(f"Tasks API error getting tasklist: {e}", exc_info=True)
+                log_by_id_error(e, "getting tasklist")
                 raise
 
-    @async_retryable()
+        results = await fan_out_google_accounts(user_uuid, google_tasks_service_name, google_tasks_service_version, fetch)
+        account, response = first_account_result(results)
+        return {**response, "account": account} if response is not None else None
+
     async def list_tasks(self, user_uuid: str, tasklist_id: str, show_completed: Optional[bool] = None,
                          show_hidden: Optional[bool] = None, show_deleted: Optional[bool] = None,
                          max_results: Optional[int] = None, due_min: Optional[str] = None,
-                         due_max: Optional[str] = None, page_token: Optional[str] = None) -> Any:
-        services = await generate_authenticated_client(user_uuid, google_tasks_service_name, google_tasks_service_version)
-        for service in services:
+                         due_max: Optional[str] = None, page_token: Optional[str] = None,
+                         fields: Optional[str] = None, max_age_seconds: Optional[float] = None) -> Any:
+        max_age_seconds = gtasks_cache_default_max_age_seconds if max_age_seconds is None else max_age_seconds
+
+        async def fetch(account: str, service) -> list:
+            if self.tasks_cache and not page_token:
+                cached = await self.tasks_cache.list_tasks(
+                    user_uuid, account, tasklist_id, service, max_age_seconds, show_completed, show_hidden, show_deleted,
+                    max_results, due_min, due_max
+                )
+                if cached is not None:
+                    return cached
             try:
                 params = {'tasklist': tasklist_id}
                 if show_completed is not None:
@@ -54,42 +177,55 @@ class GoogleTasksClientImpl(GoogleTasksClientBase):
                     params['showHidden'] = show_hidden
                 if show_deleted is not None:
                     params['showDeleted'] = show_deleted
-                if max_results:
-                    params['maxResults'] = max_results
                 if due_min:
                     params['dueMin'] = due_min
                 if due_max:
                     params['dueMax'] = due_max
-                if page_token:
-                    params['pageToken'] = page_token
-
-                req = service.tasks().list(**params)
-                response = await asyncio.to_thread(req.execute)
-                return response.get("items", [])
+                return await collect_pages(service.tasks().list, max_results, page_token, fields, **params)
             except Exception as e:
-                logger.error(f"Tasks API error listing tasks: {e}", exc_info=True)
+                log_by_id_error(e, "listing tasks")
                 raise
 
+        # "@default" exists in every account and is merged; other tasklist IDs only resolve in their own account.
+        results = await fan_out_google_accounts(user_uuid, google_tasks_service_name, google_tasks_service_version, fetch,
+                                                with_account=True)
+        return [
+            {**task, "account": result.account}
+            for result in results if result.error is None
+            for task in result.result
+        ]
+
+    async def get_task(self, user_uuid: str, tasklist_id: str, task_id: str, fields: Optional[str] = None,
+                       max_age_seconds: Optional[float] = None) -> Any:
+        if self.tasks_cache:
+            max_age_seconds = gtasks_cache_default_max_age_seconds if max_age_seconds is None else max_age_seconds
+            cached = self.tasks_cache.get_task(user_uuid, tasklist_id, task_id, max_age_seconds)
+            if cached:
+                account, task = cached
+                return {**task, "account": account}
 
-    @async_retryable()
-    async def get_task(self, user_uuid: str, tasklist_id: str, task_id: str) -> Any:
-        services = await generate_authenticated_client(user_uuid, google_tasks_service_name, google_tasks_service_version)
-        for service in services:
+        async def fetch(service) -> dict:
             try:
-                response = await asyncio.to_thread(
-                    service.tasks().get(tasklist=tasklist_id, task=task_id).execute
+                response = await run_google_call(
+                    service.tasks().get(tasklist=tasklist_id, task=task_id, fields=self.write_fields(fields)).execute
                 )
                 return response
             except Exception as e:
-                logger.error(f"Tasks API error getting task: {e}", exc_info=True)
+                log_by_id_error(e, "getting task")
                 raise
 
-    @async_retryable()
+        results = await fan_out_google_accounts(user_uuid, google_tasks_service_name, google_tasks_service_version, fetch)
+        account, response = first_account_result(results)
+        if response is None:
+            return None
+        if self.tasks_cache:
+            self.tasks_cache.put(user_uuid, account, tasklist_id, response)
+        return {**response, "account": account}
+
     async def create_task(self, user_uuid: str, tasklist_id: str, title: str,
                           notes: Optional[str] = None, due: Optional[str] = None,
                           status: Optional[str] = None, parent: Optional[str] = None,
-                          previous: Optional[str] = None) -> Any:
-        services = await generate_authenticated_client(user_uuid, google_tasks_service_name, google_tasks_service_version)
+                          previous: Optional[str] = None, fields: Optional[str] = None) -> Any:
         body = {"title": title}
         if notes:
             body["notes"] = notes
@@ -99,29 +235,31 @@ class GoogleTasksClientImpl(GoogleTasksClientBase):
             body["due"] = due
         if status:
             body["status"] = status
-        if parent:
-            body["parent"] = parent
-        if previous:
-            body["previous"] = previous
 
-        for service in services:
+        async def create(service) -> dict:
             try:
-                response = await asyncio.to_thread(
-                    service.tasks().insert(tasklist=tasklist_id, body=body).execute
+                # parent and previous are read-only in the task body; insert only honours them as query parameters.
+                response = await run_google_call(
+                    service.tasks().insert(tasklist=tasklist_id, body=body, parent=parent, previous=previous,
+                                           fields=self.write_fields(fields)).execute
                 )
                 return response
             except Exception as e:
-                logger.error(f"Tasks API error creating task: {e}", exc_info=True)
+                log_by_id_error(e, "creating task")
                 raise
 
-    @async_retryable()
+        account, response = await write_tasklist(user_uuid, tasklist_id, create)
+        if self.tasks_cache and response:
+            self.tasks_cache.put(user_uuid, account, tasklist_id, response)
+        return response
+
     async def modify_task(self, user_uuid: str, tasklist_id: str, task_id: str,
                           title: Optional[str] = None, notes: Optional[str] = None,
                           due: Optional[str] = None, status: Optional[str] = None,
                           parent: Optional[str] = None, previous: Optional[str] = None,
                           completed: Optional[str] = None, deleted: Optional[bool] = None,
-                          hidden: Optional[bool] = None, position: Optional[str] = None) -> Any:
-        services = await generate_authenticated_client(user_uuid, google_tasks_service_name, google_tasks_service_version)
+                          hidden: Optional[bool] = None, position: Optional[str] = None,
+                          fields: Optional[str] = None) -> Any:
         body = {}
         if title:
             body["title"] = title
@@ -131,10 +269,6 @@ class GoogleTasksClientImpl(GoogleTasksClientBase):
             body["due"] = due
         if status:
             body["status"] = status
-        if parent:
-            body["parent"] = parent
-        if previous:
-            body["previous"] = previous
         if completed:
             body["completed"] = completed
         if deleted is not None:
@@ -144,25 +278,192 @@ class GoogleTasksClientImpl(GoogleTasksClientBase):
         if position:
             body["position"] = position
 
-        for service in services:
+        async def modify(service) -> dict:
             try:
-                response = await asyncio.to_thread(
-                    service.tasks().patch(tasklist=tasklist_id, task=task_id, body=body).execute
+                response = await run_google_call(
+                    service.tasks().patch(tasklist=tasklist_id, task=task_id, body=body, fields=self.write_fields(fields)).execute
                 )
+                if parent or previous:
+                    # Position is read-only in the task body; re-parenting and reordering go through move.
+                    response = await run_google_call(
+                        service.tasks().move(tasklist=tasklist_id, task=task_id, parent=parent, previous=previous,
+                                             fields=self.write_fields(fields)).execute
+                    )
                 return response
             except Exception as e:
-                logger.error(f"Tasks API error modifying task: {e}", exc_info=True)
+                log_by_id_error(e, "modifying task")
                 raise
 
-    @async_retryable()
+        account, response = await write_tasklist(user_uuid, tasklist_id, modify)
+        if self.tasks_cache and response:
+            self.tasks_cache.put(user_uuid, account, tasklist_id, response)
+        return response
+
     async def delete_task(self, user_uuid: str, tasklist_id: str, task_id: str) -> Any:
-        services = await generate_authenticated_client(user_uuid, google_tasks_service_name, google_tasks_service_version)
-        for service in services:
+        async def delete(service) -> bool:
             try:
-                await asyncio.to_thread(
+                await run_google_call(
                     service.tasks().delete(tasklist=tasklist_id, task=task_id).execute
                 )
                 return True
             except Exception as e:
-                logger.error(f"Tasks API error deleting task: {e}", exc_info=True)
+                log_by_id_error(e, "deleting task")
                 raise
+
+        account, response = await write_tasklist(user_uuid, tasklist_id, delete)
+        if self.tasks_cache and response:
+            self.tasks_cache.remove(user_uuid, account, tasklist_id, task_id)
+        return response
+
+    async def list_all_open_tasks(self, user_uuid: str, max_results: int, due_max: Optional[str] = None,
+                                  fields: Optional[str] = None) -> Any:
+        async def fetch(service) -> Dict[str, Any]:
+            tasklists = []
+            async for page in iter_pages(service.tasklists().list, maxResults=gtasks_page_size, fields=all_tasklists_fields):
+                tasklists.extend(page)
+            tasks_by_list: Dict[str, List[dict]] = {tasklist["id"]: [] for tasklist in tasklists}
+            collected = 0
+            # One task beyond the cap tells whether more exist.
+            cap = max_results + 1
+            semaphore = asyncio.Semaphore(gtasks_tasklist_concurrency)
+
+            async def collect(tasklist: dict) -> None:
+                nonlocal collected
+                async with semaphore:
+                    if collected >= cap:
+                        return
+                    params = {
+                        "tasklist": tasklist["id"],
+                        # Completed and hidden tasks are filtered out by the API, not after download.
+                        "showCompleted": False,
+                        "showHidden": False,
+                        "maxResults": gtasks_page_size,
+                        "fields": fields,
+                    }
+                    if due_max:
+                        params["dueMax"] = due_max
+                    async for page in iter_pages(service.tasks().list, **params):
+                        if collected >= cap:
+                            return
+                        page = page[:cap - collected]
+                        collected += len(page)
+                        tasks_by_list[tasklist["id"]].extend(
+                            {**task, "tasklist_id": tasklist["id"], "tasklist": tasklist.get("title", "")} for task in page
+                        )
+                        if collected >= cap:
+                            return
+
+            try:
+                await asyncio.gather(*(collect(tasklist) for tasklist in tasklists))
+            except Exception as e:
+                logger.error(f"Tasks API error listing open tasks: {e}", exc_info=True)
+                raise
+            # Grouped by task list in list order, so the output does not depend on which request finished first.
+            return {
+                "tasks": [task for tasklist in tasklists for task in tasks_by_list[tasklist["id"]]][:max_results],
+                "truncated": collected > max_results,
+            }
+
+        results = await fan_out_google_accounts(user_uuid, google_tasks_service_name, google_tasks_service_version, fetch)
+        tasks = [
+            {**task, "account": result.account}
+            for result in results if result.error is None
+            for task in result.result["tasks"]
+        ]
+        truncated = len(tasks) > max_results or any(result.error is None and result.result["truncated"] for result in results)
+        return {"tasks": tasks[:max_results], "truncated": truncated}
+
+    # Not retried as a whole: a transport error after some inserts landed would create them twice.
+    async def batch_tasks(self, user_uuid: str, operations: List[TaskOperation], keep_order: bool = False,
+                          fields: Optional[str] = None) -> Any:
+        operations = [operation.model_copy() for operation in operations]
+        tasklist_ids = {operation.tasklist_id for operation in operations if operation.tasklist_id != default_tasklist_id}
+
+        async def resolve_account(account: str, service) -> Dict[str, Any]:
+            owned = set()
+            if tasklist_ids:
+                async for page in iter_pages(service.tasklists().list, maxResults=gtasks_page_size, fields=tasklist_ids_fields):
+                    owned.update(tasklist["id"] for tasklist in page)
+            return {"account": account, "service": service, "tasklists": owned}
+
+        accounts = await fan_out_google_accounts(user_uuid, google_tasks_service_name, google_tasks_service_version,
+                                                 resolve_account, with_account=True)
+
+        def owner(tasklist_id: str) -> Optional[Dict[str, Any]]:
+            if tasklist_id == default_tasklist_id:
+                primary = accounts[0] if accounts else None
+                return primary.result if primary and primary.error is None else None
+            return next((account.result for account in accounts
+                         if account.error is None and tasklist_id in account.result["tasklists"]), None)
+
+        results: List[dict] = [
+            {"index": index, "action": operation.action, "task_id": operation.task_id, "title": operation.title}
+            for index, operation in enumerate(operations)
+        ]
+        dependencies: Dict[int, Set[int]] = {}
+        last_create: Dict[tuple, int] = {}
+        for index, operation in enumerate(operations):
+            error = validate_task_operation(index, operation)
+            if error:
+                results[index]["error"] = error
+                continue
+            dependencies[index] = operation_references(operation)
+            if keep_order and operation.action == "create" and not operation.previous:
+                group = (operation.tasklist_id, operation.parent)
+                if group in last_create:
+                    # Concurrent inserts land in arbitrary order; chain each one after the previous create of its list.
+                    operation.previous = f"${last_create[group]}"
+                    dependencies[index].add(last_create[group])
+                last_create[group] = index
+
+        def resolve(value: Optional[str]) -> Optional[str]:
+            match = operation_reference.match(value or "")
+            return results[int(match.group(1))].get("id") if match else value
+
+        written: Dict[int, dict] = {}
+        pending = sorted(dependencies)
+        while pending:
+            # References only point backwards, so every round has at least one ready operation.
+            ready = [index for index in pending if not dependencies[index] & set(pending)]
+            pending = [index for index in pending if index not in ready]
+            by_service: Dict[int, tuple] = {}
+            for index in ready:
+                failed = [dependency for dependency in dependencies[index] if not results[dependency].get("ok")]
+                owning_account = owner(operations[index].tasklist_id)
+                if failed:
+                    results[index]["error"] = f"depends on failed operation {failed[0]}"
+                elif owning_account is None:
+                    results[index]["error"] = f"tasklist {operations[index].tasklist_id} not found in any connected account"
+                else:
+                    service = owning_account["service"]
+                    requests = task_operation_requests(service, operations[index], resolve, self.write_fields(fields))
+                    entry = by_service.setdefault(id(service), (service, []))
+                    entry[1].extend((index, request) for request in requests)
+            batches = list(by_service.values())
+            outcomes = await asyncio.gather(*(
+                execute_batch(service, [request for _, request in requests]) for service, requests in batches
+            ))
+            for (_, requests), outcome in zip(batches, outcomes):
+                for (index, _), (response, error) in zip(requests, outcome):
+                    if error:
+                        logger.warning(f"Tasks API error in batch operation {index}: {error}")
+                        results[index]["error"] = str(error)
+                        results[index].pop("ok", None)
+                    elif "error" not in results[index]:
+                        results[index]["ok"] = True
+                        if response:
+                            results[index].update({key: response[key] for key in ("id", "title") if key in response})
+                            written[index] = response
+            if self.tasks_cache:
+                for index in ready:
+                    if results[index].get("ok"):
+                        self.cache_operation(user_uuid, owner(operations[index].tasklist_id)["account"],
+                                             operations[index], resolve(operations[index].task_id), written.get(index))
+        return results
+
+    def cache_operation(self, user_uuid: str, account: str, operation: TaskOperation, task_id: Optional[str],
+                        response: Optional[dict]) -> None:
+        if operation.action == "delete":
+            self.tasks_cache.remove(user_uuid, account, operation.tasklist_id, task_id)
+        elif response:
+            self.tasks_cache.put(user_uuid, account, operation.tasklist_id, response)
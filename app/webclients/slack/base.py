@@ -1,12 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, AsyncIterator, Optional
 from slack_sdk.web.async_client import AsyncSlackResponse
 
 
 class SlackClient(ABC):
 
     @abstractmethod
-    async def list_conversations(self, token: str) -> AsyncSlackResponse:
+    async def list_conversations(self, token: str, cursor: Optional[str] = None, limit: Optional[int] = None) -> AsyncSlackResponse:
         pass
 
     @abstractmethod
@@ -14,11 +14,13 @@ class SlackClient(ABC):
         pass
 
     @abstractmethod
-    async def get_conversation_history(self, token: str, channel_id: str, limit: int) -> AsyncSlackResponse:
+    async def get_conversation_history(self, token: str, channel_id: str, limit: int, cursor: Optional[str] = None,
+                                       oldest: Optional[str] = None, latest: Optional[str] = None) -> AsyncSlackResponse:
         pass
 
     @abstractmethod
-    async def get_conversation_replies(self, token: str, channel_id: str, ts: str) -> AsyncSlackResponse:
+    async def get_conversation_replies(self, token: str, channel_id: str, ts: str, cursor: Optional[str] = None,
+                                       limit: Optional[int] = None) -> AsyncSlackResponse:
         pass
 
     @abstractmethod
@@ -26,7 +28,45 @@ class SlackClient(ABC):
         pass
 
     @abstractmethod
-    async def list_users(self, token: str) -> AsyncSlackResponse:
+    async def list_users(self, token: str, cursor: Optional[str] = None, limit: Optional[int] = None) -> AsyncSlackResponse:
+        pass
+
+    @abstractmethod
+    def iter_conversations(self, token: str, limit: Optional[int] = None) -> AsyncIterator[dict]:
+        """
+        Every conversation the token can see, one page of `limit` at a time.
+        """
+        pass
+
+    @abstractmethod
+    def iter_users(self, token: str, limit: Optional[int] = None) -> AsyncIterator[dict]:
+        """
+        Every user of the workspace, one page of `limit` at a time.
+        """
+        pass
+
+    @abstractmethod
+    def iter_conversation_replies(self, token: str, channel_id: str, ts: str, limit: Optional[int] = None) -> AsyncIterator[dict]:
+        """
+        The thread root followed by every reply, one page of `limit` at a time.
+        """
+        pass
+
+    @abstractmethod
+    def iter_conversation_history(self, token: str, channel_id: str, oldest: Optional[str] = None,
+                                  latest: Optional[str] = None, limit: Optional[int] = None) -> AsyncIterator[dict]:
+        """
+        Messages of the channel between `oldest` and `latest` (Slack ts, either bound optional), newest first,
+        one page of `limit` at a time.
+        """
+        pass
+
+    @abstractmethod
+    async def search_workspace_messages(self, token: str, query: str, page: int = 1,
+                                        count: Optional[int] = None) -> AsyncSlackResponse:
+        """
+        `search.messages` results for `query`, newest first; needs a user token.
+        """
         pass
 
     @abstractmethod
@@ -41,6 +81,11 @@ class SlackClient(ABC):
     async def is_bot_member_of_conversation(self, request: dict) -> Any:
         pass
 
+    @abstractmethod
+    async def list_conversation_members(self, token: str, channel_id: str, cursor: Optional[str] = None,
+                                        limit: Optional[int] = None) -> AsyncSlackResponse:
+        pass
+
     @abstractmethod
     async def get_conversation_members(self, request: dict) -> Any:
         pass
@@ -1,19 +1,76 @@
 import logging
-from slack_sdk.web.async_client import AsyncWebClient, AsyncSlackResponse
+import os
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from slack_sdk.http_retry.builtin_async_handlers import AsyncConnectionErrorRetryHandler, AsyncServerErrorRetryHandler
+from slack_sdk.web.async_client import AsyncSlackResponse, AsyncWebClient
 from app.webclients.slack.base import SlackClient
-from app.decorators.retry_decorator import async_retryable
+from app.webclients.slack.slack_directory import SlackDirectory
+from app.webclients.slack.slack_http import slack_http_session
+from app.webclients.slack.slack_message_index import SlackMessageIndex
+from app.webclients.slack.slack_rate_limiter import SlackRateLimiter, ScheduledAsyncWebClient
+from app.webclients.slack.slack_workspace_search import SlackWorkspaceSearch
+from app.utils.application_constants import slack_page_limit, slack_message_index_enabled_key, slack_http_max_clients, \
+    slack_search_page_limit
 from slack_sdk.errors import SlackApiError
 
 logger = logging.getLogger(__name__)
 
+
+async def iter_cursor_pages(fetch_page: Callable[[Optional[str]], Awaitable[AsyncSlackResponse]],
+                            key: str) -> AsyncIterator[dict]:
+    """
+    Yields the `key` items of every page, following `response_metadata.next_cursor` until Slack returns none.
+    Pages are only requested as the consumer advances, so stopping early skips the rest of the list.
+    """
+    cursor = None
+    while True:
+        response = await fetch_page(cursor)
+        for item in response.get(key, []):
+            yield item
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return
+
 class SlackClientImpl(SlackClient):
-    def __init__(self):
-        self.client = AsyncWebClient()
+    def __init__(self, max_clients: int = slack_http_max_clients, base_url: str = AsyncWebClient.BASE_URL):
+        self.scheduler = SlackRateLimiter()
+        self.max_clients = max_clients
+        self.base_url = base_url
+        # One web client per bot token, all sending through the shared pooled HTTP session.
+        self._clients: "OrderedDict[str, ScheduledAsyncWebClient]" = OrderedDict()
+        self.directory = SlackDirectory(self)
+        index_enabled = os.getenv(slack_message_index_enabled_key, "true").lower() == "true"
+        self.message_index = SlackMessageIndex(self) if index_enabled else None
+        self.workspace_search = SlackWorkspaceSearch(self)
+
+    def client_for(self, token: str) -> ScheduledAsyncWebClient:
+        """
+        The web client bound to `token`, created on first use and rebuilt when the shared session was reopened.
+        """
+        session = slack_http_session.get()
+        client = self._clients.get(token)
+        if client is None or client.session is not session:
+            # 429s are handled by the scheduler; the SDK only retries dropped connections and Slack 5xx answers.
+            client = ScheduledAsyncWebClient(
+                self.scheduler,
+                token=token,
+                base_url=self.base_url,
+                session=session,
+                retry_handlers=[AsyncConnectionErrorRetryHandler(), AsyncServerErrorRetryHandler(max_retry_count=2)]
+            )
+            self._clients[token] = client
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        self._clients.move_to_end(token)
+        return client
 
-    @async_retryable()
-    async def list_conversations(self, token: str) -> AsyncSlackResponse:
+    async def list_conversations(self, token: str, cursor: Optional[str] = None,
+                                 limit: int = slack_page_limit) -> AsyncSlackResponse:
         try:
-            return await self.client.conversations_list(token=token, types=["public_channel", "private_channel", "mpim", "im"])
+            return await self.client_for(token).conversations_list(
+                types=["public_channel", "private_channel", "mpim", "im"], cursor=cursor, limit=limit
+            )
         except SlackApiError as e:
             logger.error(f"Slack API error in list_conversations: {e}")
             raise
@@ -21,10 +78,9 @@ class SlackClientImpl(SlackClient):
             logger.exception("Unexpected error in list_conversations")
             raise
 
-    @async_retryable()
     async def get_conversation_info(self, token: str, channel_id: str) -> AsyncSlackResponse:
         try:
-            return await self.client.conversations_info(token=token, channel=channel_id)
+            return await self.client_for(token).conversations_info(channel=channel_id)
         except SlackApiError as e:
             logger.error(f"Slack API error in get_conversation_info: {e}")
             raise
@@ -32,10 +88,12 @@ class SlackClientImpl(SlackClient):
             logger.exception("Unexpected error in get_conversation_info")
             raise
 
-    @async_retryable()
-    async def get_conversation_history(self, token: str, channel_id: str, limit: int) -> AsyncSlackResponse:
+    async def get_conversation_history(self, token: str, channel_id: str, limit: int, cursor: Optional[str] = None,
+                                       oldest: Optional[str] = None, latest: Optional[str] = None) -> AsyncSlackResponse:
         try:
-            return await self.client.conversations_history(token=token, channel=channel_id, limit=limit)
+            return await self.client_for(token).conversations_history(
+                channel=channel_id, limit=limit, cursor=cursor, oldest=oldest, latest=latest
+            )
         except SlackApiError as e:
             logger.error(f"Slack API error in get_conversation_history: {e}")
             raise
@@ -43,10 +101,10 @@ class SlackClientImpl(SlackClient):
             logger.exception("Unexpected error in get_conversation_history")
             raise
 
-    @async_retryable()
-    async def get_conversation_replies(self, token: str, channel_id: str, ts: str) -> AsyncSlackResponse:
+    async def get_conversation_replies(self, token: str, channel_id: str, ts: str, cursor: Optional[str] = None,
+                                       limit: int = slack_page_limit) -> AsyncSlackResponse:
         try:
-            return await self.client.conversations_replies(token=token, channel=channel_id, ts=ts)
+            return await self.client_for(token).conversations_replies(channel=channel_id, ts=ts, cursor=cursor, limit=limit)
         except SlackApiError as e:
             logger.error(f"Slack API error in get_conversation_replies: {e}")
             raise
@@ -54,10 +112,9 @@ class SlackClientImpl(SlackClient):
             logger.exception("Unexpected error in get_conversation_replies")
             raise
 
-    @async_retryable()
     async def get_user_info(self, token: str, user_id: str) -> AsyncSlackResponse:
         try:
-            return await self.client.users_info(token=token, user=user_id)
+            return await self.client_for(token).users_info(user=user_id)
         except SlackApiError as e:
             logger.error(f"Slack API error in get_user_info: {e}")
             raise
@@ -65,10 +122,9 @@ class SlackClientImpl(SlackClient):
             logger.exception("Unexpected error in get_user_info")
             raise
 
-    @async_retryable()
-    async def list_users(self, token: str) -> AsyncSlackResponse:
+    async def list_users(self, token: str, cursor: Optional[str] = None, limit: int = slack_page_limit) -> AsyncSlackResponse:
         try:
-            return await self.client.users_list(token=token)
+            return await self.client_for(token).users_list(cursor=cursor, limit=limit)
         except SlackApiError as e:
             logger.error(f"Slack API error in list_users: {e}")
             raise
@@ -76,11 +132,44 @@ class SlackClientImpl(SlackClient):
             logger.exception("Unexpected error in list_users")
             raise
 
-    @async_retryable()
+    async def iter_conversations(self, token: str, limit: int = slack_page_limit) -> AsyncIterator[dict]:
+        async for channel in iter_cursor_pages(lambda cursor: self.list_conversations(token, cursor, limit), "channels"):
+            yield channel
+
+    async def iter_users(self, token: str, limit: int = slack_page_limit) -> AsyncIterator[dict]:
+        async for user in iter_cursor_pages(lambda cursor: self.list_users(token, cursor, limit), "members"):
+            yield user
+
+    async def iter_conversation_replies(self, token: str, channel_id: str, ts: str,
+                                        limit: int = slack_page_limit) -> AsyncIterator[dict]:
+        async for message in iter_cursor_pages(
+                lambda cursor: self.get_conversation_replies(token, channel_id, ts, cursor, limit), "messages"
+        ):
+            yield message
+
+    async def iter_conversation_history(self, token: str, channel_id: str, oldest: Optional[str] = None,
+                                        latest: Optional[str] = None, limit: int = slack_page_limit) -> AsyncIterator[dict]:
+        async for message in iter_cursor_pages(
+                lambda cursor: self.get_conversation_history(token, channel_id, limit, cursor, oldest, latest), "messages"
+        ):
+            yield message
+
+    async def search_workspace_messages(self, token: str, query: str, page: int = 1,
+                                        count: int = slack_search_page_limit) -> AsyncSlackResponse:
+        try:
+            return await self.client_for(token).search_messages(
+                query=query, sort="timestamp", sort_dir="desc", page=page, count=count
+            )
+        except SlackApiError as e:
+            logger.error(f"Slack API error in search_workspace_messages: {e}")
+            raise
+        except Exception:
+            logger.exception("Unexpected error in search_workspace_messages")
+            raise
+
     async def search_messages_in_conversation(self, request: dict) -> AsyncSlackResponse:
         try:
-            return await self.client.conversations_history(
-                token=request["bot_token"],
+            return await self.client_for(request["bot_token"]).conversations_history(
                 channel=request["channel_id"],
                 limit=request.get("limit", 100)
             )
@@ -91,11 +180,9 @@ class SlackClientImpl(SlackClient):
             logger.exception("Unexpected error in search_messages_in_conversation")
             raise
 
-    @async_retryable()
     async def get_messages_mentioning_user(self, request: dict) -> dict:
         try:
-            history_response = await self.client.conversations_history(
-                token=request["bot_token"],
+            history_response = await self.client_for(request["bot_token"]).conversations_history(
                 channel=request["channel_id"],
                 limit=request.get("limit", 100)
             )
@@ -116,11 +203,9 @@ class SlackClientImpl(SlackClient):
             logger.exception("Unexpected error in get_messages_mentioning_user")
             raise
 
-    @async_retryable()
     async def is_bot_member_of_conversation(self, request: dict) -> bool:
         try:
-            response = await self.client.conversations_info(
-                token=request["bot_token"],
+            response = await self.client_for(request["bot_token"]).conversations_info(
                 channel=request["channel_id"]
             )
             return response["channel"].get("is_member", False)
@@ -131,21 +216,31 @@ class SlackClientImpl(SlackClient):
             logger.exception("Unexpected error in is_bot_member_of_conversation")
             raise
 
-    @async_retryable()
+    async def list_conversation_members(self, token: str, channel_id: str, cursor: Optional[str] = None,
+                                        limit: int = slack_page_limit) -> AsyncSlackResponse:
+        try:
+            return await self.client_for(token).conversations_members(channel=channel_id, cursor=cursor, limit=limit)
+        except SlackApiError as e:
+            logger.error(f"Slack API error in list_conversation_members: {e}")
+            raise
+        except Exception:
+            logger.exception("Unexpected error in list_conversation_members")
+            raise
+
     async def get_conversation_members(self, request: dict) -> dict:
         try:
-            members_resp = await self.client.conversations_members(
-                token=request["bot_token"],
-                channel=request["channel_id"]
-            )
-            member_ids = members_resp.get("members", [])
-            member_info = []
-            for user_id in member_ids:
-                user_resp = await self.client.users_info(token=request["bot_token"], user=user_id)
-                member_info.append({
-                    "id": user_id,
-                    "name": user_resp["user"]["name"]
-                })
+            token = request["bot_token"]
+            member_ids = [
+                user_id async for user_id in iter_cursor_pages(
+                    lambda cursor: self.list_conversation_members(token, request["channel_id"], cursor), "members"
+                )
+            ]
+            # Names come from the workspace directory; only members missing from it cost a users.info call.
+            users = await self.directory.get_users(token, member_ids)
+            member_info = [
+                {"id": user_id, "name": users[user_id]["name"] if user_id in users else user_id}
+                for user_id in member_ids
+            ]
             return {"members": member_info}
         except SlackApiError as e:
             logger.error(f"Slack API error in get_conversation_members: {e}")
@@ -155,10 +250,9 @@ class SlackClientImpl(SlackClient):
             raise
 
 
-    @async_retryable()
     async def get_dm_channel_with_user(self, token: str, user_id: str) -> str:
         try:
-            response = await self.client.conversations_open(users=[user_id], token=token)
+            response = await self.client_for(token).conversations_open(users=[user_id])
             return response["channel"]["id"]
         except SlackApiError as e:
             logger.error(f"Slack API error in get_dm_channel_with_user: {e}")
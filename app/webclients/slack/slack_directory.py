@@ -0,0 +1,323 @@
+import asyncio
+import bisect
+import difflib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.application_constants import slack_directory_ttl_seconds, slack_directory_max_stale_seconds, \
+    slack_directory_max_workspaces, slack_directory_max_records, slack_directory_lookup_concurrency, \
+    slack_directory_max_lookups
+from app.webclients.slack.slack_workspaces import workspace_label
+
+logger = logging.getLogger(__name__)
+
+
+def user_names(user: dict) -> List[str]:
+    profile = user.get("profile") or {}
+    return [user.get("name"), profile.get("display_name"), user.get("real_name") or profile.get("real_name")]
+
+
+def channel_names(channel: dict) -> List[str]:
+    return [channel.get("name")]
+
+
+def user_label(user: dict) -> str:
+    profile = user.get("profile") or {}
+    return profile.get("display_name") or user.get("real_name") or profile.get("real_name") or user.get("name") or user["id"]
+
+
+name_separators = re.compile(r"[\s._-]+")
+user_reference = re.compile(r"<@([UW][A-Z0-9]+)(?:\|[^>]*)?>")
+channel_reference = re.compile(r"<#([CGD][A-Z0-9]+)(?:\|[^>]*)?>")
+
+
+class _Index:
+    """
+    One kind of directory record (users or channels) of one workspace: id -> record and lower-cased name -> id.
+    """
+
+    def __init__(self, names_fn: Callable[[dict], Iterable[Optional[str]]]):
+        self.names_fn = names_fn
+        self.records: Dict[str, dict] = {}
+        self.ids_by_name: Dict[str, str] = {}
+        self._sorted_names: Optional[List[Tuple[str, str]]] = None
+        self.loaded_at: Optional[float] = None
+        self.refresh_task: Optional[asyncio.Task] = None
+
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at if self.loaded_at is not None else float("inf")
+
+    def put(self, record: dict) -> None:
+        self.records[record["id"]] = record
+        for name in self.names_fn(record):
+            if name:
+                self.ids_by_name.setdefault(name.lower(), record["id"])
+        self._sorted_names = None
+
+    def replace(self, records: Dict[str, dict]) -> None:
+        self.records = {}
+        self.ids_by_name = {}
+        for record in records.values():
+            self.put(record)
+        self.loaded_at = time.monotonic()
+
+    def search(self, query: str, limit: int) -> List[Tuple[float, dict]]:
+        """
+        Up to `limit` (score, record) pairs whose names match `query`, best first. An exact name scores 1.0, a name
+        prefix 0.9, a word prefix inside the name 0.8 and any other substring 0.7. Only when those find fewer than
+        `limit` records are misspellings tried, scored by similarity below 0.7.
+        """
+        query = query.lower()
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self.ids_by_name.items())
+        names = self._sorted_names
+        scores: Dict[str, float] = {}
+
+        def score(record_id: str, value: float) -> None:
+            scores[record_id] = max(value, scores.get(record_id, 0.0))
+
+        for name, record_id in names[bisect.bisect_left(names, (query, "")):]:
+            if not name.startswith(query):
+                break
+            score(record_id, 1.0 if name == query else 0.9)
+        if len(scores) < limit:
+            for name, record_id in names:
+                if query in name and not name.startswith(query):
+                    words = name_separators.split(name)
+                    score(record_id, 0.8 if any(word.startswith(query) for word in words) else 0.7)
+        if len(scores) < limit:
+            for name in difflib.get_close_matches(query, self.ids_by_name, n=limit, cutoff=0.6):
+                score(self.ids_by_name[name], 0.7 * difflib.SequenceMatcher(None, query, name).ratio())
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [(value, self.records[record_id]) for record_id, value in ranked]
+
+
+class _Workspace:
+    def __init__(self):
+        self.users = _Index(user_names)
+        self.channels = _Index(channel_names)
+
+
+class SlackDirectory:
+    """
+    Per-workspace cache of Slack users and channels, keyed by bot token and shared by every Slack tool.
+
+    Each index is filled by one paginated bulk listing (`users.list`, `conversations.list`), which runs as a
+    background task detached from the callers: a caller's deadline or cancellation never discards it. Within
+    `ttl_seconds` an index is served as is. Up to `max_stale_seconds` it is still served, and the listing replaces
+    it (stale-while-revalidate). Calls that need the whole directory wait for an older or missing listing; lookups
+    by ID never do. They use what is indexed, including the pages a first listing has read so far, and look the
+    rest up one by one. Workspaces with more than `max_records` users or channels are only partially listed;
+    lookups beyond the cap fall back to the API.
+    """
+
+    def __init__(
+            self,
+            client: Any,
+            ttl_seconds: float = slack_directory_ttl_seconds,
+            max_stale_seconds: float = slack_directory_max_stale_seconds,
+            max_workspaces: int = slack_directory_max_workspaces,
+            max_records: int = slack_directory_max_records,
+            lookup_concurrency: int = slack_directory_lookup_concurrency,
+            max_lookups: int = slack_directory_max_lookups
+    ):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.max_workspaces = max_workspaces
+        self.max_records = max_records
+        self.lookup_concurrency = lookup_concurrency
+        self.max_lookups = max_lookups
+        self._workspaces: "OrderedDict[str, _Workspace]" = OrderedDict()
+
+    async def users(self, token: str) -> Dict[str, dict]:
+        """
+        id -> user record of every listed user of the workspace.
+        """
+        index = await self._loaded(token, self._workspace(token).users, self.client.iter_users)
+        return index.records
+
+    async def channels(self, token: str) -> Dict[str, dict]:
+        """
+        id -> conversation record of every listed conversation the token can see.
+        """
+        index = await self._loaded(token, self._workspace(token).channels, self.client.iter_conversations)
+        return index.records
+
+    async def get_user(self, token: str, user_id: str) -> dict:
+        index = self._cached(token, self._workspace(token).users, self.client.iter_users)
+        if user_id not in index.records:
+            index.put(await self._fetch_user(token, user_id))
+        return index.records[user_id]
+
+    async def get_users(self, token: str, user_ids: List[str]) -> Dict[str, dict]:
+        """
+        user_id -> user record, from the index where possible and from `users.info` for the rest. With more than
+        `max_lookups` IDs missing, the directory listing is awaited instead, and what it lacks is looked up up to
+        the same cap. IDs that are not resolved are left out.
+        """
+        index = await self._indexed(token, self._workspace(token).users, self.client.iter_users, user_ids)
+        return await self._resolve(index, user_ids, lambda user_id: self._fetch_user(token, user_id), self.max_lookups)
+
+    async def get_channel(self, token: str, channel_id: str) -> dict:
+        index = self._cached(token, self._workspace(token).channels, self.client.iter_conversations)
+        if channel_id not in index.records:
+            index.put(await self._fetch_channel(token, channel_id))
+        return index.records[channel_id]
+
+    async def get_channels(self, token: str, channel_ids: List[str]) -> Dict[str, dict]:
+        """
+        channel_id -> conversation record, from the index where possible and from `conversations.info` for the rest,
+        like `get_users`.
+        """
+        index = await self._indexed(token, self._workspace(token).channels, self.client.iter_conversations, channel_ids)
+        return await self._resolve(index, channel_ids, lambda channel_id: self._fetch_channel(token, channel_id),
+                                   self.max_lookups)
+
+    async def render_mentions(self, token: str, messages: List[dict]) -> List[dict]:
+        """
+        Copies of `messages` with every `<@U...>` and `<#C...>` in their text replaced by `@name (U...)` and
+        `#name (C...)`, and the author's name under "user_name". All referenced users and channels are resolved
+        in one batch without waiting for a directory listing. Of the users and of the channels missing from the
+        index, at most `max_lookups` each are looked up one by one, authors first; references that are not
+        resolved are left as they are.
+        """
+        texts = [message.get("text") or "" for message in messages]
+        user_ids = [message["user"] for message in messages if message.get("user")]
+        channel_ids = []
+        for text in texts:
+            user_ids.extend(user_reference.findall(text))
+            channel_ids.extend(channel_reference.findall(text))
+        # A directory is only loaded when something refers to it.
+        workspace = self._workspace(token)
+        users, channels = {}, {}
+        if user_ids:
+            index = self._cached(token, workspace.users, self.client.iter_users)
+            users = await self._resolve(index, user_ids, lambda user_id: self._fetch_user(token, user_id),
+                                        self.max_lookups)
+        if channel_ids:
+            index = self._cached(token, workspace.channels, self.client.iter_conversations)
+            channels = await self._resolve(index, channel_ids, lambda channel_id: self._fetch_channel(token, channel_id),
+                                           self.max_lookups)
+
+        def user(match: re.Match) -> str:
+            record = users.get(match.group(1))
+            return f"@{user_label(record)} ({match.group(1)})" if record else match.group(0)
+
+        def channel(match: re.Match) -> str:
+            record = channels.get(match.group(1))
+            return f"#{record['name']} ({match.group(1)})" if record and record.get("name") else match.group(0)
+
+        rendered = []
+        for message, text in zip(messages, texts):
+            message = dict(message, text=channel_reference.sub(channel, user_reference.sub(user, text)))
+            if message.get("user") in users:
+                message["user_name"] = user_label(users[message["user"]])
+            rendered.append(message)
+        return rendered
+
+    async def user_id_by_name(self, token: str, name: str) -> Optional[str]:
+        index = await self._loaded(token, self._workspace(token).users, self.client.iter_users)
+        return index.ids_by_name.get(name.lstrip("@").lower())
+
+    async def channel_id_by_name(self, token: str, name: str) -> Optional[str]:
+        index = await self._loaded(token, self._workspace(token).channels, self.client.iter_conversations)
+        return index.ids_by_name.get(name.lstrip("#").lower())
+
+    async def search(self, token: str, query: str, kinds: List[str], limit: int) -> List[Tuple[float, str, dict]]:
+        """
+        Best `limit` (score, kind, record) matches of `query` among the workspace's users and/or channels,
+        where kind is "user" or "channel".
+        """
+        workspace = self._workspace(token)
+        matches = []
+        if "channel" in kinds:
+            index = await self._loaded(token, workspace.channels, self.client.iter_conversations)
+            matches.extend((value, "channel", record) for value, record in index.search(query.lstrip("#"), limit))
+        if "user" in kinds:
+            index = await self._loaded(token, workspace.users, self.client.iter_users)
+            matches.extend((value, "user", record) for value, record in index.search(query.lstrip("@"), limit))
+        return sorted(matches, key=lambda match: -match[0])[:limit]
+
+    async def _fetch_user(self, token: str, user_id: str) -> dict:
+        return (await self.client.get_user_info(token, user_id))["user"]
+
+    async def _fetch_channel(self, token: str, channel_id: str) -> dict:
+        return (await self.client.get_conversation_info(token, channel_id))["channel"]
+
+    async def _resolve(self, index: _Index, ids: List[str], fetch, max_lookups: Optional[int] = None) -> Dict[str, dict]:
+        missing = list(dict.fromkeys(record_id for record_id in ids if record_id not in index.records))[:max_lookups]
+        if missing:
+            semaphore = asyncio.Semaphore(self.lookup_concurrency)
+
+            async def lookup(record_id: str) -> None:
+                async with semaphore:
+                    try:
+                        index.put(await fetch(record_id))
+                    except Exception as e:
+                        logger.warning(f"Slack directory lookup of {record_id} failed: {e}")
+
+            await asyncio.gather(*(lookup(record_id) for record_id in missing))
+        return {record_id: index.records[record_id] for record_id in ids if record_id in index.records}
+
+    def _workspace(self, token: str) -> _Workspace:
+        workspace = self._workspaces.get(token)
+        if workspace is None:
+            workspace = _Workspace()
+            self._workspaces[token] = workspace
+            while len(self._workspaces) > self.max_workspaces:
+                _, evicted = self._workspaces.popitem(last=False)
+                for index in (evicted.users, evicted.channels):
+                    if index.refresh_task:
+                        index.refresh_task.cancel()
+        self._workspaces.move_to_end(token)
+        return workspace
+
+    async def _loaded(self, token: str, index: _Index, list_fn: Callable[[str], AsyncIterator[dict]]) -> _Index:
+        """
+        The index with a complete listing. A listing older than `max_stale_seconds` is awaited, shielded, so a
+        caller that gives up leaves it running for the next one.
+        """
+        self._cached(token, index, list_fn)
+        if index.age() > self.max_stale_seconds:
+            await asyncio.shield(index.refresh_task)
+        return index
+
+    async def _indexed(self, token: str, index: _Index, list_fn: Callable[[str], AsyncIterator[dict]],
+                       ids: List[str]) -> _Index:
+        """
+        The index, awaiting the listing when more of `ids` are missing than one-by-one lookups may fetch.
+        """
+        self._cached(token, index, list_fn)
+        if len({record_id for record_id in ids if record_id not in index.records}) > self.max_lookups:
+            return await self._loaded(token, index, list_fn)
+        return index
+
+    def _cached(self, token: str, index: _Index, list_fn: Callable[[str], AsyncIterator[dict]]) -> _Index:
+        """
+        The index as it is, starting the listing in the background when it is due.
+        """
+        if index.age() > self.ttl_seconds and (index.refresh_task is None or index.refresh_task.done()):
+            index.refresh_task = asyncio.create_task(self._refresh(index, list_fn(token)))
+            index.refresh_task.add_done_callback(lambda task: self._log_refresh(token, task))
+        return index
+
+    @staticmethod
+    def _log_refresh(token: str, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Slack directory refresh failed for workspace {workspace_label(token)}: {task.exception()}")
+
+    async def _refresh(self, index: _Index, records: AsyncIterator[dict]) -> None:
+        # A first listing is indexed page by page, so lookups by ID can use it before it is complete.
+        first = index.loaded_at is None
+        listed: Dict[str, dict] = {}
+        async for record in records:
+            if len(listed) >= self.max_records:
+                break
+            listed[record["id"]] = record
+            if first:
+                index.put(record)
+        index.replace(listed)
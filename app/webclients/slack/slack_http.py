@@ -0,0 +1,53 @@
+import logging
+from typing import Optional
+
+import aiohttp
+
+from app.utils.application_constants import slack_http_connection_limit, slack_http_dns_cache_seconds, \
+    slack_http_keepalive_seconds, slack_http_timeout_seconds, slack_http_connect_timeout_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class SlackHttpSession:
+    """
+    Process-wide aiohttp session shared by every Slack Web API client.
+
+    Without one, the Slack SDK opens and closes an aiohttp session, and so a TCP and TLS connection, for every
+    call. This session keeps its connections to slack.com alive between calls and across workspaces, caches DNS
+    lookups and bounds the number of open connections. The server opens it at startup and closes it on shutdown;
+    `get()` opens it on first use for code running outside the server.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def open(self) -> aiohttp.ClientSession:
+        return self.get()
+
+    def get(self) -> aiohttp.ClientSession:
+        """
+        The open session, created if there is none yet. Must be called from within the running event loop.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=slack_http_connection_limit,
+                ttl_dns_cache=slack_http_dns_cache_seconds,
+                keepalive_timeout=slack_http_keepalive_seconds,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=slack_http_timeout_seconds,
+                                              connect=slack_http_connect_timeout_seconds),
+            )
+            logger.info("Slack HTTP session opened")
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Slack HTTP session closed")
+        self._session = None
+
+
+slack_http_session = SlackHttpSession()
@@ -0,0 +1,263 @@
+import asyncio
+import bisect
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from slack_sdk.errors import SlackApiError
+
+from app.utils.application_constants import slack_message_index_max_channels, \
+    slack_message_index_max_messages_per_channel, slack_message_index_max_messages, \
+    slack_message_index_freshness_seconds, slack_message_index_backfill_pages, slack_page_limit, \
+    slack_message_index_unreachable_ttl_seconds
+from app.webclients.slack.slack_workspaces import workspace_label
+
+logger = logging.getLogger(__name__)
+
+word_pattern = re.compile(r"\w+")
+mention_pattern = re.compile(r"<@([UW][A-Z0-9]+)(?:\|[^>]*)?>")
+# Errors of a workspace that cannot read the channel at all, e.g. because another workspace owns it.
+unreachable_channel_errors = {"channel_not_found", "not_in_channel"}
+
+
+def message_terms(text: str) -> Set[str]:
+    return set(word_pattern.findall(text.lower()))
+
+
+class _ChannelIndex:
+    """
+    Indexed messages of one channel: ts -> message, an inverted index of lower-cased words and of `<@U...>`
+    mentions, and the history position of both the newest message seen and the backfill.
+    """
+
+    def __init__(self):
+        self.messages: Dict[str, dict] = {}
+        self.timestamps: List[str] = []
+        self.postings: Dict[str, Set[str]] = {}
+        self.mentions: Dict[str, Set[str]] = {}
+        self._vocabulary: Optional[List[str]] = None
+        self.latest_ts: Optional[str] = None
+        self.backfill_cursor: Optional[str] = None
+        self.backfill_done = False
+        self.truncated = False
+        self.synced_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    def is_fresh(self, freshness_seconds: float) -> bool:
+        return self.synced_at is not None and time.monotonic() - self.synced_at <= freshness_seconds
+
+    def add(self, message: dict) -> None:
+        ts = message.get("ts")
+        text = message.get("text") or ""
+        if not ts or ts in self.messages:
+            return
+        self.messages[ts] = {"ts": ts, "text": text, "user": message.get("user"), "subtype": message.get("subtype")}
+        bisect.insort(self.timestamps, ts)
+        for term in message_terms(text):
+            self.postings.setdefault(term, set()).add(ts)
+        for user_id in mention_pattern.findall(text):
+            self.mentions.setdefault(user_id, set()).add(ts)
+        self._vocabulary = None
+
+    def evict_oldest(self, max_messages: int) -> None:
+        overflow = len(self.timestamps) - max_messages
+        if overflow <= 0:
+            return
+        evicted, self.timestamps = self.timestamps[:overflow], self.timestamps[overflow:]
+        for ts in evicted:
+            message = self.messages.pop(ts)
+            for term in message_terms(message["text"]):
+                self._discard(self.postings, term, ts)
+            for user_id in mention_pattern.findall(message["text"]):
+                self._discard(self.mentions, user_id, ts)
+        self._vocabulary = None
+        # History older than the evicted messages can no longer be held.
+        self.backfill_done = True
+        self.truncated = True
+
+    def search(self, keyword: Optional[str], mentioned_user_id: Optional[str], limit: int,
+               skip_subtypes: bool, oldest: Optional[float] = None, latest: Optional[float] = None) -> List[dict]:
+        """
+        Newest first, up to `limit` messages containing `keyword` (case-insensitive) and mentioning
+        `mentioned_user_id`, for whichever of the two are given, posted between `oldest` and `latest` when given.
+        With `skip_subtypes`, only plain user messages (no join notices, bot posts, ...) count.
+        """
+        candidates: Optional[Set[str]] = None
+        if mentioned_user_id:
+            candidates = set(self.mentions.get(mentioned_user_id, ()))
+        for term in message_terms(keyword or ""):
+            # A query word also matches longer words it begins, like the substring match it replaces.
+            matches = set().union(*(self.postings[word] for word in self._words_starting_with(term)))
+            candidates = matches if candidates is None else candidates & matches
+        if candidates is None:
+            candidates = set(self.messages)
+        needle = (keyword or "").lower()
+        results = []
+        for ts in sorted(candidates, reverse=True):
+            if latest is not None and float(ts) > latest:
+                continue
+            if oldest is not None and float(ts) < oldest:
+                break
+            if skip_subtypes and self.messages[ts]["subtype"]:
+                continue
+            if needle in self.messages[ts]["text"].lower():
+                results.append(self.messages[ts])
+                if len(results) >= limit:
+                    break
+        return results
+
+    def _words_starting_with(self, prefix: str) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff")
+        return self._vocabulary[start:end]
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, ts: str) -> None:
+        entries = index.get(key)
+        if entries is not None:
+            entries.discard(ts)
+            if not entries:
+                del index[key]
+
+
+class SlackMessageIndex:
+    """
+    Per-(workspace, channel) inverted index of message text and mentions, answering keyword and mention searches
+    locally instead of scanning the latest page of history.
+
+    The first search of a channel backfills history newest to oldest, `backfill_pages` pages per search,
+    resuming from the saved cursor until the channel's history or `max_messages_per_channel` is reached.
+    Searches older than `freshness_seconds` first fetch only newer messages, with `oldest=` the newest ts seen.
+    Edits and deletions after a message was indexed are not picked up. Channels are evicted in LRU order
+    once `max_channels` is exceeded or all channels together hold more than `max_messages` messages, and the
+    oldest messages of a channel beyond its cap. A channel is kept once its first sync indexed anything, even if
+    that sync was cut off; a workspace that cannot read it is answered with the same error for `unreachable_ttl_seconds` without calling Slack.
+    """
+
+    def __init__(
+            self,
+            client: Any,
+            max_channels: int = slack_message_index_max_channels,
+            max_messages_per_channel: int = slack_message_index_max_messages_per_channel,
+            max_messages: int = slack_message_index_max_messages,
+            freshness_seconds: float = slack_message_index_freshness_seconds,
+            backfill_pages: int = slack_message_index_backfill_pages,
+            unreachable_ttl_seconds: float = slack_message_index_unreachable_ttl_seconds
+    ):
+        self.client = client
+        self.max_channels = max_channels
+        self.max_messages_per_channel = max_messages_per_channel
+        self.max_messages = max_messages
+        self.freshness_seconds = freshness_seconds
+        self.backfill_pages = backfill_pages
+        self.unreachable_ttl_seconds = unreachable_ttl_seconds
+        self._channels: "OrderedDict[Tuple[str, str], _ChannelIndex]" = OrderedDict()
+        self._unreachable: "OrderedDict[Tuple[str, str], Tuple[float, SlackApiError]]" = OrderedDict()
+
+    async def search(self, token: str, channel_id: str, keyword: Optional[str] = None,
+                     mentioned_user_id: Optional[str] = None, limit: int = 10, skip_subtypes: bool = False,
+                     oldest: Optional[float] = None, latest: Optional[float] = None,
+                     backfill_pages: Optional[int] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        `backfill_pages` overrides how many pages of older history this search may backfill.
+
+        Returns:
+            (matches newest first, ts of the oldest indexed message or None when the whole history is indexed).
+        """
+        key = (token, channel_id)
+        unreachable = self._unreachable.get(key)
+        if unreachable is not None:
+            failed_at, error = unreachable
+            if time.monotonic() - failed_at <= self.unreachable_ttl_seconds:
+                raise error
+            del self._unreachable[key]
+        index = self._channels.get(key) or _ChannelIndex()
+        async with index.lock:
+            if not index.is_fresh(self.freshness_seconds):
+                try:
+                    await self._sync(token, channel_id, index, backfill_pages or self.backfill_pages)
+                except asyncio.CancelledError:
+                    # Keep what a cancelled first sync indexed; the next search resumes from its cursor.
+                    if index.messages:
+                        self._keep(key, index)
+                        self._evict_over_budget()
+                    raise
+                except SlackApiError as e:
+                    if e.response.get("error") in unreachable_channel_errors:
+                        self._unreachable[key] = (time.monotonic(), e)
+                        while len(self._unreachable) > self.max_channels:
+                            self._unreachable.popitem(last=False)
+                    raise
+            self._keep(key, index)
+            self._evict_over_budget()
+            matches = index.search(keyword, mentioned_user_id, limit, skip_subtypes, oldest, latest)
+            complete = index.backfill_done and not index.truncated
+            return matches, None if complete or not index.timestamps else index.timestamps[0]
+
+    def _keep(self, key: Tuple[str, str], index: _ChannelIndex) -> None:
+        self._channels[key] = index
+        self._channels.move_to_end(key)
+        while len(self._channels) > self.max_channels:
+            self._channels.popitem(last=False)
+
+    def _evict_over_budget(self) -> None:
+        # The channel just searched is the most recently used, so it is the last one to go.
+        total = sum(len(index.timestamps) for index in self._channels.values())
+        while total > self.max_messages and len(self._channels) > 1:
+            _, evicted = self._channels.popitem(last=False)
+            total -= len(evicted.timestamps)
+
+    async def _sync(self, token: str, channel_id: str, index: _ChannelIndex, backfill_pages: int) -> None:
+        try:
+            if index.latest_ts is not None:
+                await self._fetch_newer(token, channel_id, index)
+            if not index.backfill_done:
+                await self._backfill(token, channel_id, index, backfill_pages)
+            index.synced_at = time.monotonic()
+        except Exception as e:
+            # Keep what is indexed; the next search retries the sync.
+            logger.warning(f"Slack message index sync failed for workspace {workspace_label(token)}, "
+                           f"channel {channel_id}: {e}")
+            if not index.messages:
+                raise
+
+    async def _fetch_newer(self, token: str, channel_id: str, index: _ChannelIndex) -> None:
+        cursor = None
+        latest_ts = index.latest_ts
+        while True:
+            response = await self.client.get_conversation_history(
+                token, channel_id, slack_page_limit, cursor=cursor, oldest=index.latest_ts
+            )
+            for message in response.get("messages", []):
+                index.add(message)
+                latest_ts = max(latest_ts, message.get("ts") or latest_ts)
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                break
+        index.latest_ts = latest_ts
+        index.evict_oldest(self.max_messages_per_channel)
+
+    async def _backfill(self, token: str, channel_id: str, index: _ChannelIndex, pages: int) -> None:
+        for _ in range(pages):
+            response = await self.client.get_conversation_history(
+                token, channel_id, slack_page_limit, cursor=index.backfill_cursor
+            )
+            messages = response.get("messages", [])
+            if index.latest_ts is None:
+                # History is returned newest first; "0" lets an empty channel pick up its first messages later.
+                index.latest_ts = messages[0].get("ts") if messages else "0"
+            for message in messages:
+                index.add(message)
+            index.backfill_cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if len(index.timestamps) >= self.max_messages_per_channel:
+                index.truncated = bool(index.backfill_cursor)
+                index.backfill_done = True
+                break
+            if not index.backfill_cursor:
+                index.backfill_done = True
+                break
+        index.evict_oldest(self.max_messages_per_channel)
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncSlackResponse, AsyncWebClient
+
+from app.utils.application_constants import slack_rate_limit_max_buckets, slack_rate_limit_max_retries, \
+    slack_rate_limit_default_retry_after_seconds, slack_rate_limit_slow_wait_seconds
+from app.webclients.slack.slack_workspaces import workspace_label
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Slack Web API rate-limit tiers: (requests per minute, burst allowance) per workspace and method.
+tier_limits = {
+    1: (1, 1),
+    2: (20, 5),
+    3: (50, 10),
+    4: (100, 20),
+}
+method_tiers = {
+    "auth.test": 4,
+    "conversations.history": 3,
+    "conversations.info": 3,
+    "conversations.list": 2,
+    "conversations.members": 4,
+    "conversations.open": 3,
+    "conversations.replies": 3,
+    "search.messages": 2,
+    "users.info": 4,
+    "users.list": 2,
+}
+default_tier = 3
+
+
+class _MethodBucket:
+    """
+    Token bucket for one (workspace, method), kept as the time the next call is due (GCRA): a call may go out
+    `burst - 1` intervals ahead of that time. Callers reserve a slot ahead of time, so queued calls go out in
+    arrival order at the tier's pace; a caller cancelled while waiting gives its slot back. A 429 blocks the bucket until Slack's Retry-After has passed.
+    """
+
+    def __init__(self, per_minute: float, burst: float):
+        self.interval = 60 / per_minute
+        self.tolerance = (burst - 1) * self.interval
+        self.due_at = 0.0
+        self.blocked_until = 0.0
+        self.queued = 0
+        self.calls = 0
+        self.rate_limited = 0
+        self.waited_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def reserve(self) -> float:
+        """
+        Takes the next slot and returns the number of seconds until it.
+        """
+        now = time.monotonic()
+        due_at = max(self.due_at, now)
+        send_at = max(now, due_at - self.tolerance, self.blocked_until)
+        self.due_at = max(due_at, send_at) + self.interval
+        return send_at - now
+
+    def release(self) -> None:
+        """
+        Gives back a slot taken by `reserve` that was not used, e.g. because its caller was cancelled while
+        waiting; the next caller takes it over.
+        """
+        self.due_at = max(self.due_at - self.interval, time.monotonic())
+
+    def block(self, retry_after: float) -> None:
+        self.rate_limited += 1
+        self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        # Slots inside the block are void and their callers reserve again; calls resume one interval apart from
+        # the end of the block, without a burst.
+        self.due_at = self.blocked_until + self.tolerance
+
+
+class SlackRateLimiter:
+    """
+    Schedules Slack Web API calls per (workspace, method) according to the method's rate-limit tier.
+
+    Calls beyond the tier's pace wait in line instead of failing. When Slack still answers 429, the bucket is
+    blocked for exactly the `Retry-After` seconds Slack asked for and the call is queued again, up to
+    `max_retries` times. Queue depth and wait times are kept per bucket and exposed through `metrics()`.
+    """
+
+    def __init__(self, max_buckets: int = slack_rate_limit_max_buckets, max_retries: int = slack_rate_limit_max_retries):
+        self.max_buckets = max_buckets
+        self.max_retries = max_retries
+        self._buckets: "OrderedDict[Tuple[str, str], _MethodBucket]" = OrderedDict()
+
+    async def call(self, token: Optional[str], method: str, send: Callable[[], Awaitable[T]]) -> T:
+        bucket = self._bucket(token or "", method)
+        attempt = 0
+        while True:
+            await self._wait_turn(token or "", method, bucket)
+            try:
+                return await send()
+            except SlackApiError as e:
+                if e.response is None or e.response.status_code != 429 or attempt >= self.max_retries:
+                    raise
+                retry_after = self._retry_after(e)
+                logger.warning(f"Slack {method} rate limited for workspace {workspace_label(token or '')}; "
+                               f"retrying after {retry_after}s")
+                bucket.block(retry_after)
+                attempt += 1
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per API method, summed over workspaces: calls made, calls waiting now, 429s and time spent waiting.
+        Workspaces are only counted, never named, so nothing derived from a token leaves the process.
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        for (_, method), bucket in self._buckets.items():
+            total = totals.setdefault(method, {"workspaces": 0, "queued": 0, "calls": 0, "rate_limited": 0,
+                                               "waited_seconds": 0.0, "max_wait_seconds": 0.0})
+            total["workspaces"] += 1
+            total["queued"] += bucket.queued
+            total["calls"] += bucket.calls
+            total["rate_limited"] += bucket.rate_limited
+            total["waited_seconds"] += bucket.waited_seconds
+            total["max_wait_seconds"] = max(total["max_wait_seconds"], bucket.max_wait_seconds)
+        for total in totals.values():
+            total["avg_wait_seconds"] = round(total["waited_seconds"] / total["calls"], 3) if total["calls"] else 0.0
+            total["waited_seconds"] = round(total["waited_seconds"], 3)
+            total["max_wait_seconds"] = round(total["max_wait_seconds"], 3)
+        return totals
+
+    async def _wait_turn(self, token: str, method: str, bucket: _MethodBucket) -> None:
+        bucket.calls += 1
+        waited = 0.0
+        bucket.queued += 1
+        try:
+            # A 429 seen while this call waited voids its slot; it then lines up again behind the block.
+            while True:
+                wait = bucket.reserve()
+                if wait >= slack_rate_limit_slow_wait_seconds:
+                    logger.info(f"Slack {method} queued {wait:.1f}s for workspace {workspace_label(token)} "
+                                f"({bucket.queued - 1} others waiting)")
+                if wait > 0:
+                    try:
+                        await asyncio.sleep(wait)
+                    except asyncio.CancelledError:
+                        bucket.release()
+                        raise
+                waited += wait
+                if time.monotonic() >= bucket.blocked_until:
+                    break
+        finally:
+            bucket.queued -= 1
+            bucket.waited_seconds += waited
+            bucket.max_wait_seconds = max(bucket.max_wait_seconds, waited)
+
+    def _bucket(self, token: str, method: str) -> _MethodBucket:
+        key = (token, method)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _MethodBucket(*tier_limits[method_tiers.get(method, default_tier)])
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+        return bucket
+
+    @staticmethod
+    def _retry_after(error: SlackApiError) -> float:
+        headers = error.response.headers or {}
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            return slack_rate_limit_default_retry_after_seconds
+
+
+class ScheduledAsyncWebClient(AsyncWebClient):
+    """
+    AsyncWebClient that sends every Web API call through a SlackRateLimiter, keyed by the call's token.
+    """
+
+    def __init__(self, scheduler: SlackRateLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+
+    async def api_call(self, api_method: str, **kwargs) -> AsyncSlackResponse:
+        token = self.token
+        for key in ("params", "json", "data"):
+            args = kwargs.get(key)
+            if isinstance(args, dict) and args.get("token"):
+                token = args["token"]
+
+        def send() -> Awaitable[AsyncSlackResponse]:
+            # The SDK pops the token out of the argument dicts, so every attempt gets fresh copies.
+            attempt_kwargs = {key: dict(value) if isinstance(value, dict) else value for key, value in kwargs.items()}
+            return super(ScheduledAsyncWebClient, self).api_call(api_method, **attempt_kwargs)
+
+        return await self.scheduler.call(token, api_method, send)
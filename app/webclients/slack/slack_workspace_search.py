@@ -0,0 +1,175 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, List, Optional, Tuple
+
+from app.dto.slack_search_result import SlackSearchResult
+from app.utils.application_constants import slack_workspace_search_max_channels, slack_workspace_search_concurrency, \
+    slack_workspace_search_max_pages, slack_workspace_search_deadline_seconds, slack_page_limit
+from app.webclients.slack.slack_workspaces import workspace_label
+
+logger = logging.getLogger(__name__)
+
+
+def is_user_token(token: str) -> bool:
+    return token.startswith("xoxp-")
+
+
+def search_day(ts: float, days: int) -> str:
+    return (datetime.fromtimestamp(ts, timezone.utc) + timedelta(days=days)).date().isoformat()
+
+
+def message_ts(message: dict) -> float:
+    return float(message["ts"])
+
+
+class SlackWorkspaceSearch:
+    """
+    Keyword search across the channels of one workspace, newest hits first.
+
+    With a user token (`xoxp-`), Slack's own `search.messages` is paged through, newest first, until `limit` hits
+    are found. Bot tokens cannot use it, so the channels are searched one by one instead, up to `concurrency` at a
+    time. Every call still goes through the client's rate-limit scheduler. A channel search is
+    answered from the message index when it is enabled, otherwise by scanning at most `max_pages` pages of history
+    inside the window. All channels share one `conversations.history` rate limit, so through the index each search
+    backfills at most one page per channel; channels cut off by the deadline keep what they indexed, and
+    repeated searches reach further back. Each channel stops at `limit` hits and the channel results are merged by timestamp up to
+    `limit`. Channels not searched within `deadline_seconds` are dropped and counted.
+    """
+
+    def __init__(
+            self,
+            client: Any,
+            max_channels: int = slack_workspace_search_max_channels,
+            concurrency: int = slack_workspace_search_concurrency,
+            max_pages: int = slack_workspace_search_max_pages,
+            deadline_seconds: float = slack_workspace_search_deadline_seconds
+    ):
+        self.client = client
+        self.max_channels = max_channels
+        self.concurrency = concurrency
+        self.max_pages = max_pages
+        self.deadline_seconds = deadline_seconds
+
+    async def search(self, token: str, keyword: str, channel_ids: Optional[List[str]] = None,
+                     oldest: Optional[str] = None, latest: Optional[str] = None, limit: int = 20) -> SlackSearchResult:
+        """
+        Messages containing `keyword` posted between the Slack ts `oldest` and `latest` (either optional), in
+        `channel_ids` or in every channel the token can read. Hits carry "channel" and "channel_name".
+        """
+        oldest_ts = float(oldest) if oldest else None
+        latest_ts = float(latest) if latest else None
+        if is_user_token(token):
+            return await self._search_api(token, keyword, channel_ids, oldest_ts, latest_ts, limit)
+        return await self._search_channels(token, keyword, channel_ids, oldest_ts, latest_ts, limit)
+
+    async def _search_api(self, token: str, keyword: str, channel_ids: Optional[List[str]], oldest: Optional[float],
+                          latest: Optional[float], limit: int) -> SlackSearchResult:
+        # after:/before: only take days and exclude the day itself; the exact bounds are applied to the hits.
+        query = keyword
+        if oldest is not None:
+            query += f" after:{search_day(oldest, -1)}"
+        if latest is not None:
+            query += f" before:{search_day(latest, 1)}"
+        result = SlackSearchResult()
+        for page in range(1, self.max_pages + 1):
+            messages = (await self.client.search_workspace_messages(token, query, page))["messages"]
+            for match in messages.get("matches", []):
+                ts = message_ts(match)
+                if oldest is not None and ts < oldest:
+                    return result
+                channel = match.get("channel") or {}
+                if (latest is not None and ts > latest) or (channel_ids and channel.get("id") not in channel_ids):
+                    continue
+                if len(result.hits) >= limit:
+                    result.truncated = True
+                    return result
+                result.hits.append({
+                    "ts": match["ts"], "text": match.get("text") or "", "user": match.get("user"),
+                    "channel": channel.get("id"), "channel_name": channel.get("name"),
+                })
+            if page >= (messages.get("paging") or {}).get("pages", 0):
+                return result
+        # Pages left unread: older matches were not looked at.
+        result.searched_back_to = result.hits[-1]["ts"] if result.hits else None
+        return result
+
+    async def _search_channels(self, token: str, keyword: str, channel_ids: Optional[List[str]],
+                               oldest: Optional[float], latest: Optional[float], limit: int) -> SlackSearchResult:
+        if not channel_ids:
+            channels = await self.client.directory.channels(token)
+            channel_ids = [channel_id for channel_id, channel in channels.items()
+                           if channel.get("is_member") or channel.get("is_im")]
+        channel_ids = list(dict.fromkeys(channel_ids))
+        result = SlackSearchResult(unsearched_channels=max(0, len(channel_ids) - self.max_channels))
+        channel_ids = channel_ids[:self.max_channels]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def search_channel(channel_id: str) -> Tuple[List[dict], Optional[str]]:
+            async with semaphore:
+                # One hit beyond the cap tells whether more exist.
+                return await self._search_channel(token, channel_id, keyword, oldest, latest, limit + 1)
+
+        tasks = [asyncio.create_task(search_channel(channel_id)) for channel_id in channel_ids]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=self.deadline_seconds)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        channel_hits = []
+        for channel_id, task in zip(channel_ids, tasks):
+            if task.cancelled() or not task.done():
+                result.unsearched_channels += 1
+                continue
+            if task.exception() is not None:
+                logger.warning(f"Slack search of channel {channel_id} failed for workspace "
+                               f"{workspace_label(token)}: {task.exception()}")
+                result.unsearched_channels += 1
+                continue
+            hits, searched_back_to = task.result()
+            channel_hits.append(hits)
+            if searched_back_to and (result.searched_back_to is None or
+                                     float(searched_back_to) > float(result.searched_back_to)):
+                result.searched_back_to = searched_back_to
+
+        # Each channel's hits are newest first, so the merge only reads as far as the result cap.
+        merged = list(islice(heapq.merge(*channel_hits, key=message_ts, reverse=True), limit + 1))
+        result.truncated = len(merged) > limit
+        result.hits = merged[:limit]
+        channels = await self.client.directory.get_channels(token, [hit["channel"] for hit in result.hits])
+        for hit in result.hits:
+            hit["channel_name"] = channels.get(hit["channel"], {}).get("name")
+        return result
+
+    async def _search_channel(self, token: str, channel_id: str, keyword: str, oldest: Optional[float],
+                              latest: Optional[float], limit: int) -> Tuple[List[dict], Optional[str]]:
+        """
+        Up to `limit` hits of one channel, newest first, and the ts back to which it was searched when that
+        does not reach `oldest`.
+        """
+        if self.client.message_index:
+            found, searched_back_to = await self.client.message_index.search(
+                token, channel_id, keyword=keyword, limit=limit, skip_subtypes=True, oldest=oldest, latest=latest,
+                backfill_pages=1
+            )
+            if searched_back_to and oldest is not None and float(searched_back_to) <= oldest:
+                searched_back_to = None
+            return [dict(message, channel=channel_id) for message in found], searched_back_to
+
+        needle = keyword.lower()
+        hits, scanned, searched_back_to = [], 0, None
+        async for message in self.client.iter_conversation_history(
+                token, channel_id, f"{oldest:.6f}" if oldest is not None else None,
+                f"{latest:.6f}" if latest is not None else None, limit=slack_page_limit
+        ):
+            scanned += 1
+            if not message.get("subtype") and needle in (message.get("text") or "").lower():
+                hits.append(dict(message, channel=channel_id))
+                if len(hits) >= limit:
+                    break
+            if scanned >= self.max_pages * slack_page_limit:
+                searched_back_to = message.get("ts")
+                break
+        return hits, searched_back_to
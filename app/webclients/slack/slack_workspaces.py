@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, TypeVar
+
+from app.dto.slack_workspace_result import SlackWorkspaceResult
+from app.utils.application_constants import slack_fan_out_deadline_seconds, slack_fan_out_concurrency
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def workspace_label(bot_token: str) -> str:
+    """
+    Token suffix used to name a workspace in logs without writing the token itself.
+    """
+    return f"...{bot_token[-6:]}"
+
+
+async def fan_out_slack_workspaces(
+        bot_tokens: List[str],
+        request_fn: Callable[[str], Awaitable[T]],
+        deadline_seconds: float = slack_fan_out_deadline_seconds,
+        concurrency: int = slack_fan_out_concurrency
+) -> List[SlackWorkspaceResult]:
+    """
+    Runs `request_fn(bot_token)` for every connected Slack workspace concurrently, with at most `concurrency`
+    workspaces in flight. A workspace that fails or misses the deadline is reported with its error instead of
+    failing or blocking the others.
+
+    Returns:
+        One SlackWorkspaceResult per bot token, in the order the tokens were given.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(bot_token: str) -> T:
+        async with semaphore:
+            return await asyncio.wait_for(request_fn(bot_token), timeout=deadline_seconds)
+
+    outcomes = await asyncio.gather(*(run(bot_token) for bot_token in bot_tokens), return_exceptions=True)
+    results = []
+    for bot_token, outcome in zip(bot_tokens, outcomes):
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, asyncio.TimeoutError):
+                outcome = TimeoutError(f"Slack workspace did not respond within {deadline_seconds}s")
+            logger.warning(f"Slack request failed for workspace {workspace_label(bot_token)}: {outcome}")
+            results.append(SlackWorkspaceResult(bot_token=bot_token, error=str(outcome)))
+        else:
+            results.append(SlackWorkspaceResult(bot_token=bot_token, result=outcome))
+    return results
@@ -0,0 +1,69 @@
+"""
+Measures peak memory and time of turning a Gmail `attachments.get` response into the attachment tool's result,
+for a binary and a text attachment of the given size.
+
+"json" is the straightforward path: JSON-decode the response and base64-decode the whole data field at once.
+"streamed" is what GmailClientImpl.get_attachment does: read the data field as a view into the raw response body
+and decode it in bounded chunks. The raw body itself is allocated before measuring, as httplib2 hands it over
+in full either way.
+
+    python -m scripts.benchmark_gmail_attachment --size-mb 25
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import time
+import tracemalloc
+
+from app.webclients.gsuite.gmail.gmail_util import attachment_payload, extract_attachment
+
+
+def response_body(payload: bytes) -> bytes:
+    data = base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+    return json.dumps({"size": len(payload), "data": data}).encode()
+
+
+def json_path(content: bytes, mime_type: str) -> dict:
+    response = json.loads(content)
+    data = response["data"]
+    decoded = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    if mime_type.startswith("text/"):
+        return {"text": decoded.decode("utf-8", errors="ignore")[:50000]}
+    return {"size_bytes": len(decoded), "sha256": hashlib.sha256(decoded).hexdigest()}
+
+
+def streamed_path(content: bytes, mime_type: str) -> dict:
+    size, data = attachment_payload(content)
+    return {"size": size, **extract_attachment(data, mime_type=mime_type)}
+
+
+def measure(name: str, fn, content: bytes, mime_type: str) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn(content, mime_type)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{mime_type:<26} {name:<9} peak {peak / 2 ** 20:8.1f} MiB  {elapsed:.3f}s")
+
+
+def main(size_mb: float) -> None:
+    size = int(size_mb * 2 ** 20)
+    payloads = {
+        "application/octet-stream": os.urandom(size),
+        "text/plain": (b"lorem ipsum dolor sit amet\n" * (size // 27 + 1))[:size],
+    }
+    for mime_type, payload in payloads.items():
+        content = response_body(payload)
+        print(f"{mime_type}: {size_mb} MiB attachment, {len(content) / 2 ** 20:.1f} MiB response body")
+        measure("json", json_path, content, mime_type)
+        measure("streamed", streamed_path, content, mime_type)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=25)
+    args = parser.parse_args()
+    main(args.size_mb)
@@ -0,0 +1,92 @@
+"""
+Measures peak memory and time of turning a large multipart Gmail message payload into the body text
+returned by the Gmail tools.
+
+"naive" walks the parts recursively, base64-decodes every text part in full, runs the HTML parts through
+HTMLParser in one feed, joins everything and only then cuts the result to the body limit. "streamed" is
+extract_message_body: an iterative walk, chunked decode, and parsing that stops once the limit is reached.
+
+    python -m scripts.benchmark_gmail_message_body --parts 200 --part-kb 256
+"""
+import argparse
+import base64
+import time
+import tracemalloc
+from html.parser import HTMLParser
+
+from app.utils.application_constants import gmail_max_body_chars
+from app.webclients.gsuite.gmail.gmail_util import extract_message_body
+
+
+def encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def message_payload(parts: int, part_kb: int, html_only: bool) -> dict:
+    paragraph = "Quarterly numbers attached, see the summary below. Zürich – 東京 " * 8
+    text = (paragraph + "\n") * (part_kb * 1024 // (len(paragraph.encode()) + 1) + 1)
+    html = "".join(f"<p>{line}</p><div><span>{line}</span></div>" for line in text.splitlines()[:len(text) // 1000])
+    alternatives = []
+    for n in range(parts):
+        leaves = [{"mimeType": "text/html", "body": {"data": encode(html)}}]
+        if not html_only:
+            leaves.insert(0, {"mimeType": "text/plain", "body": {"data": encode(text)}})
+        alternatives.append({"mimeType": "multipart/alternative", "body": {}, "parts": leaves})
+        alternatives.append({"mimeType": "application/pdf", "filename": f"report-{n}.pdf",
+                             "body": {"attachmentId": f"att-{n}", "size": 1024 * 1024}})
+    return {"mimeType": "multipart/mixed", "body": {}, "parts": alternatives}
+
+
+class _NaiveHtmlText(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def handle_data(self, data):
+        self.chunks.append(data)
+
+
+def naive_body(payload: dict, max_body_chars: int) -> str:
+    plain, html = [], []
+
+    def walk(part):
+        for child in part.get("parts", []):
+            walk(child)
+        data = part.get("body", {}).get("data")
+        if data and not part.get("filename"):
+            decoded = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)).decode("utf-8", errors="replace")
+            (plain if part["mimeType"] == "text/plain" else html).append(decoded)
+
+    walk(payload)
+    if not plain:
+        parser = _NaiveHtmlText()
+        parser.feed("".join(html))
+        plain = parser.chunks
+    return "\n\n".join(plain)[:max_body_chars]
+
+
+def measure(name: str, fn, payload: dict) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn(payload, gmail_max_body_chars)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<9} peak {peak / 2 ** 20:8.1f} MiB  {elapsed:.3f}s")
+
+
+def main(parts: int, part_kb: int) -> None:
+    for html_only in (False, True):
+        payload = message_payload(parts, part_kb, html_only)
+        print(f"{'html-only' if html_only else 'plain+html'}: {parts} alternatives of ~{part_kb} KiB, "
+              f"body limit {gmail_max_body_chars} characters")
+        measure("naive", naive_body, payload)
+        measure("streamed", extract_message_body, payload)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parts", type=int, default=200)
+    parser.add_argument("--part-kb", type=int, default=256)
+    args = parser.parse_args()
+    main(args.parts, args.part_kb)
@@ -0,0 +1,77 @@
+"""
+Compares Slack Web API calls sent with a new HTTP session per call (the SDK default) against the shared pooled
+session of SlackClientImpl, for a burst of calls spread over many workspaces.
+
+Calls go to a local stand-in for slack.com that counts the TCP connections it accepts, so no Slack access is
+needed. Real calls also pay a TLS handshake per connection, which the local server does not.
+
+    python -m scripts.benchmark_slack_http_session --workspaces 50 --calls 5
+"""
+import argparse
+import asyncio
+import time
+from typing import Set, Tuple
+
+from aiohttp import web
+
+from app.webclients.slack.slack_client import SlackClientImpl
+from app.webclients.slack.slack_http import slack_http_session
+from app.webclients.slack.slack_rate_limiter import SlackRateLimiter, ScheduledAsyncWebClient
+
+
+async def start_server() -> Tuple[web.AppRunner, Set[tuple], str]:
+    connections = set()
+
+    async def api(request: web.Request) -> web.Response:
+        connections.add(request.transport.get_extra_info("peername"))
+        return web.json_response({"ok": True, "channel": {"id": request.match_info["method"], "is_member": True}})
+
+    app = web.Application()
+    app.router.add_route("*", "/api/{method}", api)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, connections, f"http://127.0.0.1:{port}/api/"
+
+
+async def burst(call, tokens, calls_per_workspace):
+    started = time.perf_counter()
+    await asyncio.gather(*(call(token, f"C{i}") for token in tokens for i in range(calls_per_workspace)))
+    return time.perf_counter() - started
+
+
+async def main(workspaces: int, calls_per_workspace: int) -> None:
+    runner, connections, base_url = await start_server()
+    # Each phase uses its own workspaces, so the rate limiter's per-workspace burst allowance never delays calls.
+    def tokens(phase: str):
+        return [f"xoxb-{phase}-{n:04d}" for n in range(workspaces)]
+
+    total = workspaces * calls_per_workspace
+    try:
+        per_call = ScheduledAsyncWebClient(SlackRateLimiter(), base_url=base_url)
+        elapsed = await burst(lambda token, channel: per_call.conversations_info(token=token, channel=channel),
+                              tokens("per-call"), calls_per_workspace)
+        print(f"session per call: {total} calls, {len(connections)} connections, {elapsed:.3f}s")
+
+        connections.clear()
+        await slack_http_session.open()
+        pooled = SlackClientImpl(base_url=base_url)
+        elapsed = await burst(pooled.get_conversation_info, tokens("cold"), calls_per_workspace)
+        print(f"pooled session:   {total} calls, {len(connections)} connections, {elapsed:.3f}s")
+
+        connections.clear()
+        elapsed = await burst(pooled.get_conversation_info, tokens("warm"), calls_per_workspace)
+        print(f"pooled, warm:     {total} calls, {len(connections)} connections used, {elapsed:.3f}s")
+    finally:
+        await slack_http_session.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workspaces", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=5, help="calls per workspace, within the method's burst allowance")
+    args = parser.parse_args()
+    asyncio.run(main(args.workspaces, args.calls))
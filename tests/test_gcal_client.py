@@ -0,0 +1,46 @@
+import unittest
+from unittest import mock
+
+from app.webclients.gsuite.gcalendar import gcal_client
+from app.webclients.gsuite.gcalendar.gcal_client import GoogleCalendarClientImpl
+
+
+class _Request:
+    def __init__(self, response: dict):
+        self.response = response
+
+    def execute(self) -> dict:
+        return self.response
+
+
+class _Events:
+    def __init__(self, calls: list):
+        self.calls = calls
+
+    def patch(self, **params) -> _Request:
+        self.calls.append(("patch", params))
+        return _Request({"id": params["eventId"], **params["body"]})
+
+
+class _Service:
+    def __init__(self):
+        self.calls = []
+
+    def events(self) -> _Events:
+        return _Events(self.calls)
+
+
+class ModifyEventTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_only_given_fields_are_patched(self):
+        service = _Service()
+        with mock.patch.object(gcal_client, "generate_primary_authenticated_client", mock.AsyncMock(return_value=service)):
+            event = await GoogleCalendarClientImpl().modify_event("user", "event-1", summary="Renamed")
+
+        self.assertEqual(event, {"id": "event-1", "summary": "Renamed"})
+        self.assertEqual(service.calls, [("patch", {"calendarId": "primary", "eventId": "event-1",
+                                                    "body": {"summary": "Renamed"}, "fields": None})])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.webclients.gsuite.gcalendar.gcal_event_index import GoogleCalendarEventIndex, _CalendarIndex
+
+
+def at(day: int, hour: int = 0) -> datetime:
+    return datetime(2024, 5, day, hour, tzinfo=timezone.utc)
+
+
+def event(event_id: str, start: datetime, end: datetime, **fields) -> dict:
+    return {"id": event_id, "start": {"dateTime": start.isoformat()}, "end": {"dateTime": end.isoformat()}, **fields}
+
+
+class _Request:
+    def __init__(self, response: dict):
+        self.response = response
+
+    def execute(self) -> dict:
+        return self.response
+
+
+class _Events:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, **params) -> _Request:
+        self.service.calls.append(params)
+        if "syncToken" in params:
+            return _Request(self.service.incremental)
+        return _Request({"items": self.service.items, "timeZone": self.service.timezone, "nextSyncToken": "sync-1"})
+
+
+class _Service:
+    def __init__(self, items, incremental=None, timezone_name=None):
+        self.items = items
+        self.incremental = incremental or {"items": [], "nextSyncToken": "sync-2"}
+        self.timezone = timezone_name
+        self.calls = []
+
+    def events(self) -> _Events:
+        return _Events(self)
+
+
+class CalendarIndexWindowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = _CalendarIndex(at(1), at(10))
+        self.index.apply(event("a", at(2, 9), at(2, 10)))
+        self.index.apply(event("long", at(2, 8), at(4, 8)))
+        self.index.apply(event("b", at(3, 9), at(3, 10)))
+
+    def test_events_overlapping_the_range_in_start_order(self):
+        found = self.index.query(at(3), at(4), 10)
+        self.assertEqual([e["id"] for e in found], ["long", "b"])
+
+    def test_max_results_stops_early(self):
+        found = self.index.query(at(2), at(5), 1)
+        self.assertEqual([e["id"] for e in found], ["long"])
+
+    def test_query_starting_before_the_window_is_not_answered(self):
+        self.assertIsNone(self.index.query(at(1) - timedelta(hours=1), at(3), 10))
+
+    def test_open_or_overreaching_range_is_only_answered_when_full(self):
+        self.assertIsNone(self.index.query(at(3), None, 10))
+        self.assertIsNone(self.index.query(at(3), at(12), 10))
+        self.assertEqual([e["id"] for e in self.index.query(at(3), None, 1)], ["long"])
+
+    def test_cancelled_event_is_removed(self):
+        self.index.apply({"id": "b", "status": "cancelled"})
+        self.assertEqual([e["id"] for e in self.index.query(at(3), at(4), 10)], ["long"])
+
+    def test_all_day_events_follow_the_calendar_time_zone(self):
+        self.index.apply({"id": "day", "start": {"date": "2024-05-05"}, "end": {"date": "2024-05-06"}})
+        self.assertIn("day", [e["id"] for e in self.index.query(at(5), at(5, 3), 10)])
+
+        # Midnight in Los Angeles is 07:00 UTC: the evening of May 5 UTC is still May 4 there.
+        self.index.set_timezone("America/Los_Angeles")
+        self.assertNotIn("day", [e["id"] for e in self.index.query(at(5), at(5, 3), 10)])
+        self.assertIn("day", [e["id"] for e in self.index.query(at(6), at(6, 3), 10)])
+        self.assertEqual([e["id"] for e in self.index.query(at(3), at(4), 10)], ["long", "b"])
+
+
+class GoogleCalendarEventIndexTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_full_sync_then_local_answers(self):
+        now = datetime.now(timezone.utc)
+        service = _Service([event("a", now + timedelta(hours=1), now + timedelta(hours=2))])
+        index = GoogleCalendarEventIndex(freshness_seconds=60)
+        time_min, time_max = now.isoformat(), (now + timedelta(days=1)).isoformat()
+
+        found = await index.get_events("user", "account", "primary", service, time_min, time_max, 10)
+        self.assertEqual([e["id"] for e in found], ["a"])
+        found = await index.get_events("user", "account", "primary", service, time_min, time_max, 10)
+        self.assertEqual([e["id"] for e in found], ["a"])
+        self.assertEqual(len(service.calls), 1)
+
+    async def test_stale_index_syncs_incrementally(self):
+        now = datetime.now(timezone.utc)
+        service = _Service(
+            [event("a", now + timedelta(hours=1), now + timedelta(hours=2))],
+            {"items": [{"id": "a", "status": "cancelled"}], "nextSyncToken": "sync-2"}
+        )
+        index = GoogleCalendarEventIndex(freshness_seconds=60)
+        time_min, time_max = now.isoformat(), (now + timedelta(days=1)).isoformat()
+        await index.get_events("user", "account", "primary", service, time_min, time_max, 10)
+
+        index.invalidate("user")
+        found = await index.get_events("user", "account", "primary", service, time_min, time_max, 10)
+        self.assertEqual(found, [])
+        self.assertEqual(service.calls[-1]["syncToken"], "sync-1")
+
+    async def test_queries_outside_the_window_or_unparsable_return_none(self):
+        now = datetime.now(timezone.utc)
+        service = _Service([])
+        index = GoogleCalendarEventIndex(lookback_days=1, lookahead_days=1)
+        self.assertIsNone(await index.get_events(
+            "user", "account", "primary", service, (now - timedelta(days=5)).isoformat(), now.isoformat(), 10
+        ))
+        self.assertIsNone(await index.get_events("user", "account", "primary", service, "not a time", None, 10))
+        self.assertIsNone(await index.get_events("user", "account", "primary", service, None, None, 10))
+
+    async def test_sync_takes_the_calendar_time_zone(self):
+        now = datetime.now(timezone.utc)
+        tomorrow = (now + timedelta(days=1)).date()
+        service = _Service([{"id": "day", "start": {"date": tomorrow.isoformat()},
+                             "end": {"date": (tomorrow + timedelta(days=1)).isoformat()}}], timezone_name="Asia/Tokyo")
+        index = GoogleCalendarEventIndex()
+        # Midnight in Tokyo is 15:00 UTC of the previous day.
+        utc_midnight = datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=timezone.utc)
+        found = await index.get_events("user", "account", "primary", service, (utc_midnight + timedelta(hours=16)).isoformat(),
+                                       (utc_midnight + timedelta(hours=17)).isoformat(), 10)
+        self.assertEqual(found, [])
+        found = await index.get_events("user", "account", "primary", service, (utc_midnight - timedelta(hours=8)).isoformat(),
+                                       (utc_midnight - timedelta(hours=7)).isoformat(), 10)
+        self.assertEqual([e["id"] for e in found], ["day"])
+
+    async def test_calendars_are_capped_per_user(self):
+        now = datetime.now(timezone.utc)
+        index = GoogleCalendarEventIndex(max_calendars_per_user=2)
+        for user_uuid, calendar_id in (("other", "c1"), ("user", "c1"), ("user", "c2"), ("user", "c3")):
+            await index.get_events(user_uuid, "account", calendar_id, _Service([]), now.isoformat(),
+                                   (now + timedelta(hours=1)).isoformat(), 10)
+        self.assertEqual(list(index._calendars),
+                         [("other", "account", "c1"), ("user", "account", "c2"), ("user", "account", "c3")])
+
+    async def test_failed_sync_returns_none(self):
+        class FailingService:
+            def events(self):
+                raise RuntimeError("unavailable")
+
+        now = datetime.now(timezone.utc)
+        index = GoogleCalendarEventIndex()
+        with self.assertLogs("app.config.logging_config", level="WARNING"):
+            found = await index.get_events("user", "account", "primary", FailingService(), now.isoformat(),
+                                           (now + timedelta(hours=1)).isoformat(), 10)
+        self.assertIsNone(found)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.webclients.gsuite.gcalendar.gcal_util import free_slots, parse_event_time
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2024, 5, 1, hour, minute, tzinfo=timezone.utc)
+
+
+class FreeSlotsTest(unittest.TestCase):
+
+    def test_whole_window_is_free_without_busy_time(self):
+        self.assertEqual(free_slots([], [(at(9), at(17))], timedelta(minutes=30)), [(at(9), at(17))])
+
+    def test_gaps_between_busy_intervals(self):
+        busy = [(at(10), at(11)), (at(13), at(14))]
+        self.assertEqual(
+            free_slots(busy, [(at(9), at(17))], timedelta(minutes=30)),
+            [(at(9), at(10)), (at(11), at(13)), (at(14), at(17))]
+        )
+
+    def test_gaps_shorter_than_min_duration_are_dropped(self):
+        busy = [(at(9, 15), at(12)), (at(12, 20), at(16, 45))]
+        self.assertEqual(free_slots(busy, [(at(9), at(17))], timedelta(minutes=30)), [])
+
+    def test_busy_time_overlapping_window_edges(self):
+        busy = [(at(8), at(9, 30)), (at(16), at(18))]
+        self.assertEqual(free_slots(busy, [(at(9), at(17))], timedelta(minutes=30)), [(at(9, 30), at(16))])
+
+    def test_busy_interval_spanning_several_windows(self):
+        windows = [(at(9), at(12)), (at(13), at(17))]
+        busy = [(at(11), at(14))]
+        self.assertEqual(
+            free_slots(busy, windows, timedelta(minutes=30)),
+            [(at(9), at(11)), (at(14), at(17))]
+        )
+
+    def test_fully_busy_window(self):
+        self.assertEqual(free_slots([(at(8), at(18))], [(at(9), at(17))], timedelta(minutes=1)), [])
+
+
+class ParseEventTimeTest(unittest.TestCase):
+
+    def test_all_day_date_starts_at_midnight_in_the_calendar_time_zone(self):
+        self.assertEqual(parse_event_time({"date": "2024-05-01"}, "Europe/Berlin"),
+                         datetime(2024, 4, 30, 22, tzinfo=timezone.utc))
+        self.assertEqual(parse_event_time({"date": "2024-05-01", "timeZone": "Asia/Kolkata"}, "Europe/Berlin"),
+                         datetime(2024, 4, 30, 18, 30, tzinfo=timezone.utc))
+
+    def test_unknown_or_missing_time_zone_is_utc(self):
+        self.assertEqual(parse_event_time({"date": "2024-05-01"}, "Not/AZone"), datetime(2024, 5, 1, tzinfo=timezone.utc))
+        self.assertEqual(parse_event_time({"date": "2024-05-01"}), datetime(2024, 5, 1, tzinfo=timezone.utc))
+
+    def test_date_time_keeps_its_offset(self):
+        self.assertEqual(parse_event_time({"dateTime": "2024-05-01T09:00:00+02:00"}, "Asia/Tokyo"),
+                         datetime(2024, 5, 1, 7, tzinfo=timezone.utc))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import base64
+import hashlib
+import json
+import unittest
+
+from app.webclients.gsuite.gmail.gmail_util import attachment_payload, extract_attachment, extract_message_body, \
+    iter_decoded_text, iter_message_parts, _BoundedText
+
+
+def b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+class AttachmentTest(unittest.TestCase):
+
+    def test_payload_is_read_from_the_raw_body(self):
+        content = json.dumps({"size": 5, "data": b64(b"hello")}, indent=2).encode()
+        size, data = attachment_payload(content)
+        self.assertEqual(size, 5)
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(bytes(data).decode(), b64(b"hello"))
+
+    def test_payload_without_data(self):
+        size, data = attachment_payload(b'{"size": 0}')
+        self.assertEqual((size, len(data)), (0, 0))
+
+    def test_text_attachment_is_capped(self):
+        data = b64(("é" * 100).encode())
+        extract = extract_attachment(memoryview(data.encode()), mime_type="text/plain", max_text_chars=10)
+        self.assertEqual(extract, {"text": "é" * 10, "truncated": True})
+
+    def test_binary_attachment_returns_metadata_only(self):
+        payload = bytes(range(256)) * 1000
+        extract = extract_attachment(b64(payload), filename="photo.png")
+        self.assertEqual(extract, {
+            "size_bytes": len(payload),
+            "detected_mime_type": "image/png",
+            "sha256": hashlib.sha256(payload).hexdigest(),
+        })
+
+    def test_unknown_type_is_sniffed(self):
+        self.assertIn("text", extract_attachment(b64(b"plain words")))
+        self.assertIn("sha256", extract_attachment(b64(b"\x00\x01binary")))
+
+
+def part(mime_type: str, text: str = None, **fields) -> dict:
+    body = {"data": b64(text.encode())} if text is not None else {}
+    return {"mimeType": mime_type, "body": body, **fields}
+
+
+def multipart(*parts: dict, mime_type: str = "multipart/mixed") -> dict:
+    return {"mimeType": mime_type, "body": {}, "parts": list(parts)}
+
+
+nested_message = multipart(
+    multipart(
+        part("text/plain", "plain body"),
+        part("text/html", "<p>html body</p>"),
+        mime_type="multipart/alternative",
+    ),
+    multipart(
+        part("text/plain", "forwarded part"),
+        part("image/png", filename="inline.png", body={"attachmentId": "att-2", "size": 10}),
+        mime_type="multipart/related",
+    ),
+    part("application/pdf", filename="report.pdf", body={"attachmentId": "att-1", "size": 2048}),
+)
+
+
+class MessagePartsTest(unittest.TestCase):
+
+    def test_nested_parts_in_document_order(self):
+        leaves = [(leaf["mimeType"], leaf.get("filename")) for leaf in iter_message_parts(nested_message)]
+        self.assertEqual(leaves, [
+            ("text/plain", None), ("text/html", None), ("text/plain", None),
+            ("image/png", "inline.png"), ("application/pdf", "report.pdf"),
+        ])
+
+    def test_single_part_payload_is_its_own_leaf(self):
+        payload = part("text/plain", "only")
+        self.assertEqual(list(iter_message_parts(payload)), [payload])
+
+
+class DecodeTest(unittest.TestCase):
+
+    def test_multibyte_characters_split_across_chunks(self):
+        text = "naïve café – 東京 " * 5
+        self.assertEqual("".join(iter_decoded_text(b64(text.encode()), chunk_chars=4)), text)
+
+    def test_bounded_text_stops_at_the_cap(self):
+        sink = _BoundedText(5)
+        for fragment in ("abc", "", "def", "ghi"):
+            sink.append(fragment)
+        self.assertEqual((sink.text(), sink.truncated, sink.full), ("abcde", True, True))
+
+    def test_bounded_text_exactly_full_is_not_truncated(self):
+        sink = _BoundedText(3)
+        sink.append("abc")
+        self.assertEqual((sink.text(), sink.truncated), ("abc", False))
+
+
+class MessageBodyTest(unittest.TestCase):
+
+    def test_plain_parts_are_preferred_and_attachments_listed(self):
+        body = extract_message_body(nested_message)
+        self.assertTrue(body.startswith("plain body\n\nforwarded part"))
+        self.assertNotIn("html body", body)
+        self.assertIn("[Attachment] inline.png (image/png, size: 10, attachment_id: att-2)", body)
+        self.assertIn("[Attachment] report.pdf (application/pdf, size: 2048, attachment_id: att-1)", body)
+
+    def test_html_only_message_is_converted_to_text(self):
+        html = ("<html><head><title>ignored</title><style>p {color: red}</style></head><body>"
+                "<h1>Hello</h1><p>first &amp; second</p><script>alert(1)</script><div>end</div></body></html>")
+        body = extract_message_body(multipart(part("text/html", html), mime_type="multipart/alternative"))
+        self.assertEqual([line for line in body.splitlines() if line], ["Hello", "first & second", "end"])
+
+    def test_body_truncated_at_limit(self):
+        body = extract_message_body(part("text/plain", "x" * 1000), max_body_chars=100)
+        self.assertEqual(body, "x" * 100 + "\n\n[Body truncated at 100 characters]")
+
+    def test_html_truncated_at_limit(self):
+        html = "<p>" + "word " * 10000 + "</p>"
+        body = extract_message_body(part("text/html", html), max_body_chars=50)
+        self.assertTrue(body.endswith("[Body truncated at 50 characters]"))
+        self.assertLessEqual(len(body.split("\n\n[Body truncated")[0]), 50)
+
+    def test_parts_after_the_limit_are_not_decoded(self):
+        undecodable = {"mimeType": "text/plain", "body": {"data": "A"}}
+        payload = multipart(part("text/plain", "x" * 200), undecodable, part("text/html", "<p>ignored</p>"))
+        self.assertTrue(extract_message_body(payload, max_body_chars=100).endswith("[Body truncated at 100 characters]"))
+
+    def test_no_cap(self):
+        self.assertEqual(extract_message_body(part("text/plain", "y" * 500), max_body_chars=None), "y" * 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
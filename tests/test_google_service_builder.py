@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from app.dto.token_metadata import TokenMetadata
+from app.webclients.gsuite import google_service_builder
+from app.webclients.gsuite.google_service_builder import fan_out_google_accounts
+
+
+def http_error(status: int) -> HttpError:
+    return HttpError(httplib2.Response({"status": status}), b"{}")
+
+
+class FanOutTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        tokens = [TokenMetadata.model_construct(metadata={"email": f"user{n}@example.com"}) for n in range(3)]
+        patches = [
+            mock.patch.object(google_service_builder.external_token_service, "fetch_external_token_records",
+                              mock.AsyncMock(return_value=tokens)),
+            mock.patch.object(google_service_builder, "build_google_service",
+                              mock.AsyncMock(side_effect=lambda *args: args[-1])),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def test_first_non_404_error_is_raised(self):
+        errors = {"user0@example.com": http_error(404), "user1@example.com": http_error(500),
+                  "user2@example.com": http_error(404)}
+
+        async def fetch(account):
+            raise errors[account]
+
+        with self.assertRaises(HttpError) as raised, self.assertLogs("app.config.logging_config", level="WARNING"):
+            await fan_out_google_accounts("user", "tasks", "v1", fetch)
+        self.assertEqual(raised.exception.resp.status, 500)
+
+    async def test_only_404s_raise_a_404(self):
+        async def fetch(account):
+            raise http_error(404)
+
+        with self.assertRaises(HttpError) as raised:
+            await fan_out_google_accounts("user", "tasks", "v1", fetch)
+        self.assertEqual(raised.exception.resp.status, 404)
+
+    async def test_writes_are_not_cut_off_by_the_deadline(self):
+        async def write(account):
+            await asyncio.sleep(0.05)
+            return account
+
+        with self.assertRaises(TimeoutError), self.assertLogs("app.config.logging_config", level="WARNING"):
+            await fan_out_google_accounts("user", "tasks", "v1", write, deadline_seconds=0.01)
+        results = await fan_out_google_accounts("user", "tasks", "v1", write, deadline_seconds=None)
+        self.assertEqual([result.result for result in results], [f"user{n}@example.com" for n in range(3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from app.webclients.gsuite.gtasks.gtasks_cache import GoogleTasksCache
+
+
+class _Request:
+    def __init__(self, response: dict):
+        self.response = response
+
+    def execute(self) -> dict:
+        return self.response
+
+
+class _Tasks:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, **params) -> _Request:
+        self.service.calls.append(params)
+        return _Request(self.service.responses.pop(0))
+
+
+class _Service:
+    def __init__(self, *responses: dict):
+        self.responses = list(responses)
+        self.calls = []
+
+    def tasks(self) -> _Tasks:
+        return _Tasks(self)
+
+
+class GoogleTasksCacheTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_first_read_downloads_all_pages(self):
+        service = _Service(
+            {"items": [{"id": "1", "title": "one", "position": "1"}], "nextPageToken": "p2"},
+            {"items": [{"id": "2", "title": "two", "position": "2"}]},
+        )
+        tasks = await GoogleTasksCache().list_tasks("user", "account", "list", service, max_age_seconds=60)
+        self.assertEqual([task["id"] for task in tasks], ["1", "2"])
+        self.assertEqual(service.calls[1]["pageToken"], "p2")
+        self.assertNotIn("updatedMin", service.calls[0])
+
+    async def test_fresh_copy_is_served_without_calls(self):
+        service = _Service({"items": [{"id": "1", "position": "1"}]})
+        cache = GoogleTasksCache()
+        await cache.list_tasks("user", "account", "list", service, max_age_seconds=60)
+        await cache.list_tasks("user", "account", "list", service, max_age_seconds=60)
+        self.assertEqual(len(service.calls), 1)
+
+    async def test_refresh_applies_updates_and_tombstones(self):
+        service = _Service(
+            {"items": [{"id": "1", "title": "one", "position": "1"}, {"id": "2", "title": "two", "position": "2"}]},
+            {"items": [{"id": "1", "title": "renamed"}, {"id": "2", "deleted": True}]},
+        )
+        cache = GoogleTasksCache(clock_skew_seconds=5)
+        await cache.list_tasks("user", "account", "list", service, max_age_seconds=60)
+        tasks = await cache.list_tasks("user", "account", "list", service, max_age_seconds=0)
+
+        self.assertEqual([(task["id"], task["title"], task["position"]) for task in tasks], [("1", "renamed", "1")])
+        self.assertTrue(service.calls[1]["showDeleted"])
+        self.assertIn("updatedMin", service.calls[1])
+
+    async def test_filters_and_subtask_order(self):
+        service = _Service({"items": [
+            {"id": "child", "parent": "b", "position": "1"},
+            {"id": "b", "position": "2", "due": "2024-05-02T00:00:00.000Z"},
+            {"id": "a", "position": "1", "status": "completed", "due": "2024-05-01T00:00:00.000Z"},
+            {"id": "hidden", "position": "3", "hidden": True},
+        ]})
+        cache = GoogleTasksCache()
+        tasks = await cache.list_tasks("user", "account", "list", service, max_age_seconds=60)
+        self.assertEqual([task["id"] for task in tasks], ["a", "b", "child"])
+
+        tasks = await cache.list_tasks("user", "account", "list", service, max_age_seconds=60, show_completed=False,
+                                       due_min="2024-05-01T12:00:00Z")
+        self.assertEqual([task["id"] for task in tasks], ["b"])
+
+    async def test_failed_refresh_drops_the_copy_and_is_not_retried(self):
+        class FailingService:
+            calls = 0
+
+            def tasks(self):
+                self.calls += 1
+                raise RuntimeError("unavailable")
+
+        service = FailingService()
+        cache = GoogleTasksCache()
+        with self.assertLogs("app.config.logging_config", level="WARNING"):
+            tasks = await cache.list_tasks("user", "account", "list", service, max_age_seconds=60)
+        self.assertIsNone(tasks)
+        self.assertIsNone(cache.get_task("user", "list", "1", max_age_seconds=60))
+        self.assertIsNone(await cache.list_tasks("user", "account", "list", service, max_age_seconds=60))
+        self.assertEqual(service.calls, 1)
+
+        cache = GoogleTasksCache(failure_ttl_seconds=0)
+        with self.assertLogs("app.config.logging_config", level="WARNING"):
+            await cache.list_tasks("user", "account", "list", service, max_age_seconds=60)
+            await cache.list_tasks("user", "account", "list", service, max_age_seconds=60)
+        self.assertEqual(service.calls, 3)
+
+    async def test_tasklist_of_another_account_is_not_a_warning(self):
+        class MissingService:
+            def tasks(self):
+                raise HttpError(httplib2.Response({"status": 404}), b"{}")
+
+        with self.assertLogs("app.config.logging_config", level="DEBUG") as logs:
+            self.assertIsNone(await GoogleTasksCache().list_tasks("user", "account", "list", MissingService(), 60))
+        self.assertEqual([record.levelname for record in logs.records], ["DEBUG"])
+
+    async def test_show_deleted_is_left_to_the_api(self):
+        self.assertIsNone(await GoogleTasksCache().list_tasks("user", "account", "list", _Service(), 60,
+                                                              show_deleted=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import asyncio
+import unittest
+
+from slack_sdk.errors import SlackApiError
+
+from app.webclients.slack.slack_message_index import SlackMessageIndex, _ChannelIndex
+
+
+def ts(n: int) -> str:
+    return f"{1700000000 + n}.000000"
+
+
+class _Client:
+    """
+    conversations.history over a fixed history, newest first, `page` messages per call.
+    """
+
+    def __init__(self, history, page: int = 2, error: str = None):
+        self.history = sorted(history, key=lambda message: message["ts"], reverse=True)
+        self.page = page
+        self.error = error
+        self.calls = []
+
+    async def get_conversation_history(self, token, channel_id, limit, cursor=None, oldest=None, latest=None):
+        self.calls.append({"cursor": cursor, "oldest": oldest})
+        if self.error:
+            raise SlackApiError(self.error, {"ok": False, "error": self.error})
+        messages = [message for message in self.history if oldest is None or message["ts"] > oldest]
+        start = int(cursor or 0)
+        end = start + self.page
+        return {
+            "messages": messages[start:end],
+            "response_metadata": {"next_cursor": str(end) if end < len(messages) else ""},
+        }
+
+
+class ChannelIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = _ChannelIndex()
+        self.index.add({"ts": ts(1), "text": "Deploy finished", "user": "U1"})
+        self.index.add({"ts": ts(2), "text": "deployment failed, <@U2> please look", "user": "U1"})
+        self.index.add({"ts": ts(3), "text": "U2 joined", "subtype": "channel_join"})
+        self.index.add({"ts": ts(4), "text": "lunch?", "user": "U3"})
+
+    def test_keyword_matches_word_prefixes_newest_first(self):
+        found = self.index.search("deploy", None, 10, skip_subtypes=False)
+        self.assertEqual([m["ts"] for m in found], [ts(2), ts(1)])
+
+    def test_mentions_and_keyword_combined(self):
+        self.assertEqual([m["ts"] for m in self.index.search("failed", "U2", 10, False)], [ts(2)])
+        self.assertEqual(self.index.search("finished", "U2", 10, False), [])
+
+    def test_subtypes_and_time_bounds(self):
+        self.assertEqual([m["ts"] for m in self.index.search("joined", None, 10, False)], [ts(3)])
+        self.assertEqual(self.index.search("joined", None, 10, True), [])
+        found = self.index.search(None, None, 10, False, oldest=float(ts(2)), latest=float(ts(3)))
+        self.assertEqual([m["ts"] for m in found], [ts(3), ts(2)])
+
+    def test_evict_oldest_drops_postings(self):
+        self.index.evict_oldest(2)
+        self.assertEqual(self.index.timestamps, [ts(3), ts(4)])
+        self.assertEqual(self.index.search("deploy", None, 10, False), [])
+        self.assertEqual(self.index.search(None, "U2", 10, False), [])
+        self.assertTrue(self.index.truncated)
+
+
+class SlackMessageIndexTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_backfill_resumes_and_reports_coverage(self):
+        client = _Client([{"ts": ts(n), "text": f"message {n}"} for n in range(6)], page=2)
+        index = SlackMessageIndex(client, freshness_seconds=0, backfill_pages=1)
+
+        found, searched_back_to = await index.search("xoxb", "C1", keyword="message")
+        self.assertEqual([m["ts"] for m in found], [ts(5), ts(4)])
+        self.assertEqual(searched_back_to, ts(4))
+
+        for _ in range(3):
+            found, searched_back_to = await index.search("xoxb", "C1", keyword="message", limit=10)
+        self.assertEqual(len(found), 6)
+        self.assertIsNone(searched_back_to)
+
+    async def test_new_messages_are_fetched_after_the_newest_seen(self):
+        client = _Client([{"ts": ts(1), "text": "first"}])
+        index = SlackMessageIndex(client, freshness_seconds=0)
+        await index.search("xoxb", "C1", keyword="first")
+
+        client.history.insert(0, {"ts": ts(2), "text": "second"})
+        found, _ = await index.search("xoxb", "C1", keyword="second")
+        self.assertEqual([m["ts"] for m in found], [ts(2)])
+        self.assertEqual(client.calls[-1]["oldest"], ts(1))
+
+    async def test_per_channel_cap_evicts_oldest(self):
+        client = _Client([{"ts": ts(n), "text": "hello"} for n in range(5)], page=10)
+        index = SlackMessageIndex(client, max_messages_per_channel=3)
+        found, searched_back_to = await index.search("xoxb", "C1", keyword="hello", limit=10)
+        self.assertEqual([m["ts"] for m in found], [ts(4), ts(3), ts(2)])
+        self.assertEqual(searched_back_to, ts(2))
+
+    async def test_channels_are_evicted_least_recently_used(self):
+        client = _Client([{"ts": ts(n), "text": "hello"} for n in range(3)], page=10)
+        index = SlackMessageIndex(client, max_channels=2)
+        for channel_id in ("C1", "C2", "C1", "C3"):
+            await index.search("xoxb", channel_id, keyword="hello")
+        self.assertEqual(list(index._channels), [("xoxb", "C1"), ("xoxb", "C3")])
+
+    async def test_global_message_budget_evicts_other_channels(self):
+        client = _Client([{"ts": ts(n), "text": "hello"} for n in range(3)], page=10)
+        index = SlackMessageIndex(client, max_messages=5)
+        await index.search("xoxb", "C1", keyword="hello")
+        await index.search("xoxb", "C2", keyword="hello")
+        self.assertEqual(list(index._channels), [("xoxb", "C2")])
+
+    async def test_cancelled_first_sync_keeps_its_pages(self):
+        client = _Client([{"ts": ts(n), "text": "hello"} for n in range(6)], page=2)
+        fetch = client.get_conversation_history
+
+        async def slow_after_first_page(*args, **kwargs):
+            if client.calls:
+                await asyncio.sleep(10)
+            return await fetch(*args, **kwargs)
+
+        client.get_conversation_history = slow_after_first_page
+        index = SlackMessageIndex(client, backfill_pages=3)
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(index.search("xoxb", "C1", keyword="hello"), timeout=0.1)
+        self.assertEqual(list(index._channels), [("xoxb", "C1")])
+
+        client.get_conversation_history = fetch
+        await index.search("xoxb", "C1", keyword="hello", backfill_pages=1)
+        self.assertEqual(client.calls[-1]["cursor"], "2")
+
+    async def test_unreachable_channel_is_not_indexed_or_retried(self):
+        client = _Client([], error="channel_not_found")
+        index = SlackMessageIndex(client)
+        for _ in range(2):
+            with self.assertRaises(SlackApiError), self.assertLogs("app.webclients.slack", level="WARNING"):
+                await index.search("xoxb-other", "C1", keyword="hello")
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(list(index._channels), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
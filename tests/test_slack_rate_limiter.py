@@ -0,0 +1,42 @@
+import asyncio
+import unittest
+
+from app.webclients.slack.slack_rate_limiter import SlackRateLimiter, _MethodBucket
+
+
+class MethodBucketTest(unittest.TestCase):
+
+    def test_burst_then_tier_pace(self):
+        bucket = _MethodBucket(per_minute=60, burst=3)
+        waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(waits[3], 1.0, delta=0.05)
+
+    def test_released_slot_is_taken_over(self):
+        bucket = _MethodBucket(per_minute=60, burst=1)
+        bucket.reserve()
+        queued = bucket.reserve()
+        bucket.release()
+        self.assertAlmostEqual(bucket.reserve(), queued, delta=0.05)
+
+
+class SlackRateLimiterTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_cancelled_waiters_give_their_slots_back(self):
+        limiter = SlackRateLimiter()
+
+        async def send():
+            return "ok"
+
+        tasks = [asyncio.create_task(limiter.call("xoxb", "conversations.history", send)) for _ in range(40)]
+        done, pending = await asyncio.wait(tasks, timeout=0.1)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        self.assertTrue(pending)
+        self.assertLess(limiter._bucket("xoxb", "conversations.history").reserve(), 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()